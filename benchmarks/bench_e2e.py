@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+import core.drivers.base_driver as base_driver
+import core.drivers.compiled_config as compiled_config
+from benchmarks.config_generator import generate_opcua_config, load_template_sensors, write_config
+from benchmarks.fake_plc import FakePlcProcess
+from benchmarks.results import (
+    CpuMeter, get_peak_rss_mb, get_rss_mb, summarize_histogram, summarize_registry, write_results
+)
+from core.drivers.opcua.opcua_driver import OpcuaDriver
+from core.drivers.opcua.opcua_worker import DataChange
+from core.opcua.opcua_server import OPCUAServer
+from utilities.metrics import METRICS, Histogram
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+
+# OpcuaDriver that measures how old every value is once it has been written to the address space; the
+# fake PLCs write their wall clock time as the value
+class LatencyProbeDriver(OpcuaDriver):
+    def __init__(self, server: OPCUAServer):
+        super().__init__(server)
+        self.latency: Histogram = Histogram("e2e_latency_seconds", ())
+        self.updates: int = 0
+
+    def reset(self):
+        self.latency = Histogram("e2e_latency_seconds", ())
+        self.updates = 0
+
+    async def _handle_data_changes(self, unit_id: str, changes: list[DataChange], timestamp: float):
+        await super()._handle_data_changes(unit_id, changes, timestamp)
+        now = time.time()
+        for _, value, _ in changes:
+            self.latency.record(now - value)
+        self.updates += len(changes)
+
+
+async def wait_connected(driver: OpcuaDriver, endpoints: int, timeout: float) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        health = driver.endpoint_health.values()
+        if len(health) >= endpoints and all(h.state == "connected" for h in health):
+            return time.perf_counter() - start
+        await asyncio.sleep(0.05)
+    raise RuntimeError("Endpoints not connected within " + str(timeout) + "s")
+
+
+async def run(args: argparse.Namespace) -> dict:
+    directory = tempfile.mkdtemp(prefix="vendor-plugin-bench-")
+    config, plc_tags = generate_opcua_config(
+        load_template_sensors(args.template),
+        args.units,
+        args.plcs,
+        args.sensor_copies,
+        args.publishing_interval,
+        base_port=args.plc_port
+    )
+    write_config(config, os.path.join(directory, "opcua_config.json"))
+    # the driver reads <CONFIG_PATH>/opcua_config.json, a compiled config of the real site is not used
+    base_driver.CONFIG_PATH = directory
+    compiled_config.COMPILED_CONFIG_DIR = directory
+
+    plc_process = FakePlcProcess(plc_tags, args.rate, directory)
+    plc_process.start(args.timeout)
+    try:
+        startup_start = time.perf_counter()
+        async with OPCUAServer(
+                args.endpoint,
+                "AquaCloud Vendor Plugin",
+                "http://aquacloud.iothub.thinkbox.no",
+                os.path.join("config", "AquaCloudStandardNodeSet.xml")
+        ) as server:
+            server_started = time.perf_counter() - startup_start
+            driver = LatencyProbeDriver(server)
+            await driver.start()
+            driver_started = time.perf_counter() - startup_start
+            time_to_connected = await wait_connected(driver, len(plc_tags), args.timeout)
+            startup = {
+                "server_s": server_started,
+                "driver_s": driver_started - server_started,
+                "time_to_connected_s": time_to_connected,
+                "total_s": time.perf_counter() - startup_start,
+                "server_phases_s": server.startup_timer.phases,
+                "driver_phases_s": driver.startup_timer.phases,
+                "rss_mb": get_rss_mb(),
+            }
+
+            await asyncio.sleep(args.warmup)
+            driver.reset()
+            sent_start = plc_process.changes_sent
+            cpu = CpuMeter()
+            measure_start = time.perf_counter()
+            await asyncio.sleep(args.duration)
+            elapsed = time.perf_counter() - measure_start
+            sent = plc_process.changes_sent - sent_start
+            received = driver.updates
+
+            results = {
+                "startup": startup,
+                "throughput": {
+                    "offered_per_second": sent / elapsed,
+                    "updates_per_second": received / elapsed,
+                    "changes_sent": sent,
+                    "updates_received": received,
+                },
+                "latency": summarize_histogram(driver.latency),
+                "cpu_percent": cpu.percent(),
+                "rss_mb": get_rss_mb(),
+                "peak_rss_mb": get_peak_rss_mb(),
+                "tags": sum(len(tags) for tags in plc_tags.values()),
+                "metrics": summarize_registry(METRICS),
+            }
+            driver.stop()
+            return results
+    finally:
+        plc_process.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the OPC UA driver against fake PLCs")
+    parser.add_argument("--units", type=int, default=10)
+    parser.add_argument("--plcs", type=int, default=10, help="fake PLC endpoints, units are spread over them")
+    parser.add_argument("--sensor-copies", type=int, default=1, help="copies of the template sensors per unit")
+    parser.add_argument("--template", default=os.path.join("config", "opcua_config.json"))
+    parser.add_argument("--rate", type=float, default=1000, help="changes per second over all PLCs")
+    parser.add_argument("--publishing-interval", type=float, default=100, help="milliseconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for PLCs and sessions")
+    parser.add_argument("--endpoint", default="opc.tcp://127.0.0.1:48400")
+    parser.add_argument("--plc-port", type=int, default=49000, help="port of the first fake PLC")
+    parser.add_argument("--output", default=None, help="JSON file, benchmarks/results/e2e-<time>.json by default")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = write_results("e2e", vars(args), results, args.output)
+    latency = results["latency"]
+    print(
+        f"{results['throughput']['updates_per_second']:.0f} updates/s "
+        f"(offered {results['throughput']['offered_per_second']:.0f}/s), "
+        f"latency p50 {latency.get('p50_ms', 0):.1f}ms p99 {latency.get('p99_ms', 0):.1f}ms, "
+        f"cpu {results['cpu_percent']:.0f}%, rss {results['rss_mb']:.0f}MB, "
+        f"startup {results['startup']['total_s']:.2f}s -> {output}"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import core.drivers.base_driver as base_driver
+import core.drivers.compiled_config as compiled_config
+from benchmarks.config_generator import generate_opcua_config, load_template_sensors, write_config
+from benchmarks.results import summarize_samples, write_results
+from core.drivers.compiled_config import load_compiled_config, write_compiled_config
+from core.drivers.opcua.opc_ua_config_parser import OpcuaConfigurationParser
+from core.drivers.opcua.opcua_driver import OpcuaDriver
+from core.opcua.opcua_server import OPCUAServer
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+
+def bench_create_mapping(config_file: str, repeat: int) -> dict:
+    parse, mapping, standard_sensors = [], [], []
+    records = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser = OpcuaConfigurationParser(config_file)
+        parser.parse_config_file()
+        parse.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result = parser.create_mapping()
+        mapping.append(time.perf_counter() - start)
+        records = sum(len(models) for models in result.values())
+
+        start = time.perf_counter()
+        parser.get_units()
+        standard_sensors.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parser = OpcuaConfigurationParser(config_file)
+    parser.parse_config_file()
+    parser.create_mapping()
+    parser.get_units()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "records": records,
+        "parse_config_file": summarize_samples(parse),
+        "create_mapping": summarize_samples(mapping),
+        "get_units": summarize_samples(standard_sensors),
+        "peak_allocated_mb": peak / 1024 / 1024,
+    }
+
+
+def bench_load_config(server: OPCUAServer, config_file: str, repeat: int) -> dict:
+    # parse_config (JSON and validation) against loading the artifact written by compile_config.py
+    driver = OpcuaDriver(server)
+    parse = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        driver.parse_config()
+        parse.append(time.perf_counter() - start)
+    compiled_config_path = write_compiled_config(config_file, driver.get_config_state())
+
+    load = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        state = load_compiled_config(config_file)
+        driver.set_config_state(state)
+        load.append(time.perf_counter() - start)
+    return {
+        "artifact_kb": os.path.getsize(compiled_config_path) / 1024,
+        "parse_config": summarize_samples(parse),
+        "load_compiled_config": summarize_samples(load),
+    }
+
+
+async def bench_create_sensors(server: OPCUAServer, config_file: str, repeat: int) -> dict:
+    parser = OpcuaConfigurationParser(config_file)
+    parser.parse_config_file()
+    sensors = [sensor for unit in parser.get_units() for sensor in unit.sensors]
+    ns = server.get_namespace()
+    samples = []
+    for index in range(repeat):
+        # every round gets its own parent so the node ids don't collide
+        parent = await server.get_objects_node().add_folder(ns, "BenchSensors" + str(index))
+        start = time.perf_counter()
+        await OPCUAServer.create_sensors(parent, sensors, ns, "Bench" + str(index))
+        samples.append(time.perf_counter() - start)
+    return {"sensors": len(sensors), "create_sensors": summarize_samples(samples)}
+
+
+async def bench_on_data_change(server: OPCUAServer, repeat: int) -> dict:
+    # OpcuaDriver does not go through on_data_change itself, but its mapping tags exercise the same
+    # route resolution, deadband and staging as the polling drivers
+    driver = OpcuaDriver(server)
+    driver.parse_config()
+    await driver.create_unit_nodes()
+    measurement_tags = [tag for tag, models in driver.mapping.items() if models[0].measurement != "LocalTimestamp"]
+    timestamp_tags = [tag for tag, models in driver.mapping.items() if models[0].measurement == "LocalTimestamp"]
+
+    rounds, commits = [], []
+    for index in range(repeat + 1):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        start = time.perf_counter()
+        for tag in measurement_tags:
+            # a new value every round so the deadband filter lets it through
+            await driver.on_data_change(tag, float(index), timestamp)
+        for tag in timestamp_tags:
+            await driver.on_data_change(tag, timestamp, timestamp)
+        staged = time.perf_counter()
+        await driver.commit_data_changes()
+        rounds.append(staged - start)
+        commits.append(time.perf_counter() - staged)
+
+    calls = len(measurement_tags) + len(timestamp_tags)
+    # the first round resolves the routes of every tag
+    warm = rounds[1:]
+    return {
+        "tags": calls,
+        "cold_round": summarize_samples(rounds[:1]),
+        "warm_round": summarize_samples(warm),
+        "commit": summarize_samples(commits[1:]),
+        "calls_per_second": calls * len(warm) / sum(warm) if sum(warm) > 0 else 0.0,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    directory = tempfile.mkdtemp(prefix="vendor-plugin-bench-")
+    config, _ = generate_opcua_config(
+        load_template_sensors(args.template),
+        args.units,
+        args.units,
+        args.sensor_copies
+    )
+    config_file = os.path.join(directory, "opcua_config.json")
+    write_config(config, config_file)
+    base_driver.CONFIG_PATH = directory
+    compiled_config.COMPILED_CONFIG_DIR = directory
+
+    results = {"create_mapping": bench_create_mapping(config_file, args.repeat)}
+    server = OPCUAServer(
+        args.endpoint,
+        "AquaCloud Vendor Plugin",
+        "http://aquacloud.iothub.thinkbox.no",
+        os.path.join("config", "AquaCloudStandardNodeSet.xml")
+    )
+    # the address space is enough, the server does not have to listen
+    await server.init()
+    results["startup"] = {"server_phases_s": server.startup_timer.phases}
+    results["load_config"] = bench_load_config(server, config_file, args.repeat)
+    results["on_data_change"] = await bench_on_data_change(server, args.repeat)
+    results["create_sensors"] = await bench_create_sensors(server, config_file, args.sensor_repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of config parsing, data routing and node creation")
+    parser.add_argument("--units", type=int, default=100)
+    parser.add_argument("--sensor-copies", type=int, default=1, help="copies of the template sensors per unit")
+    parser.add_argument("--template", default=os.path.join("config", "opcua_config.json"))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--sensor-repeat", type=int, default=3, help="rounds of create_sensors")
+    parser.add_argument("--endpoint", default="opc.tcp://127.0.0.1:48400")
+    parser.add_argument("--output", default=None, help="JSON file, benchmarks/results/micro-<time>.json by default")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = write_results("micro", vars(args), results, args.output)
+    print(
+        f"create_mapping {results['create_mapping']['create_mapping']['median_ms']:.2f}ms, "
+        f"parse_config {results['load_config']['parse_config']['median_ms']:.1f}ms, "
+        f"load_compiled_config {results['load_config']['load_compiled_config']['median_ms']:.1f}ms, "
+        f"on_data_change {results['on_data_change']['calls_per_second']:.0f} calls/s, "
+        f"create_sensors {results['create_sensors']['create_sensors']['median_ms']:.1f}ms "
+        f"for {results['create_sensors']['sensors']} sensors -> {output}"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import json
+
+# leaves where a larger value is an improvement, everything else (times, latency, memory, cpu) is better lower
+HIGHER_IS_BETTER = ("per_second", "updates_received")
+
+
+def flatten(document: dict, prefix: str = "") -> dict[str, float]:
+    values = {}
+    for key, value in document.items():
+        path = prefix + "." + key if prefix != "" else key
+        if isinstance(value, dict):
+            values.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = float(value)
+    return values
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[tuple[str, float, float, float, bool]]:
+    # (path, baseline, current, relative change, regression) of every result present in both documents
+    baseline_values = flatten(baseline["results"])
+    current_values = flatten(current["results"])
+    rows = []
+    for path in sorted(baseline_values.keys() & current_values.keys()):
+        old, new = baseline_values[path], current_values[path]
+        if old == 0:
+            continue
+        change = (new - old) / abs(old)
+        if path.endswith(HIGHER_IS_BETTER):
+            regression = change < -threshold
+        else:
+            regression = change > threshold
+        rows.append((path, old, new, change, regression))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported as regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        baseline, current = json.load(baseline_file), json.load(current_file)
+    if baseline["benchmark"] != current["benchmark"] or baseline["parameters"] != current["parameters"]:
+        print("warning: the results were produced by different benchmarks or parameters")
+
+    regressions = 0
+    for path, old, new, change, regression in compare(baseline, current, args.threshold):
+        regressions += regression
+        print(f"{'!' if regression else ' '} {path:70} {old:14.3f} {new:14.3f} {change * 100:+7.1f}%")
+    print(f"{regressions} regression(s) above {args.threshold * 100:.0f}%")
+    raise SystemExit(1 if regressions > 0 else 0)
+
+
+if __name__ == '__main__':
+    main()
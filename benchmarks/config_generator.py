@@ -0,0 +1,63 @@
+import copy
+import json
+
+# first identifier of the generated PLC tags, each unit of a PLC gets its own block of identifiers
+FIRST_TAG = 1000
+MONITORING_KEYS = (
+    "publishing_interval", "sampling_interval", "queue_size", "discard_policy", "deadband_type", "deadband_value"
+)
+
+
+def load_template_sensors(template_file: str) -> list[dict]:
+    with open(template_file) as json_file:
+        return json.load(json_file)["sensors"]
+
+
+def generate_opcua_config(
+        template_sensors: list[dict],
+        units: int,
+        plcs: int,
+        sensor_copies: int = 1,
+        publishing_interval: float | None = None,
+        host: str = "127.0.0.1",
+        base_port: int = 48400
+) -> tuple[dict, dict[int, list[tuple[int, int]]]]:
+    # returns an opcua_config.json document for units spread round-robin over plcs endpoints, every unit with
+    # sensor_copies copies of the template sensors, and the (ns, i) tags every PLC port has to serve.
+    # units of a PLC share its endpoint and user, so they share one client session like on a real site
+    plcs = max(1, min(plcs, units))
+    tags_per_unit = sensor_copies * sum(len(sensor["mapping"]) for sensor in template_sensors)
+    plc_tags: dict[int, list[tuple[int, int]]] = {base_port + plc: [] for plc in range(plcs)}
+    config = {"units": []}
+
+    for unit in range(units):
+        port = base_port + unit % plcs
+        next_tag = FIRST_TAG + (unit // plcs) * tags_per_unit
+        sensors = []
+        for copy_index in range(sensor_copies):
+            for template in template_sensors:
+                sensor = {key: value for key, value in copy.deepcopy(template).items() if key not in MONITORING_KEYS}
+                sensor["sensor_name"] = template["sensor_name"] + "_" + str(copy_index)
+                if publishing_interval is not None:
+                    sensor["publishing_interval"] = publishing_interval
+                for measurement, node in sensor["mapping"].items():
+                    sensor["mapping"][measurement] = {"ns": node["ns"], "i": next_tag}
+                    plc_tags[port].append((node["ns"], next_tag))
+                    next_tag += 1
+                sensors.append(sensor)
+
+        config["units"].append({
+            "unit_id": "unit_" + format(unit + 1, "03d"),
+            "server": {
+                "endpoint": "opc.tcp://" + host + ":" + str(port),
+                "username": "bench",
+                "password": "bench"
+            },
+            "sensors": sensors
+        })
+    return config, plc_tags
+
+
+def write_config(config: dict, config_file: str):
+    with open(config_file, "w") as json_file:
+        json.dump(config, json_file, indent=2)
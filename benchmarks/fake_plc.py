@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from datetime import datetime
+from pathlib import Path
+
+from asyncua import Server, ua
+from asyncua.crypto.cert_gen import setup_self_signed_certificate
+from asyncua.server.user_managers import PermissiveUserManager
+from cryptography.x509.oid import ExtendedKeyUsageOID
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+# seconds between two write batches of a PLC
+CHANGE_TICK = 0.05
+PLC_APPLICATION_URI = "urn:aquacloud:fakeplc"
+
+
+async def generate_plc_certificate(directory: str) -> tuple[Path, Path]:
+    cert = Path(directory, "plc-certificate.der")
+    private_key = Path(directory, "plc-private-key.pem")
+    if cert.exists() is False or private_key.exists() is False:
+        await setup_self_signed_certificate(
+            private_key,
+            cert,
+            PLC_APPLICATION_URI,
+            socket.gethostname(),
+            [ExtendedKeyUsageOID.SERVER_AUTH],
+            {"countryName": "NO", "organizationName": "AquaCloud"}
+        )
+    return cert, private_key
+
+
+# asyncua server standing in for a PLC: serves Double variables at the numeric node ids of the generated
+# config and writes the wall clock time (time.time()) into them, so the receiver can tell how old a value is
+class FakePlc:
+    def __init__(self, port: int, tags: list[tuple[int, int]], cert: Path, private_key: Path):
+        self._port: int = port
+        self._tags: list[tuple[int, int]] = tags
+        self._cert: Path = cert
+        self._private_key: Path = private_key
+        self._server: Server = Server(user_manager=PermissiveUserManager())
+        self._node_ids: list[ua.NodeId] = []
+        self._next: int = 0
+
+    async def start(self):
+        await self._server.init()
+        self._server.set_endpoint("opc.tcp://0.0.0.0:" + str(self._port))
+        self._server.set_server_name("Fake PLC " + str(self._port))
+        await self._server.set_application_uri(PLC_APPLICATION_URI)
+        await self._server.load_certificate(str(self._cert))
+        await self._server.load_private_key(str(self._private_key))
+        self._server.set_security_policy([
+            ua.SecurityPolicyType.NoSecurity,
+            ua.SecurityPolicyType.Basic256Sha256_SignAndEncrypt
+        ])
+        self._server.set_security_IDs(["Username"])
+
+        max_ns = max((ns for ns, _ in self._tags), default=2)
+        while len(await self._server.get_namespace_array()) <= max_ns:
+            await self._server.register_namespace("urn:fakeplc:" + str(len(await self._server.get_namespace_array())))
+
+        objects_node = self._server.get_objects_node()
+        for ns, i in self._tags:
+            node = await objects_node.add_variable(ua.NodeId(i, ns), f"{ns}:Tag{i}", 0.0, ua.VariantType.Double)
+            self._node_ids.append(node.nodeid)
+        await self._server.start()
+
+    async def stop(self):
+        await self._server.stop()
+
+    async def write_changes(self, count: int) -> int:
+        # writes the next count tags round-robin
+        if len(self._node_ids) == 0:
+            return 0
+        now = datetime.utcnow()
+        for _ in range(count):
+            node_id = self._node_ids[self._next]
+            self._next = (self._next + 1) % len(self._node_ids)
+            await self._server.write_attribute_value(
+                node_id,
+                ua.DataValue(ua.Variant(time.time(), ua.VariantType.Double), SourceTimestamp=now)
+            )
+        return count
+
+
+async def _run_plcs(
+        plc_tags: dict[int, list[tuple[int, int]]],
+        rate: float,
+        directory: str,
+        ready: multiprocessing.Event,
+        stop: multiprocessing.Event,
+        changes_sent: multiprocessing.Value
+):
+    cert, private_key = await generate_plc_certificate(directory)
+    plcs = [FakePlc(port, tags, cert, private_key) for port, tags in plc_tags.items()]
+    for plc in plcs:
+        await plc.start()
+    ready.set()
+
+    # rate is the change rate of the whole site, spread evenly over the PLCs
+    loop = asyncio.get_running_loop()
+    per_tick = rate * CHANGE_TICK / len(plcs)
+    budget = 0.0
+    next_tick = loop.time()
+    try:
+        while not stop.is_set():
+            budget += per_tick
+            count = int(budget)
+            budget -= count
+            if count > 0:
+                for plc in plcs:
+                    sent = await plc.write_changes(count)
+                    with changes_sent.get_lock():
+                        changes_sent.value += sent
+            next_tick += CHANGE_TICK
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+    finally:
+        for plc in plcs:
+            await plc.stop()
+
+
+def run_plcs(
+        plc_tags: dict[int, list[tuple[int, int]]],
+        rate: float,
+        directory: str,
+        ready: multiprocessing.Event,
+        stop: multiprocessing.Event,
+        changes_sent: multiprocessing.Value
+):
+    # process entry point, the PLCs run outside the measured process so they don't skew its CPU and RSS
+    logging.getLogger("asyncua").setLevel(logging.ERROR)
+    try:
+        asyncio.run(_run_plcs(plc_tags, rate, directory, ready, stop, changes_sent))
+    except Exception as e:
+        _logger.warning("Fake PLCs stopped: %s", e)
+        os._exit(1)
+
+
+class FakePlcProcess:
+    def __init__(self, plc_tags: dict[int, list[tuple[int, int]]], rate: float, directory: str):
+        context = multiprocessing.get_context("spawn")
+        self._ready = context.Event()
+        self._stop = context.Event()
+        self._changes_sent = context.Value("q", 0)
+        self._process = context.Process(
+            target=run_plcs,
+            args=(plc_tags, rate, directory, self._ready, self._stop, self._changes_sent),
+            daemon=True
+        )
+
+    @property
+    def changes_sent(self) -> int:
+        return self._changes_sent.value
+
+    def start(self, timeout: float):
+        self._process.start()
+        if not self._ready.wait(timeout) or not self._process.is_alive():
+            self.stop()
+            raise RuntimeError("Fake PLCs did not start within " + str(timeout) + "s")
+
+    def stop(self):
+        self._stop.set()
+        self._process.join(10)
+        if self._process.is_alive():
+            self._process.kill()
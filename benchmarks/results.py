@@ -0,0 +1,109 @@
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from utilities.metrics import Histogram, MetricsRegistry
+
+RESULTS_PATH = os.path.join("benchmarks", "results")
+
+
+def get_environment() -> dict:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        revision = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_revision": revision,
+    }
+
+
+def get_rss_mb() -> float:
+    # current resident set size, /proc is only there on Linux
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return get_peak_rss_mb()
+
+
+def get_peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class CpuMeter:
+    def __init__(self):
+        self._wall: float = time.perf_counter()
+        self._cpu: float = time.process_time()
+
+    def percent(self) -> float:
+        wall = time.perf_counter() - self._wall
+        return 100 * (time.process_time() - self._cpu) / wall if wall > 0 else 0.0
+
+
+def summarize_samples(samples: list[float]) -> dict:
+    # samples in seconds, reported in milliseconds
+    if len(samples) == 0:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def summarize_histogram(histogram: Histogram) -> dict:
+    return {
+        "count": histogram.count,
+        "mean_ms": histogram.sum / histogram.count * 1000 if histogram.count > 0 else 0.0,
+        "p50_ms": histogram.quantile(0.5) * 1000,
+        "p90_ms": histogram.quantile(0.9) * 1000,
+        "p99_ms": histogram.quantile(0.99) * 1000,
+        "max_ms": histogram.max * 1000,
+    }
+
+
+def summarize_registry(registry: MetricsRegistry) -> dict:
+    summary = {}
+    for metric in registry.metrics:
+        series = metric.name + "".join("|" + key + "=" + value for key, value in metric.labels)
+        if isinstance(metric, Histogram):
+            summary[series] = summarize_histogram(metric)
+        else:
+            try:
+                summary[series] = metric.value
+            except Exception:
+                continue
+    return summary
+
+
+def write_results(name: str, parameters: dict, results: dict, output: str | None = None) -> str:
+    if output is None:
+        os.makedirs(RESULTS_PATH, exist_ok=True)
+        output = os.path.join(RESULTS_PATH, name + "-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    document = {
+        "benchmark": name,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": get_environment(),
+        "parameters": parameters,
+        "results": results,
+    }
+    with open(output, "w") as json_file:
+        json.dump(document, json_file, indent=2)
+    return output
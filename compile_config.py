@@ -0,0 +1,62 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+from core.drivers.compiled_config import write_compiled_config
+from core.drivers.driver_supervisor import DRIVER_REGISTRY, create_driver, get_enabled_drivers
+from core.opcua.opcua_server import OPCUAServer
+from main import ENDPOINT
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+
+# Parses and validates the config file of every enabled driver once and writes the result as a binary
+# artifact to COMPILED_CONFIG_DIR. The drivers load the artifact instead of the JSON file as long as the
+# config file is unchanged; run it again after editing a config or upgrading.
+def compile_driver_configs(driver_names: list[str]) -> bool:
+    # the drivers are only constructed to run their parse_config, the server is never started
+    server = OPCUAServer(ENDPOINT, "AquaCloud Vendor Plugin", "http://aquacloud.iothub.thinkbox.no", "")
+    success = True
+    for name in driver_names:
+        if name not in DRIVER_REGISTRY:
+            _logger.warning("Unknown driver %s, available drivers: %s", name, ", ".join(DRIVER_REGISTRY))
+            success = False
+            continue
+        driver = create_driver(name, server)
+        if len(driver.CONFIG_ATTRIBUTES) == 0:
+            print(name + ": not compiled, the driver reads its configuration at runtime")
+            continue
+
+        config_path = driver.get_config_path()
+        start = time.perf_counter()
+        driver.parse_config()
+        if len(driver.units) == 0 and len(driver.mapping) == 0:
+            # the parsers log and return an empty config when the file does not validate
+            _logger.warning("%s: %s is empty or invalid, nothing compiled", name, config_path)
+            success = False
+            continue
+        compiled_config_path = write_compiled_config(config_path, driver.get_config_state())
+        print("%s: %s -> %s (%d units, %d mapping keys, %.0f KiB, %.2fs)" % (
+            name,
+            config_path,
+            compiled_config_path,
+            len(driver.units),
+            len(driver.mapping),
+            os.path.getsize(compiled_config_path) / 1024,
+            time.perf_counter() - start
+        ))
+    return success
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile the driver configs for a faster startup")
+    parser.add_argument(
+        "drivers",
+        nargs="*",
+        help="drivers to compile, by default the enabled drivers (DRIVERS or plugin_config.json)"
+    )
+    args = parser.parse_args()
+    sys.exit(0 if compile_driver_configs(args.drivers or get_enabled_drivers()) else 1)
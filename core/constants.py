@@ -24,6 +24,14 @@ class EnvironmentSensorType:
     LIGHT_SENSOR = "LightSensorType"
 
 
+UNNECESSARY_SENSOR_PROPERTIES = [
+    "<GroupIdentifier>", "AssetId", "DeviceClass", "DeviceManual",
+    "DeviceRevision", "HardwareRevision", "Identification",
+    "Lock", "MethodSet", "ParameterSet", "ProductInstanceUri",
+    "RevisionCounter", "SoftwareRevision"
+]
+
+
 CONFIG_PATH = '/opt/vendor-plugin/config'
 # CONFIG_PATH = 'config'
 FILES_PATH = 'files'
@@ -1,60 +1,285 @@
 import abc
-from typing import Any
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable
 
 from asyncua import ua, Node
 
 from aquacloud_common.models.organization.unit import UnitModel
 from aquacloud_common.models.sensor.base_sensor import BaseSensorModel
+from core.constants import CONFIG_PATH
+from core.drivers.compiled_config import load_compiled_config
+from core.drivers.config_diff import ConfigDiff
+from core.drivers.data_route import DataRoute
+from core.drivers.deadband_filter import DeadbandFilter
 from core.opcua.nodes.unit_node import Unit
 from core.opcua.opcua_server import OPCUAServer
+from core.opcua.write_coalescer import WriteCoalescer
+from models.history_model import HistoryModel
 from models.mapping_model import MappingModel
+from utilities.config_parser import get_type_name_from_model
+from utilities.metrics import METRICS
+from utilities.startup import NODE_BUILD_CONCURRENCY, STARTUP_REPORT_LEVEL, StartupTimer, gather_with_concurrency
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+
+class PollScheduler:
+    def __init__(self, name: str = ""):
+        self._name: str = name
+        self._tasks: list[asyncio.Task] = []
+
+    def schedule(
+            self,
+            callback: Callable[[], Awaitable[Any]],
+            interval: float,
+            jitter: float | None = None,
+            label: str = ""
+    ):
+        if interval <= 0:
+            raise ValueError(f"Poll interval of {self._name} {label} must be greater than 0, got {interval}")
+        # start offset is spread over one interval by default so units don't all poll on the same tick
+        if jitter is None:
+            jitter = interval
+        offset = random.uniform(0, jitter)
+        task = asyncio.get_running_loop().create_task(self._run(callback, interval, offset, label))
+        self._tasks.append(task)
+
+    async def _run(self, callback: Callable[[], Awaitable[Any]], interval: float, offset: float, label: str):
+        labels = {"driver": self._name, "poll": label}
+        cycle_duration = METRICS.histogram("poll_cycle_seconds", "Duration of a poll cycle", labels)
+        overruns = METRICS.counter("poll_overruns_total", "Poll ticks skipped because a cycle overran", labels)
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + offset
+        while True:
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            start = time.perf_counter()
+            try:
+                await callback()
+            except Exception as e:
+                _logger.warning("Poll cycle failed: %s", e)
+            cycle_duration.record(time.perf_counter() - start)
+
+            # fixed-rate schedule: ticks stay on the original grid, overrun ticks are skipped
+            next_tick += interval
+            now = loop.time()
+            if next_tick < now:
+                skipped = (now - next_tick) // interval + 1
+                next_tick += skipped * interval
+                overruns.inc(int(skipped))
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
 
 
 class BaseDriver(metaclass=abc.ABCMeta):
+    # file in CONFIG_PATH the driver is configured with, watched for changes by the DriverSupervisor
+    CONFIG_FILE: str = ""
+    # attributes set by parse_config that compile_config.py stores, empty when the driver is not compiled
+    CONFIG_ATTRIBUTES: tuple[str, ...] = ()
+
     def __init__(self, server: OPCUAServer):
         self.units: list[UnitModel] = []
         self.sensors: list[BaseSensorModel] = []
         self.mapping: dict[str, list[MappingModel]] = {}
+        # tag -> resolved routes of its mapping, filled on the first data change of the tag
+        self._routes: dict[str, tuple[DataRoute, ...]] = {}
+        # sensor type -> history configuration
+        self.history: dict[str, HistoryModel] = {}
         self.is_starting: bool = False
         self.server: OPCUAServer = server
+        self._writer: WriteCoalescer = server.create_write_coalescer()
+        self.deadband_filter: DeadbandFilter = DeadbandFilter()
+        # sensors with a measurement written since the last commit; only those get a new LocalTimestamp
+        self._changed_sensors: set[str] = set()
+        self.scheduler: PollScheduler = PollScheduler(self.__class__.__name__)
+        self.startup_timer: StartupTimer = StartupTimer(self.__class__.__name__)
+        labels = {"driver": self.__class__.__name__}
+        self._write_duration = METRICS.histogram("write_seconds", "Duration of writing a batch of node values", labels)
+        self._values_written = METRICS.counter("values_written_total", "Node values written", labels)
+        self._timestamps_written = METRICS.counter(
+            "local_timestamp_updates_total", "LocalTimestamp values written", labels
+        )
 
-    async def create_unit_nodes(self):
-        for unit_model in self.units:
-            unit = Unit(unit_model, self.server.get_namespace(), self.server.get_objects_node())
-            await unit.init()
+    async def create_unit_nodes(self, unit_models: list[UnitModel] | None = None):
+        if unit_models is None:
+            unit_models = self.units
+        units = [Unit(unit_model, self.server.get_namespace(), self.server.get_objects_node()) for unit_model in unit_models]
+        await gather_with_concurrency(NODE_BUILD_CONCURRENCY, [unit.init() for unit in units])
 
     async def create_sensors(self):
         # create sensor nodes
         objects_node = self.server.get_objects_node()
         await OPCUAServer.create_sensors(objects_node, self.sensors, self.server.get_namespace(), "")
 
-    async def on_data_change(self, tag: str, value: Any, timestamp: str):
-        sensors: list[MappingModel] = self.mapping[tag]
-        for sensor_mapping in sensors:
-            measurement_path = sensor_mapping.measurement
-            if sensor_mapping.measurement == "Depth":
-                measurement_path = "Position.Depth"
-            if sensor_mapping.unit_id != "":
-                identifier = "Unit|" + sensor_mapping.unit_id + \
-                             "|Sensor|" + sensor_mapping.sensor + \
-                             "." + measurement_path
-            else:
-                identifier = "Sensor|" + sensor_mapping.sensor + \
-                             "." + measurement_path
-
-            measurement_node = self.server.get_node(identifier)
-            if measurement_node is not None:
-                if sensor_mapping.measurement == "LocalTimestamp":
-                    await measurement_node.set_value(ua.String(value))
-                else:
-                    await measurement_node.set_value(ua.Float(value))
-
-                # if sensor_mapping.measurement != "Depth":
-                #     sensor_node = await measurement_node.get_parent()
-                #     local_time_stamp = await sensor_node.get_child(
-                #         str(self.server.get_namespace()) + ":" + "LocalTimestamp")
-                #     if local_time_stamp is not None:
-                #         await local_time_stamp.set_value(ua.String(timestamp))
+    def configure_history(self):
+        for sensor in self.sensors:
+            history = self.history.get(get_type_name_from_model(sensor))
+            if history is not None:
+                self.server.configure_history("Sensor|" + sensor.name, history)
+        for unit in self.units:
+            for sensor in unit.sensors:
+                history = self.history.get(get_type_name_from_model(sensor))
+                if history is not None:
+                    self.server.configure_history("Unit|" + unit.id + "|Sensor|" + sensor.name, history)
+
+    def get_config_path(self) -> str:
+        return os.path.join(CONFIG_PATH, self.CONFIG_FILE)
+
+    def get_config_state(self) -> dict[str, Any]:
+        state = {name: getattr(self, name) for name in self.CONFIG_ATTRIBUTES}
+        state["deadbands"] = self.deadband_filter.get_deadbands()
+        return state
+
+    def set_config_state(self, state: dict[str, Any]):
+        for name in self.CONFIG_ATTRIBUTES:
+            setattr(self, name, state[name])
+        self.deadband_filter.set_deadbands(state["deadbands"])
+
+    def load_config(self):
+        # the compiled config skips JSON parsing and model validation, it is used while it matches the config file
+        state = None
+        if len(self.CONFIG_ATTRIBUTES) > 0:
+            state = load_compiled_config(self.get_config_path())
+        if state is None:
+            self.parse_config()
+        else:
+            self.set_config_state(state)
+
+    def get_site_sensors(self) -> list[BaseSensorModel]:
+        # site sensors that have nodes in the address space
+        return self.sensors
+
+    async def _get_unit_sensors_node(self, unit_id: str) -> Node | None:
+        unit_node = self.server.get_node("Unit|" + unit_id)
+        if unit_node is None:
+            return None
+        try:
+            return await unit_node.get_child(str(self.server.get_namespace()) + ":Sensors")
+        except ua.UaStatusCodeError:
+            return None
+
+    async def _delete_unit_node_if_empty(self, unit_id: str):
+        # drivers share the address space, a unit is kept as long as another driver has sensors in it
+        sensors_node = await self._get_unit_sensors_node(unit_id)
+        if sensors_node is None:
+            return
+        prefix = "Unit|" + unit_id + "|Sensor|"
+        for child in await sensors_node.get_children():
+            if isinstance(child.nodeid.Identifier, str) and child.nodeid.Identifier.startswith(prefix):
+                return
+        await self.server.delete_node("Unit|" + unit_id)
+
+    async def _apply_node_changes(self, diff: ConfigDiff):
+        # changed sensors have a new type, they are deleted and created again
+        for identifier in diff.sensors.removed + diff.sensors.changed:
+            await self.server.delete_node(identifier)
+            self.deadband_filter.reset(identifier)
+        for unit_id in diff.units.removed:
+            await self._delete_unit_node_if_empty(unit_id)
+            self.deadband_filter.reset("Unit|" + unit_id)
+
+        added_units = set(diff.units.added)
+        await self.create_unit_nodes([unit for unit in self.units if unit.id in added_units])
+
+        # sensors of added units were created with their unit
+        unit_sensors: dict[str, list[BaseSensorModel]] = {}
+        for identifier in diff.sensors.added + diff.sensors.changed:
+            entry = diff.new_sensors[identifier]
+            if entry.unit_id not in added_units:
+                unit_sensors.setdefault(entry.unit_id, []).append(entry.model)
+        ns = self.server.get_namespace()
+        for unit_id, sensors in unit_sensors.items():
+            if unit_id == "":
+                await OPCUAServer.create_sensors(self.server.get_objects_node(), sensors, ns, "")
+                continue
+            sensors_node = await self._get_unit_sensors_node(unit_id)
+            if sensors_node is not None:
+                await OPCUAServer.create_sensors(sensors_node, sensors, ns, "Unit|" + unit_id)
+
+    async def reload(self) -> ConfigDiff:
+        # parses the config again and only touches the nodes of units and sensors that were added, removed or
+        # changed, so clients keep their subscriptions on everything else
+        state = dict(self.__dict__)
+        old_units, old_sensors, old_mapping = self.units, self.get_site_sensors(), self.mapping
+        try:
+            self.parse_config()
+        except Exception as e:
+            self.__dict__.update(state)
+            raise ValueError("cannot parse the configuration, keeping the running configuration: " + str(e))
+        if len(self.units) == 0 and len(self.mapping) == 0 and (len(old_units) > 0 or len(old_mapping) > 0):
+            # the parsers log and return an empty config when the file does not validate
+            self.__dict__.update(state)
+            raise ValueError("reloaded configuration is empty, keeping the running configuration")
+
+        diff = ConfigDiff.create(old_units, old_sensors, old_mapping, self.units, self.get_site_sensors(), self.mapping)
+        await self._apply_node_changes(diff)
+        # routes are resolved again on the next data change of their tag
+        self._routes.clear()
+        self.configure_history()
+        self.scheduler.stop()
+        await self.subscribe()
+        return diff
+
+    def report_mapping_footprint(self):
+        records = 0
+        size = sys.getsizeof(self.mapping)
+        for tag, sensors in self.mapping.items():
+            records += len(sensors)
+            size += sys.getsizeof(tag) + sys.getsizeof(sensors) + sum(sys.getsizeof(sensor) for sensor in sensors)
+        _logger.log(
+            STARTUP_REPORT_LEVEL,
+            "%s mapping: %d units, %d tags, %d records, %.1fKiB",
+            self.__class__.__name__, len(self.units), len(self.mapping), records, size / 1024
+        )
+
+    def _resolve_routes(self, tag: str) -> tuple[DataRoute, ...]:
+        routes = []
+        resolved = True
+        for sensor_mapping in self.mapping[tag]:
+            route = DataRoute.from_mapping(sensor_mapping, self.server, self.deadband_filter)
+            if route is None:
+                resolved = False
+                continue
+            routes.append(route)
+        routes = tuple(routes)
+        # a tag whose nodes don't all exist yet is resolved again on its next data change
+        if resolved:
+            self._routes[tag] = routes
+        return routes
+
+    async def on_data_change(self, tag: str, value: Any, timestamp: str, source_timestamp: datetime | None = None):
+        # source_timestamp (naive UTC) is the time the value was measured, when the source reports it
+        routes = self._routes.get(tag)
+        if routes is None:
+            routes = self._resolve_routes(tag)
+        now = time.monotonic()
+        for route in routes:
+            if route.is_timestamp:
+                if route.sensor_identifier in self._changed_sensors:
+                    self._writer.stage(route.handle.node, route.handle.to_variant(value), source_timestamp)
+                    self._timestamps_written.inc()
+            elif self.deadband_filter.accept(route.slot, float(value), now):
+                self._changed_sensors.add(route.sensor_identifier)
+                self._writer.stage(route.handle.node, route.handle.to_variant(value), source_timestamp)
+
+    async def commit_data_changes(self):
+        self._changed_sensors.clear()
+        start = time.perf_counter()
+        written = await self._writer.commit()
+        if written > 0:
+            self._write_duration.record(time.perf_counter() - start)
+            self._values_written.inc(written)
 
     @abc.abstractmethod
     def parse_config(self):
@@ -68,6 +293,10 @@ class BaseDriver(metaclass=abc.ABCMeta):
     def stop(self):
         pass
 
+    async def close(self):
+        # releases connections (database pools, ...) after stop(), awaited by the supervisor on restart and shutdown
+        pass
+
     @abc.abstractmethod
     def subscribe(self):
         pass
@@ -0,0 +1,112 @@
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import struct
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any
+
+from core.constants import FILES_PATH
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+COMPILED_CONFIG_VERSION = 1
+COMPILED_CONFIG_ENABLED = os.getenv("COMPILED_CONFIG_ENABLED", "true").lower() == "true"
+COMPILED_CONFIG_DIR = os.getenv("COMPILED_CONFIG_DIR", os.path.join(FILES_PATH, "compiled"))
+
+COMPILED_CONFIG_MAGIC = b"AQCC"
+# magic, format version, sha256 key of the config file the artifact was compiled from
+_HEADER = struct.Struct("<4sH32s")
+
+
+def _get_package_version(name: str) -> str:
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return ""
+
+
+# packages of the plugin whose classes (RouteSpec, MappingModel, ...) and parsers make up the pickled state
+PLUGIN_PACKAGES = ("core", "models", "utilities")
+PLUGIN_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_source_digest: bytes | None = None
+
+
+def get_source_digest() -> bytes:
+    # sha256 of the plugin sources, so an upgrade that changes a pickled type or a parser invalidates artifacts
+    global _source_digest
+    if _source_digest is None:
+        sha256 = hashlib.sha256()
+        for package in PLUGIN_PACKAGES:
+            for directory, directories, files in os.walk(os.path.join(PLUGIN_ROOT, package)):
+                directories.sort()
+                for file_name in sorted(files):
+                    if not file_name.endswith(".py"):
+                        continue
+                    path = os.path.join(directory, file_name)
+                    sha256.update(os.path.relpath(path, PLUGIN_ROOT).encode())
+                    with open(path, "rb") as source_file:
+                        sha256.update(source_file.read())
+        _source_digest = sha256.digest()
+    return _source_digest
+
+
+def get_config_key(config_file_path: str) -> bytes:
+    # the artifact holds pickled models, so it is only valid for the config file, the model libraries and the
+    # plugin sources it was compiled with
+    sha256 = hashlib.sha256()
+    with open(config_file_path, "rb") as config_file:
+        for chunk in iter(lambda: config_file.read(1 << 16), b""):
+            sha256.update(chunk)
+    for package in ("pydantic", "aquacloud_common"):
+        sha256.update(package.encode() + b"=" + _get_package_version(package).encode())
+    sha256.update(get_source_digest())
+    sha256.update(str(COMPILED_CONFIG_VERSION).encode())
+    return sha256.digest()
+
+
+def get_compiled_config_path(config_file_path: str) -> str:
+    return os.path.join(COMPILED_CONFIG_DIR, os.path.basename(config_file_path) + ".bin")
+
+
+# Binary artifact of a parsed driver config: a fixed header followed by the pickled driver state. Unpickling
+# restores the models as they were validated by compile_config.py, without running pydantic validation again.
+def write_compiled_config(config_file_path: str, state: dict[str, Any]) -> str:
+    compiled_config_path = get_compiled_config_path(config_file_path)
+    os.makedirs(os.path.dirname(compiled_config_path), exist_ok=True)
+    header = _HEADER.pack(COMPILED_CONFIG_MAGIC, COMPILED_CONFIG_VERSION, get_config_key(config_file_path))
+    tmp_file_path = compiled_config_path + ".tmp"
+    with open(tmp_file_path, "wb") as compiled_file:
+        compiled_file.write(header)
+        pickle.dump(state, compiled_file, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file_path, compiled_config_path)
+    return compiled_config_path
+
+
+def load_compiled_config(config_file_path: str) -> dict[str, Any] | None:
+    # None when there is no artifact or it was compiled from another version of the config file,
+    # the driver parses the JSON file then
+    if not COMPILED_CONFIG_ENABLED:
+        return None
+    compiled_config_path = get_compiled_config_path(config_file_path)
+    try:
+        with open(compiled_config_path, "rb") as compiled_file:
+            with mmap.mmap(compiled_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, format_version, key = _HEADER.unpack_from(mapped)
+                if magic != COMPILED_CONFIG_MAGIC or format_version != COMPILED_CONFIG_VERSION:
+                    _logger.warning("Ignoring %s, unsupported compiled config format", compiled_config_path)
+                    return None
+                if key != get_config_key(config_file_path):
+                    _logger.warning("Ignoring %s, %s changed since it was compiled", compiled_config_path,
+                                    config_file_path)
+                    return None
+                with memoryview(mapped)[_HEADER.size:] as payload:
+                    return pickle.loads(payload)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        _logger.warning("Cannot load compiled config %s: %s", compiled_config_path, e)
+    return None
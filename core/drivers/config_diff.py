@@ -0,0 +1,83 @@
+from typing import Any, NamedTuple
+
+from aquacloud_common.models.organization.unit import UnitModel
+from aquacloud_common.models.sensor.base_sensor import BaseSensorModel
+from models.mapping_model import MappingModel
+
+
+class KeyDiff(NamedTuple):
+    added: list[str]
+    removed: list[str]
+    changed: list[str]
+
+    def is_empty(self) -> bool:
+        return len(self.added) == 0 and len(self.removed) == 0 and len(self.changed) == 0
+
+
+def diff_keys(old: dict[str, Any], new: dict[str, Any]) -> KeyDiff:
+    return KeyDiff(
+        [key for key in new if key not in old],
+        [key for key in old if key not in new],
+        [key for key in new if key in old and old[key] != new[key]]
+    )
+
+
+class SensorEntry(NamedTuple):
+    unit_id: str
+    model: BaseSensorModel
+
+
+def get_sensor_entries(units: list[UnitModel], sensors: list[BaseSensorModel]) -> dict[str, SensorEntry]:
+    # sensor node identifier -> sensor, "Unit|<unit_id>|Sensor|<name>" or "Sensor|<name>" for site sensors
+    entries = {"Sensor|" + sensor.name: SensorEntry("", sensor) for sensor in sensors}
+    for unit in units:
+        for sensor in unit.sensors:
+            entries["Unit|" + unit.id + "|Sensor|" + sensor.name] = SensorEntry(unit.id, sensor)
+    return entries
+
+
+# difference between the running and the reloaded configuration of a driver. Sensors are compared by model
+# class, a sensor whose type changed has to be created again; mappings are compared record by record
+class ConfigDiff:
+    def __init__(
+            self,
+            units: KeyDiff,
+            sensors: KeyDiff,
+            mapping: KeyDiff,
+            new_sensors: dict[str, SensorEntry]
+    ):
+        self.units: KeyDiff = units
+        self.sensors: KeyDiff = sensors
+        self.mapping: KeyDiff = mapping
+        self.new_sensors: dict[str, SensorEntry] = new_sensors
+
+    @classmethod
+    def create(
+            cls,
+            old_units: list[UnitModel],
+            old_sensors: list[BaseSensorModel],
+            old_mapping: dict[str, list[MappingModel]],
+            new_units: list[UnitModel],
+            new_sensors: list[BaseSensorModel],
+            new_mapping: dict[str, list[MappingModel]]
+    ) -> "ConfigDiff":
+        old_entries = get_sensor_entries(old_units, old_sensors)
+        new_entries = get_sensor_entries(new_units, new_sensors)
+        return cls(
+            diff_keys({unit.id: unit.name for unit in old_units}, {unit.id: unit.name for unit in new_units}),
+            diff_keys(
+                {identifier: entry.model.__class__ for identifier, entry in old_entries.items()},
+                {identifier: entry.model.__class__ for identifier, entry in new_entries.items()}
+            ),
+            diff_keys(old_mapping, new_mapping),
+            new_entries
+        )
+
+    def is_empty(self) -> bool:
+        return self.units.is_empty() and self.sensors.is_empty() and self.mapping.is_empty()
+
+    def __str__(self) -> str:
+        return ", ".join(
+            name + " +" + str(len(diff.added)) + "/-" + str(len(diff.removed)) + "/~" + str(len(diff.changed))
+            for name, diff in (("units", self.units), ("sensors", self.sensors), ("mapping", self.mapping))
+        )
@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Awaitable, Callable
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+# seconds between two checks of the watched config files, 0 disables the hot reload
+CONFIG_RELOAD_INTERVAL = float(os.getenv("CONFIG_RELOAD_INTERVAL", 5))
+
+
+# polls the modification time of the watched files and calls on_change once their content changed and is
+# valid JSON again, so an editor writing the file in several steps does not trigger a reload of a half file
+class ConfigWatcher:
+    def __init__(self, on_change: Callable[[str], Awaitable[None]], interval: float = CONFIG_RELOAD_INTERVAL):
+        self._on_change: Callable[[str], Awaitable[None]] = on_change
+        self._interval: float = interval
+        # path -> modification time and sha1 of the content last reported
+        self._files: dict[str, tuple[float, str]] = {}
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _read(path: str) -> tuple[float, bytes] | None:
+        try:
+            modified = os.stat(path).st_mtime
+            with open(path, "rb") as config_file:
+                return modified, config_file.read()
+        except OSError:
+            return None
+
+    def watch(self, path: str):
+        state = self._read(path)
+        if state is None:
+            self._files[path] = (0.0, "")
+        else:
+            self._files[path] = (state[0], hashlib.sha1(state[1]).hexdigest())
+
+    def start(self):
+        if self._interval <= 0 or self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            for path in list(self._files):
+                try:
+                    await self._check(path)
+                except Exception as e:
+                    _logger.warning("Cannot reload %s: %s", path, e)
+
+    async def _check(self, path: str):
+        modified, digest = self._files[path]
+        try:
+            if os.stat(path).st_mtime == modified:
+                return
+        except OSError:
+            return
+        state = self._read(path)
+        if state is None:
+            return
+        new_digest = hashlib.sha1(state[1]).hexdigest()
+        if new_digest == digest:
+            self._files[path] = (state[0], digest)
+            return
+        try:
+            json.loads(state[1])
+        except ValueError as e:
+            # the file may still be being written, the next write is checked again
+            self._files[path] = (state[0], digest)
+            _logger.warning("Ignoring change of %s, not valid JSON: %s", path, e)
+            return
+        self._files[path] = (state[0], new_digest)
+        await self._on_change(path)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
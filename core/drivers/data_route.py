@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+
+from asyncua import ua
+
+from core.drivers.deadband_filter import DeadbandFilter
+from core.opcua.node_handle import NodeHandle
+from core.opcua.opcua_server import OPCUAServer
+from models.mapping_model import MappingModel
+
+LOCAL_TIMESTAMP = "LocalTimestamp"
+
+
+# runtime form of a MappingModel: everything BaseDriver.on_data_change needs is resolved once,
+# so writing a sample does not build identifier strings or look up nodes
+@dataclass(frozen=True, slots=True)
+class DataRoute:
+    sensor_identifier: str
+    identifier: str
+    measurement: str
+    # node and variant type of its DataType
+    handle: NodeHandle
+    # deadband filter slot, -1 for LocalTimestamp
+    slot: int
+    is_timestamp: bool
+
+    @staticmethod
+    def get_sensor_identifier(mapping_model: MappingModel) -> str:
+        if mapping_model.unit_id != "":
+            return "Unit|" + mapping_model.unit_id + "|Sensor|" + mapping_model.sensor
+        return "Sensor|" + mapping_model.sensor
+
+    @staticmethod
+    def get_measurement_path(measurement: str) -> str:
+        if measurement == "Depth":
+            return "Position.Depth"
+        return measurement
+
+    @classmethod
+    def from_mapping(
+            cls,
+            mapping_model: MappingModel,
+            server: OPCUAServer,
+            deadband_filter: DeadbandFilter
+    ) -> "DataRoute | None":
+        sensor_identifier = cls.get_sensor_identifier(mapping_model)
+        identifier = sensor_identifier + "." + cls.get_measurement_path(mapping_model.measurement)
+        handle = server.get_node_handle(identifier)
+        if handle is None:
+            return None
+        if handle.variant_type is None:
+            # DataType outside the builtin types, fall back to the types the standard uses
+            variant_type = ua.VariantType.String if mapping_model.measurement == LOCAL_TIMESTAMP else ua.VariantType.Float
+            handle = NodeHandle(handle.node, variant_type)
+
+        if mapping_model.measurement == LOCAL_TIMESTAMP:
+            return cls(sensor_identifier, identifier, mapping_model.measurement, handle, -1, True)
+        slot = deadband_filter.get_slot(handle.node.nodeid, mapping_model.measurement)
+        return cls(sensor_identifier, identifier, mapping_model.measurement, handle, slot, False)
@@ -0,0 +1,90 @@
+import os
+from array import array
+
+from asyncua import ua
+
+from models.deadband_model import DeadbandModel
+
+DEADBAND_ENABLED = os.getenv("DEADBAND_ENABLED", "true").lower() == "true"
+# a value is written at least this often (seconds) even if it stays inside its deadband
+DEADBAND_MAX_SILENCE = float(os.getenv("DEADBAND_MAX_SILENCE", 60))
+
+DEFAULT_DEADBAND = DeadbandModel()
+
+
+# Drops samples that stay within the deadband of the last written value of their measurement.
+# Every measurement node gets a slot on first use; the last value, write time and deadband of
+# a slot live in flat arrays so the per sample check is a few array reads.
+class DeadbandFilter:
+    def __init__(self, enabled: bool = DEADBAND_ENABLED, max_silence: float = DEADBAND_MAX_SILENCE):
+        self._enabled: bool = enabled
+        self._default_max_silence: float = max_silence
+        # measurement name -> deadband
+        self._deadbands: dict[str, DeadbandModel] = {}
+        self._slots: dict[ua.NodeId, int] = {}
+        # measurement name of every slot, to apply changed deadbands
+        self._measurements: list[str] = []
+        self._last_values: array = array("d")
+        self._last_times: array = array("d")
+        self._absolute: array = array("d")
+        self._relative: array = array("d")
+        self._max_silence: array = array("d")
+        self.dropped_samples: int = 0
+
+    def set_deadbands(self, deadbands: dict[str, DeadbandModel]):
+        # existing slots keep their last value but take the new deadband of their measurement
+        self._deadbands = deadbands
+        for slot, measurement in enumerate(self._measurements):
+            self._set_slot_deadband(slot, measurement)
+
+    def get_deadbands(self) -> dict[str, DeadbandModel]:
+        return self._deadbands
+
+    def _set_slot_deadband(self, slot: int, measurement: str):
+        deadband = self._deadbands.get(measurement, DEFAULT_DEADBAND)
+        max_silence = deadband.max_silence if deadband.max_silence is not None else self._default_max_silence
+        self._absolute[slot] = deadband.absolute
+        self._relative[slot] = deadband.percent / 100
+        self._max_silence[slot] = max_silence
+
+    def get_slot(self, node_id: ua.NodeId, measurement: str) -> int:
+        slot = self._slots.get(node_id)
+        if slot is None:
+            slot = len(self._last_values)
+            self._slots[node_id] = slot
+            self._measurements.append(measurement)
+            self._last_values.append(float("nan"))
+            self._last_times.append(float("-inf"))
+            self._absolute.append(0.0)
+            self._relative.append(0.0)
+            self._max_silence.append(0.0)
+            self._set_slot_deadband(slot, measurement)
+        return slot
+
+    def reset(self, identifier: str):
+        # forgets the last values of the nodes of a deleted or re-created sensor or unit, so the first
+        # value of the new node is always written
+        for node_id, slot in self._slots.items():
+            node_identifier = node_id.Identifier
+            if isinstance(node_identifier, str) and (
+                    node_identifier == identifier or node_identifier.startswith((identifier + ".", identifier + "|"))
+            ):
+                self._last_values[slot] = float("nan")
+                self._last_times[slot] = float("-inf")
+
+    def accept(self, slot: int, value: float, now: float) -> bool:
+        if not self._enabled:
+            return True
+        if now - self._last_times[slot] < self._max_silence[slot]:
+            last_value = self._last_values[slot]
+            delta = abs(value - last_value)
+            # comparisons with the initial nan are false, so the first value always passes
+            if delta <= self._absolute[slot] or delta <= abs(last_value) * self._relative[slot]:
+                self.dropped_samples += 1
+                return False
+        self._last_values[slot] = value
+        self._last_times[slot] = now
+        return True
+
+    def __len__(self) -> int:
+        return len(self._last_values)
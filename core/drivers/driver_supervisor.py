@@ -0,0 +1,128 @@
+import asyncio
+import importlib
+import json
+import logging
+import os
+
+from core.constants import CONFIG_PATH
+from core.drivers.base_driver import BaseDriver
+from core.drivers.config_watcher import ConfigWatcher
+from core.opcua.opcua_server import OPCUAServer
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+DRIVER_RESTART_MIN_BACKOFF = float(os.getenv("DRIVER_RESTART_MIN_BACKOFF", 1))
+DRIVER_RESTART_MAX_BACKOFF = float(os.getenv("DRIVER_RESTART_MAX_BACKOFF", 60))
+
+# drivers are imported on demand so optional dependencies (pymodbus, aiomysql) are only needed when enabled
+DRIVER_REGISTRY: dict[str, tuple[str, str]] = {
+    "opcua": ("core.drivers.opcua.opcua_driver", "OpcuaDriver"),
+    "feeding": ("core.drivers.feeding_driver", "FeedingDriver"),
+    "environment": ("core.drivers.environment_driver", "EnvironmentDriver"),
+    "modbus": ("core.drivers.modbus.modbus_driver", "ModbusDriver"),
+    "sql": ("core.drivers.sql.sql_driver", "SqlDriver"),
+}
+
+
+def get_enabled_drivers() -> list[str]:
+    # DRIVERS="opcua,feeding" overrides the "drivers" list of plugin_config.json
+    drivers = os.getenv("DRIVERS", "")
+    if drivers != "":
+        return [name.strip() for name in drivers.split(",") if name.strip() != ""]
+
+    try:
+        with open(os.path.join(CONFIG_PATH, "plugin_config.json")) as json_file:
+            return json.load(json_file)["drivers"]
+    except Exception as e:
+        _logger.warning("Cannot read plugin config, starting the opcua driver: %s", e)
+    return ["opcua"]
+
+
+def create_driver(name: str, server: OPCUAServer) -> BaseDriver:
+    module_name, class_name = DRIVER_REGISTRY[name]
+    driver_class = getattr(importlib.import_module(module_name), class_name)
+    return driver_class(server)
+
+
+class DriverSupervisor:
+    def __init__(self, server: OPCUAServer, driver_names: list[str]):
+        self._server: OPCUAServer = server
+        self._driver_names: list[str] = driver_names
+        self._drivers: dict[str, BaseDriver] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._watcher: ConfigWatcher = ConfigWatcher(self._reload)
+        # reloads of several files changed at once are applied one after the other
+        self._reload_lock: asyncio.Lock = asyncio.Lock()
+
+    @property
+    def drivers(self) -> dict[str, BaseDriver]:
+        return self._drivers
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        for name in self._driver_names:
+            if name not in DRIVER_REGISTRY:
+                _logger.warning("Unknown driver %s, available drivers: %s", name, ", ".join(DRIVER_REGISTRY))
+                continue
+            self._tasks.append(loop.create_task(self._supervise(name)))
+        self._watcher.start()
+
+    async def _supervise(self, name: str):
+        # a driver that fails to start is stopped and started again with exponential backoff,
+        # without affecting the other drivers
+        backoff = DRIVER_RESTART_MIN_BACKOFF
+        while True:
+            driver = None
+            try:
+                driver = create_driver(name, self._server)
+                await driver.start()
+                self._drivers[name] = driver
+                if driver.CONFIG_FILE != "":
+                    self._watcher.watch(driver.get_config_path())
+                return
+            except Exception as e:
+                _logger.warning("Driver %s failed to start, restarting in %.0fs: %s", name, backoff, e)
+                if driver is not None:
+                    await self._stop_driver(name, driver)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, DRIVER_RESTART_MAX_BACKOFF)
+
+    async def _reload(self, path: str):
+        # changes of plugin_config.json (the list of enabled drivers) still need a restart
+        async with self._reload_lock:
+            for name, driver in list(self._drivers.items()):
+                if driver.get_config_path() != path:
+                    continue
+                try:
+                    diff = await driver.reload()
+                    _logger.info("Reloaded %s of driver %s: %s", path, name, diff)
+                except ValueError as e:
+                    # the new config was rejected before anything was changed
+                    _logger.warning("Cannot reload driver %s: %s", name, e)
+                except Exception as e:
+                    # the driver may be half reloaded, it is started again from the new config
+                    _logger.warning("Cannot reload driver %s, restarting it: %s", name, e)
+                    await self._stop_driver(name, driver)
+                    del self._drivers[name]
+                    self._tasks.append(asyncio.get_running_loop().create_task(self._supervise(name)))
+
+    @staticmethod
+    async def _stop_driver(name: str, driver: BaseDriver):
+        try:
+            driver.stop()
+        except Exception as e:
+            _logger.warning("Cannot stop driver %s: %s", name, e)
+        try:
+            await driver.close()
+        except Exception as e:
+            _logger.warning("Cannot close driver %s: %s", name, e)
+
+    async def stop(self):
+        self._watcher.stop()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        for name, driver in self._drivers.items():
+            await self._stop_driver(name, driver)
+        self._drivers.clear()
@@ -4,15 +4,9 @@ import logging
 from aquacloud_common.core.core_type import EnvironmentSensorType
 from aquacloud_common.models.organization.unit import UnitModel
 from aquacloud_common.models.sensor.base_sensor import BaseSensorModel
-from aquacloud_common.models.sensor.environment.ftu_sensor import FTUSensorModel
-from aquacloud_common.models.sensor.environment.light_sensor import LightSensorModel
-from aquacloud_common.models.sensor.environment.ntu_sensor import NTUSensorModel
-from aquacloud_common.models.sensor.environment.oxygen_concentration_sensor import OxygenConcentrationSensorModel
-from aquacloud_common.models.sensor.environment.oxygen_saturation_sensor import OxygenSaturationSensorModel
-from aquacloud_common.models.sensor.environment.ph_sensor import PHSensorModel
-from aquacloud_common.models.sensor.environment.salinity_sensor import SalinitySensorModel
-from aquacloud_common.models.sensor.environment.sea_current_sensor import SeaCurrentSensorModel
-from aquacloud_common.models.sensor.environment.temperature_sensor import TemperatureSensorModel
+from core.drivers.sensor_factory import create_sensor_model
+from models.deadband_model import DeadbandModel
+from models.history_model import HistoryModel
 from models.mapping_model import MappingModel
 from models.sensor_model import SensorModel
 
@@ -24,6 +18,8 @@ logging.basicConfig(level=logging.WARNING)
 class EnvironmentConfigurationParser:
     def __init__(self, config_file: str):
         self._config_file = config_file
+        self._history: dict[str, HistoryModel] = {}
+        self._deadbands: dict[str, DeadbandModel] = {}
         self._sensors: list[SensorModel] = []
         self._standard_sensors: list[BaseSensorModel] = []
 
@@ -32,6 +28,14 @@ class EnvironmentConfigurationParser:
             with open(self._config_file) as json_file:
                 config = json.load(json_file)
                 self._sensors = [SensorModel.model_validate(sensor) for sensor in config["sensors"]]
+                self._history = {
+                    sensor_type: HistoryModel.model_validate(history)
+                    for sensor_type, history in config.get("history", {}).items()
+                }
+                self._deadbands = {
+                    measurement: DeadbandModel.model_validate(deadband)
+                    for measurement, deadband in config.get("deadband", {}).items()
+                }
         except Exception as e:
             _logger.warning("Configuration file not found on disk!", e)
 
@@ -54,82 +58,27 @@ class EnvironmentConfigurationParser:
 
         return [units[key] for key in units]
 
+    def get_history(self) -> dict[str, HistoryModel]:
+        return self._history
+
+    def get_deadbands(self) -> dict[str, DeadbandModel]:
+        return self._deadbands
+
     def get_standard_sensors(self) -> list[BaseSensorModel]:
         return self._standard_sensors
 
+    def get_poll_intervals(self) -> dict[str, float]:
+        intervals: dict[str, float] = {}
+        for sensor in self._sensors:
+            if sensor.poll_interval is None:
+                continue
+            interval = intervals.get(sensor.unit_id, sensor.poll_interval)
+            intervals[sensor.unit_id] = min(interval, sensor.poll_interval)
+        return intervals
+
     @staticmethod
     def _create_standard_sensor(sensor: SensorModel) -> BaseSensorModel:
-        model: BaseSensorModel = BaseSensorModel()
-
-        depth = "dynamic_depth"
-        if sensor.depth is not None:
-            model.position.depth = sensor.depth
-            depth = str(int(sensor.depth)) + "m"
-
-        namespace_uri = "http://www.opcfoundation.org/UA/units/un/cefact"
-        if sensor.sensor_type == EnvironmentSensorType.OXYGEN_SATURATION:
-            model = OxygenSaturationSensorModel()
-            model.name = "OxygenSaturation_" + depth
-            model.oxygen_saturation.engineering_units.namespace_uri = namespace_uri
-            model.oxygen_saturation.engineering_units.display_name = "%"
-            model.oxygen_saturation.engineering_units.description = "Percentage"
-        elif sensor.sensor_type == EnvironmentSensorType.OXYGEN_CONCENTRATION:
-            model = OxygenConcentrationSensorModel()
-            model.name = "OxygenConcentration_" + depth
-            model.oxygen_concentration.engineering_units.namespace_uri = namespace_uri
-            model.oxygen_concentration.engineering_units.display_name = "mg/l"
-            model.oxygen_concentration.engineering_units.description = "Milligram per liter"
-            model.salinity.engineering_units.namespace_uri = namespace_uri
-            model.salinity.engineering_units.display_name = "ppt"
-            model.salinity.engineering_units.description = "Parts per thousand"
-        elif sensor.sensor_type == EnvironmentSensorType.TEMPERATURE:
-            model = TemperatureSensorModel()
-            model.name = "Temperature_" + depth
-            model.temperature.engineering_units.namespace_uri = namespace_uri
-            model.temperature.engineering_units.display_name = "C°"
-            model.temperature.engineering_units.description = "Celsius"
-        elif sensor.sensor_type == EnvironmentSensorType.SALINITY:
-            model = SalinitySensorModel()
-            model.name = "Salinity_" + depth
-            model.salinity.engineering_units.namespace_uri = namespace_uri
-            model.salinity.engineering_units.display_name = "ppt"
-            model.salinity.engineering_units.description = "Parts per thousand"
-        elif sensor.sensor_type == EnvironmentSensorType.SEA_CURRENT:
-            model = SeaCurrentSensorModel()
-            model.name = "SeaCurrent_" + depth
-            model.direction.engineering_units.namespace_uri = namespace_uri
-            model.direction.engineering_units.display_name = "Absolute North"
-            model.direction.engineering_units.description = "Absolute direction in degrees"
-
-            model.speed.engineering_units.namespace_uri = namespace_uri
-            model.speed.engineering_units.display_name = "cm/s"
-            model.speed.engineering_units.description = "Centimeter per second"
-        elif sensor.sensor_type == EnvironmentSensorType.NTU:
-            model = NTUSensorModel()
-            model.name = "NTU_" + depth
-            model.ntu.engineering_units.namespace_uri = namespace_uri
-            model.ntu.engineering_units.display_name = "NTU"
-            model.ntu.engineering_units.description = "Nephelometric Turbidity Units"
-        elif sensor.sensor_type == EnvironmentSensorType.FTU:
-            model = FTUSensorModel()
-            model.name = "FTU_" + depth
-            model.ftu.engineering_units.namespace_uri = namespace_uri
-            model.ftu.engineering_units.display_name = "FTU"
-            model.ftu.engineering_units.description = "Formazin Turbidity Units"
-        elif sensor.sensor_type == EnvironmentSensorType.PH:
-            model = PHSensorModel()
-            model.name = "PH_" + depth
-            model.ph.engineering_units.namespace_uri = namespace_uri
-            model.ph.engineering_units.display_name = "pH"
-            model.ph.engineering_units.description = "pH"
-        elif sensor.sensor_type == EnvironmentSensorType.LIGHT:
-            model = LightSensorModel()
-            model.name = "Light_" + depth
-            model.lux.engineering_units.namespace_uri = namespace_uri
-            model.lux.engineering_units.display_name = "lux"
-            model.lux.engineering_units.description = "Lumen per square meter"
-
-        return model
+        return create_sensor_model(sensor.sensor_type, EnvironmentConfigurationParser.get_sensor_name(sensor))
 
     @staticmethod
     def get_sensor_name(sensor: SensorModel):
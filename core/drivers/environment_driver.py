@@ -1,7 +1,6 @@
-import asyncio
+import functools
 import os
 import random
-import threading
 import time
 from datetime import datetime
 
@@ -16,21 +15,31 @@ from aquacloud_common.models.sensor.environment.ph_sensor import PHSensorModel
 from aquacloud_common.models.sensor.environment.salinity_sensor import SalinitySensorModel
 from aquacloud_common.models.sensor.environment.sea_current_sensor import SeaCurrentSensorModel
 from aquacloud_common.models.sensor.environment.temperature_sensor import TemperatureSensorModel
-from core.constants import CONFIG_PATH
 from core.drivers.base_driver import BaseDriver
 from core.drivers.environment_config_parser import EnvironmentConfigurationParser
+from core.opcua.opcua_server import OPCUAServer
 
 POLL_TIME_INTERVAL = int(os.getenv("TIME_INTERVAL", 3))
 
 
 class EnvironmentDriver(BaseDriver):
+    CONFIG_FILE = "env_config.json"
+    CONFIG_ATTRIBUTES = ("units", "mapping", "sensors", "_poll_intervals", "history")
+
+    def __init__(self, server: OPCUAServer):
+        super().__init__(server)
+        self._poll_intervals: dict[str, float] = {}
+
     def parse_config(self):
-        config_path_file = os.path.join(CONFIG_PATH, "env_config.json")
+        config_path_file = self.get_config_path()
         config_parser = EnvironmentConfigurationParser(config_path_file)
         config_parser.parse_config_file()
         self.units = config_parser.create_units()
         self.mapping = config_parser.create_mapping()
         self.sensors = config_parser.get_standard_sensors()
+        self._poll_intervals = config_parser.get_poll_intervals()
+        self.history = config_parser.get_history()
+        self.deadband_filter.set_deadbands(config_parser.get_deadbands())
 
     async def _notify_data_change(self, sensor: BaseSensorModel, timestamp: str, unit_id: str = ""):
         prefix_tag = "site" + ":" + "site_001"
@@ -108,30 +117,40 @@ class EnvironmentDriver(BaseDriver):
                         tag = "site:depth" + ":" + m.sensor
                     await self.on_data_change(tag, depth, timestamp)
 
-    async def _poll_data(self):
+    @staticmethod
+    def _get_timestamp() -> str:
         timestamp = time.time()
         timestamp = datetime.fromtimestamp(timestamp)
-        timestamp = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        return timestamp.strftime("%Y-%m-%d %H:%M:%S")
+
+    async def _poll_site_data(self):
+        timestamp = self._get_timestamp()
         await self._simulate_site_env_sensor_data(timestamp)
         await self._simulate_sensor_depth_data(timestamp)
-        for unit in self.units:
-            await self._simulate_unit_env_sensor_data(unit, timestamp)
+        await self.commit_data_changes()
+
+    async def _poll_unit_data(self, unit: UnitModel):
+        await self._simulate_unit_env_sensor_data(unit, self._get_timestamp())
+        await self.commit_data_changes()
 
     async def subscribe(self):
-        while self.is_starting is True:
-            await self._poll_data()
-            time.sleep(POLL_TIME_INTERVAL)
+        self.scheduler.schedule(self._poll_site_data, self._poll_intervals.get("", POLL_TIME_INTERVAL), label="site")
+        for unit in self.units:
+            interval = self._poll_intervals.get(unit.id, POLL_TIME_INTERVAL)
+            self.scheduler.schedule(functools.partial(self._poll_unit_data, unit), interval, label=unit.id)
 
     async def start(self):
         self.is_starting = True
-        self.parse_config()
-        await self.create_unit_nodes()
-        await self.create_sensors()
-
-        worker_thread = threading.Thread(target=asyncio.run, args=(self.subscribe(),))
-        worker_thread.start()
-
-        # asyncio.get_event_loop().create_task(self.subscribe())
+        with self.startup_timer.phase("parse_config"):
+            self.load_config()
+        self.configure_history()
+        with self.startup_timer.phase("create_unit_nodes"):
+            await self.create_unit_nodes()
+        with self.startup_timer.phase("create_sensors"):
+            await self.create_sensors()
+        self.startup_timer.report()
+        await self.subscribe()
 
     def stop(self):
         self.is_starting = False
+        self.scheduler.stop()
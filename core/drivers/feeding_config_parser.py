@@ -1,13 +1,11 @@
 import json
 import logging
 
-from aquacloud_common.core.core_type import FeedingSensorType
 from aquacloud_common.models.organization.unit import UnitModel
 from aquacloud_common.models.sensor.base_sensor import BaseSensorModel
-from aquacloud_common.models.sensor.feeding.calculated_accumulated_feeding_sensor import \
-    CalculatedAccumulatedFeedingSensorModel
-from aquacloud_common.models.sensor.feeding.feed_silo_sensor import FeedSiloSensorModel
-from aquacloud_common.models.sensor.feeding.feeding_intensity_sensor import FeedingIntensitySensorModel
+from core.drivers.sensor_factory import CALCULATED_ACCUMULATED_FEEDING_SENSOR, FEEDING_SENSORS, create_sensor_model
+from models.deadband_model import DeadbandModel
+from models.history_model import HistoryModel
 from models.mapping_model import MappingModel
 from models.sensor_model import SensorModel
 
@@ -18,6 +16,8 @@ logging.basicConfig(level=logging.WARNING)
 class FeedingConfigurationParser:
     def __init__(self, config_file: str):
         self._config_file = config_file
+        self._history: dict[str, HistoryModel] = {}
+        self._deadbands: dict[str, DeadbandModel] = {}
         self._sensors: list[SensorModel] = []
 
     def parse_config_file(self):
@@ -25,6 +25,14 @@ class FeedingConfigurationParser:
             with open(self._config_file) as json_file:
                 config = json.load(json_file)
                 self._sensors = [SensorModel.model_validate(sensor) for sensor in config["sensors"]]
+                self._history = {
+                    sensor_type: HistoryModel.model_validate(history)
+                    for sensor_type, history in config.get("history", {}).items()
+                }
+                self._deadbands = {
+                    measurement: DeadbandModel.model_validate(deadband)
+                    for measurement, deadband in config.get("deadband", {}).items()
+                }
         except Exception as e:
             _logger.warning("Configuration file not found on disk!", e)
 
@@ -44,39 +52,24 @@ class FeedingConfigurationParser:
 
         return [units[key] for key in units]
 
+    def get_history(self) -> dict[str, HistoryModel]:
+        return self._history
+
+    def get_deadbands(self) -> dict[str, DeadbandModel]:
+        return self._deadbands
+
+    def get_poll_intervals(self) -> dict[str, float]:
+        intervals: dict[str, float] = {}
+        for sensor in self._sensors:
+            if sensor.poll_interval is None:
+                continue
+            interval = intervals.get(sensor.unit_id, sensor.poll_interval)
+            intervals[sensor.unit_id] = min(interval, sensor.poll_interval)
+        return intervals
+
     @staticmethod
     def _create_standard_sensor(sensor: SensorModel) -> BaseSensorModel:
-        namespace_uri = "http://www.opcfoundation.org/UA/units/un/cefact"
-        if sensor.sensor_type == FeedingSensorType.FEEDING_INTENSITY:
-            model = FeedingIntensitySensorModel()
-            model.feeding_intensity.engineering_units.namespace_uri = namespace_uri
-            model.feeding_intensity.engineering_units.display_name = "g/s"
-            model.feeding_intensity.engineering_units.description = "Gram per second"
-        elif sensor.sensor_type == FeedingSensorType.FEED_SILO:
-            model = FeedSiloSensorModel()
-            model.feed.engineering_units.namespace_uri = namespace_uri
-            model.feed.engineering_units.display_name = "kg"
-            model.feed.engineering_units.description = "Kilogram"
-            model.silo_capacity.engineering_units.namespace_uri = namespace_uri
-            model.silo_capacity.engineering_units.display_name = "kg"
-            model.silo_capacity.engineering_units.description = "Kilogram"
-            model.fill_percentage.engineering_units.namespace_uri = namespace_uri
-            model.fill_percentage.engineering_units.display_name = "%"
-            model.fill_percentage.engineering_units.description = "Percentage"
-        else:
-            model = CalculatedAccumulatedFeedingSensorModel()
-            model.fed_amount.engineering_units.namespace_uri = namespace_uri
-            model.fed_amount.engineering_units.display_name = ""
-            model.fed_amount.engineering_units.description = ""
-
-        model.feed_type.pellet_size.engineering_units.namespace_uri = namespace_uri
-        model.feed_type.pellet_size.engineering_units.display_name = "mm"
-        model.feed_type.pellet_size.engineering_units.description = "Millimeter"
-        model.feed_type.mass_per_pellet.engineering_units.namespace_uri = namespace_uri
-        model.feed_type.mass_per_pellet.engineering_units.display_name = "g"
-        model.feed_type.mass_per_pellet.engineering_units.description = "Gram"
-
-        return model
+        return create_sensor_model(sensor.sensor_type, None, FEEDING_SENSORS, CALCULATED_ACCUMULATED_FEEDING_SENSOR)
 
     def create_mapping(self) -> dict[str, list[MappingModel]]:
         mapping: dict[str, list[MappingModel]] = {}
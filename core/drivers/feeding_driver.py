@@ -1,8 +1,7 @@
-import asyncio
+import functools
 import logging
 import os
 import random
-import threading
 import time
 from datetime import datetime
 
@@ -11,9 +10,9 @@ from aquacloud_common.models.sensor.feeding.calculated_accumulated_feeding_senso
     CalculatedAccumulatedFeedingSensorModel
 from aquacloud_common.models.sensor.feeding.feed_silo_sensor import FeedSiloSensorModel
 from aquacloud_common.models.sensor.feeding.feeding_intensity_sensor import FeedingIntensitySensorModel
-from core.constants import CONFIG_PATH
 from core.drivers.base_driver import BaseDriver
 from core.drivers.feeding_config_parser import FeedingConfigurationParser
+from core.opcua.opcua_server import OPCUAServer
 
 
 _logger = logging.getLogger(__name__)
@@ -24,12 +23,22 @@ POLL_TIME_INTERVAL = int(os.getenv("TIME_INTERVAL", 3))
 
 
 class FeedingDriver(BaseDriver):
+    CONFIG_FILE = "feeding_config.json"
+    CONFIG_ATTRIBUTES = ("units", "mapping", "_poll_intervals", "history")
+
+    def __init__(self, server: OPCUAServer):
+        super().__init__(server)
+        self._poll_intervals: dict[str, float] = {}
+
     def parse_config(self):
-        config_path_file = os.path.join(CONFIG_PATH, "feeding_config.json")
+        config_path_file = self.get_config_path()
         config_parser = FeedingConfigurationParser(config_path_file)
         config_parser.parse_config_file()
         self.units = config_parser.create_units()
         self.mapping = config_parser.create_mapping()
+        self._poll_intervals = config_parser.get_poll_intervals()
+        self.history = config_parser.get_history()
+        self.deadband_filter.set_deadbands(config_parser.get_deadbands())
 
     async def _simulate_unit_feeding_sensor_data(self, unit: UnitModel):
         timestamp = time.time()
@@ -58,24 +67,25 @@ class FeedingDriver(BaseDriver):
             timestamp_tag = unit.id + ":" + "local_timestamp" + ":" + sensor.name
             await self.on_data_change(timestamp_tag, timestamp, timestamp)
 
-    async def _poll_data(self):
-        for unit in self.units:
-            await self._simulate_unit_feeding_sensor_data(unit)
+    async def _poll_unit_data(self, unit: UnitModel):
+        await self._simulate_unit_feeding_sensor_data(unit)
+        await self.commit_data_changes()
 
     async def subscribe(self):
-        while self.is_starting is True:
-            await self._poll_data()
-            time.sleep(POLL_TIME_INTERVAL)
+        for unit in self.units:
+            interval = self._poll_intervals.get(unit.id, POLL_TIME_INTERVAL)
+            self.scheduler.schedule(functools.partial(self._poll_unit_data, unit), interval, label=unit.id)
 
     async def start(self):
         self.is_starting = True
-        self.parse_config()
-        await self.create_unit_nodes()
-
-        worker_thread = threading.Thread(target=asyncio.run, args=(self.subscribe(),))
-        worker_thread.start()
-
-        # asyncio.get_event_loop().create_task(self.subscribe())
+        with self.startup_timer.phase("parse_config"):
+            self.load_config()
+        self.configure_history()
+        with self.startup_timer.phase("create_unit_nodes"):
+            await self.create_unit_nodes()
+        self.startup_timer.report()
+        await self.subscribe()
 
     def stop(self):
         self.is_starting = False
+        self.scheduler.stop()
@@ -0,0 +1,132 @@
+import json
+import logging
+
+from aquacloud_common.models.organization.unit import UnitModel
+from aquacloud_common.models.sensor.base_sensor import BaseSensorModel
+from core.drivers.modbus.read_plan import ReadPlan, plan_register_blocks
+from core.drivers.modbus.slave_model import SlaveModel
+from core.drivers.sensor_factory import create_sensor_model
+from models.deadband_model import DeadbandModel
+from models.history_model import HistoryModel
+from models.mapping_model import MappingModel
+from models.sensor_model import ModbusSensorModel, RegisterModel
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+
+class ModbusConfigurationParser:
+    def __init__(self, config_file: str):
+        self._config_file = config_file
+        self._history: dict[str, HistoryModel] = {}
+        self._deadbands: dict[str, DeadbandModel] = {}
+        self._sensors: list[ModbusSensorModel] = []
+        self._slaves: list[SlaveModel] = []
+        self._standard_sensors: list[BaseSensorModel] = []
+
+    def parse_config_file(self):
+        try:
+            with open(self._config_file) as json_file:
+                config = json.load(json_file)
+                self._slaves = [SlaveModel.model_validate(slave) for slave in config["slaves"]]
+                self._sensors = [ModbusSensorModel.model_validate(sensor) for sensor in config["sensors"]]
+                self._history = {
+                    sensor_type: HistoryModel.model_validate(history)
+                    for sensor_type, history in config.get("history", {}).items()
+                }
+                self._deadbands = {
+                    measurement: DeadbandModel.model_validate(deadband)
+                    for measurement, deadband in config.get("deadband", {}).items()
+                }
+        except Exception as e:
+            _logger.warning("Configuration file not found on disk!", e)
+
+    def create_units(self) -> list[UnitModel]:
+        units: dict[str, UnitModel] = {}
+        for sensor in self._sensors:
+            standard_sensor = create_sensor_model(sensor.sensor_type, sensor.sensor_name)
+
+            if sensor.type == "site":
+                self._standard_sensors.append(standard_sensor)
+            else:
+                unit_id = sensor.unit_id
+                if sensor.unit_id not in units:
+                    unit = UnitModel(
+                        id=unit_id,
+                        name=unit_id
+                    )
+                    units[unit_id] = unit
+                units[unit_id].sensors.append(standard_sensor)
+
+        return [units[key] for key in units]
+
+    def get_history(self) -> dict[str, HistoryModel]:
+        return self._history
+
+    def get_deadbands(self) -> dict[str, DeadbandModel]:
+        return self._deadbands
+
+    def get_standard_sensors(self) -> list[BaseSensorModel]:
+        return self._standard_sensors
+
+    def get_slaves(self) -> list[SlaveModel]:
+        return self._slaves
+
+    @staticmethod
+    def _get_tag_prefix(sensor: ModbusSensorModel) -> str:
+        if sensor.type == "site":
+            return "site"
+        return sensor.unit_id
+
+    @staticmethod
+    def get_register_tag(sensor: ModbusSensorModel, register: RegisterModel) -> str:
+        return ModbusConfigurationParser._get_tag_prefix(sensor) + ":" + sensor.slave_id + "_" \
+            + str(register.function) + "_" + str(register.address) + ":" + sensor.sensor_name
+
+    @staticmethod
+    def get_timestamp_tag(sensor: ModbusSensorModel) -> str:
+        return ModbusConfigurationParser._get_tag_prefix(sensor) + ":" + "local_timestamp" + ":" + sensor.sensor_name
+
+    def create_mapping(self) -> dict[str, list[MappingModel]]:
+        mapping: dict[str, list[MappingModel]] = {}
+        for sensor in self._sensors:
+            for key in sensor.mapping:
+                mapping_key = self.get_register_tag(sensor, sensor.mapping[key])
+                mapping_model = MappingModel(
+                    unit_id=sensor.unit_id,
+                    sensor=sensor.sensor_name,
+                    measurement=key
+                )
+
+                if mapping_key not in mapping:
+                    mapping[mapping_key] = []
+
+                mapping[mapping_key].append(mapping_model)
+
+            # make default timestamp mapping
+            mapping[self.get_timestamp_tag(sensor)] = [
+                MappingModel(
+                    unit_id=sensor.unit_id,
+                    sensor=sensor.sensor_name,
+                    measurement="LocalTimestamp"
+                )
+            ]
+
+        return mapping
+
+    def create_read_plans(self) -> dict[str, ReadPlan]:
+        registers: dict[str, dict[str, RegisterModel]] = {slave.slave_id: {} for slave in self._slaves}
+        timestamp_tags: dict[str, list[str]] = {slave.slave_id: [] for slave in self._slaves}
+        for sensor in self._sensors:
+            if sensor.slave_id not in registers:
+                _logger.warning("Sensor %s refers to unknown slave %s", sensor.sensor_name, sensor.slave_id)
+                continue
+            for key in sensor.mapping:
+                register = sensor.mapping[key]
+                registers[sensor.slave_id][self.get_register_tag(sensor, register)] = register
+            timestamp_tags[sensor.slave_id].append(self.get_timestamp_tag(sensor))
+
+        return {
+            slave_id: ReadPlan(plan_register_blocks(list(registers[slave_id].items())), timestamp_tags[slave_id])
+            for slave_id in registers
+        }
@@ -0,0 +1,132 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from datetime import datetime
+
+from pymodbus.client import AsyncModbusTcpClient
+
+from core.drivers.base_driver import BaseDriver
+from core.drivers.config_diff import ConfigDiff
+from core.drivers.modbus.modbus_config_parser import ModbusConfigurationParser
+from core.drivers.modbus.read_plan import ReadPlan, RegisterBlock
+from core.drivers.modbus.slave_model import SlaveModel
+from core.opcua.opcua_server import OPCUAServer
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+POLL_TIME_INTERVAL = int(os.getenv("TIME_INTERVAL", 3))
+
+
+class ModbusDriver(BaseDriver):
+    CONFIG_FILE = "modbus_config.json"
+    CONFIG_ATTRIBUTES = ("units", "sensors", "mapping", "_slaves", "_read_plans", "history")
+
+    def __init__(self, server: OPCUAServer):
+        super().__init__(server)
+        self._slaves: list[SlaveModel] = []
+        self._read_plans: dict[str, ReadPlan] = {}
+        # slaves behind the same gateway share one connection; requests on it are serialized
+        self._clients: dict[tuple[str, int], AsyncModbusTcpClient] = {}
+        self._client_locks: dict[tuple[str, int], asyncio.Lock] = {}
+
+    def parse_config(self):
+        config_path_file = self.get_config_path()
+        config_parser = ModbusConfigurationParser(config_path_file)
+        config_parser.parse_config_file()
+        self.units = config_parser.create_units()
+        self.sensors = config_parser.get_standard_sensors()
+        self.mapping = config_parser.create_mapping()
+        self._slaves = config_parser.get_slaves()
+        self._read_plans = config_parser.create_read_plans()
+        self.history = config_parser.get_history()
+        self.deadband_filter.set_deadbands(config_parser.get_deadbands())
+
+    def _get_client_lock(self, slave: SlaveModel) -> asyncio.Lock:
+        key = (slave.host, slave.port)
+        lock = self._client_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._client_locks[key] = lock
+        return lock
+
+    async def _get_client(self, slave: SlaveModel) -> AsyncModbusTcpClient:
+        # called with the lock of the gateway held, so slaves behind one gateway don't connect its client twice
+        key = (slave.host, slave.port)
+        client = self._clients.get(key)
+        if client is None:
+            client = AsyncModbusTcpClient(slave.host, port=slave.port, timeout=slave.timeout)
+            self._clients[key] = client
+        if not client.connected:
+            await client.connect()
+        return client
+
+    @staticmethod
+    async def _read_block(client: AsyncModbusTcpClient, slave: SlaveModel, block: RegisterBlock) -> list[int] | None:
+        if block.function == 4:
+            response = await client.read_input_registers(block.address, count=block.count, slave=slave.unit)
+        else:
+            response = await client.read_holding_registers(block.address, count=block.count, slave=slave.unit)
+        if response.isError():
+            _logger.warning("Cannot read %s registers at %s from slave %s: %s",
+                            block.count, block.address, slave.slave_id, response)
+            return None
+        return response.registers
+
+    async def _poll_slave_data(self, slave: SlaveModel):
+        read_plan = self._read_plans.get(slave.slave_id)
+        if read_plan is None or len(read_plan.blocks) == 0:
+            return
+
+        timestamp = time.time()
+        timestamp = datetime.fromtimestamp(timestamp)
+        timestamp = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+
+        async with self._get_client_lock(slave):
+            client = await self._get_client(slave)
+            for block in read_plan.blocks:
+                words = await self._read_block(client, slave, block)
+                if words is None:
+                    continue
+                for tag, value in block.decode(words):
+                    await self.on_data_change(tag, value, timestamp)
+
+        for timestamp_tag in read_plan.timestamp_tags:
+            await self.on_data_change(timestamp_tag, timestamp, timestamp)
+        await self.commit_data_changes()
+
+    async def subscribe(self):
+        for slave in self._slaves:
+            interval = slave.poll_interval if slave.poll_interval is not None else POLL_TIME_INTERVAL
+            self.scheduler.schedule(functools.partial(self._poll_slave_data, slave), interval, label=slave.slave_id)
+
+    async def start(self):
+        self.is_starting = True
+        with self.startup_timer.phase("parse_config"):
+            self.load_config()
+        self.configure_history()
+        with self.startup_timer.phase("create_unit_nodes"):
+            await self.create_unit_nodes()
+        with self.startup_timer.phase("create_sensors"):
+            await self.create_sensors()
+        self.startup_timer.report()
+        await self.subscribe()
+
+    async def reload(self) -> ConfigDiff:
+        diff = await super().reload()
+        # connections to gateways no slave uses anymore are closed
+        gateways = {(slave.host, slave.port) for slave in self._slaves}
+        for key in [key for key in self._clients if key not in gateways]:
+            self._clients.pop(key).close()
+            self._client_locks.pop(key, None)
+        return diff
+
+    def stop(self):
+        self.is_starting = False
+        self.scheduler.stop()
+        for client in self._clients.values():
+            client.close()
+        self._clients.clear()
+        self._client_locks.clear()
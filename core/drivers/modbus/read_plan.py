@@ -0,0 +1,69 @@
+import os
+import struct
+
+from models.sensor_model import RegisterModel
+
+# registers between two mapped addresses that may be read and thrown away to save a request
+MAX_REGISTER_GAP = int(os.getenv("MODBUS_MAX_REGISTER_GAP", 8))
+# function 3/4 can return at most 125 registers per request
+MAX_REGISTER_COUNT = 125
+
+REGISTER_FORMATS: dict[str, tuple[str, int]] = {
+    "int16": ("h", 1),
+    "uint16": ("H", 1),
+    "int32": ("i", 2),
+    "uint32": ("I", 2),
+    "float32": ("f", 2),
+}
+
+
+class RegisterBlock:
+    __slots__ = ("function", "address", "count", "registers")
+
+    def __init__(self, function: int, address: int, count: int):
+        self.function: int = function
+        self.address: int = address
+        self.count: int = count
+        self.registers: list[tuple[str, RegisterModel]] = []
+
+    def decode(self, words: list[int]) -> list[tuple[str, float]]:
+        buffer = struct.pack(">" + str(len(words)) + "H", *words)
+        values = []
+        for tag, register in self.registers:
+            fmt, size = REGISTER_FORMATS[register.data_type]
+            start = (register.address - self.address) * 2
+            if register.word_order == "little" and size > 1:
+                raw = buffer[start + 2:start + 4] + buffer[start:start + 2]
+                value = struct.unpack(">" + fmt, raw)[0]
+            else:
+                value = struct.unpack_from(">" + fmt, buffer, start)[0]
+            values.append((tag, value * register.scale + register.offset))
+        return values
+
+
+class ReadPlan:
+    def __init__(self, blocks: list[RegisterBlock], timestamp_tags: list[str]):
+        self.blocks: list[RegisterBlock] = blocks
+        self.timestamp_tags: list[str] = timestamp_tags
+
+
+def plan_register_blocks(
+        registers: list[tuple[str, RegisterModel]],
+        max_gap: int = MAX_REGISTER_GAP,
+        max_count: int = MAX_REGISTER_COUNT
+) -> list[RegisterBlock]:
+    blocks: list[RegisterBlock] = []
+    block: RegisterBlock | None = None
+    for tag, register in sorted(registers, key=lambda r: (r[1].function, r[1].address)):
+        size = REGISTER_FORMATS[register.data_type][1]
+        end = register.address + size
+        if block is not None \
+                and block.function == register.function \
+                and register.address <= block.address + block.count + max_gap \
+                and end - block.address <= max_count:
+            block.count = max(block.count, end - block.address)
+        else:
+            block = RegisterBlock(register.function, register.address, size)
+            blocks.append(block)
+        block.registers.append((tag, register))
+    return blocks
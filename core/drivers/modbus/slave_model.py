@@ -0,0 +1,12 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class SlaveModel(BaseModel):
+    slave_id: str
+    host: str
+    port: Optional[int] = 502
+    unit: Optional[int] = 1
+    timeout: Optional[float] = 3
+    poll_interval: Optional[float] = Field(default=None, gt=0)
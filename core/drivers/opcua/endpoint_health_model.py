@@ -0,0 +1,17 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class EndpointHealthModel(BaseModel):
+    unit_id: Optional[str] = ""
+    endpoint: str
+    state: Literal["connecting", "connected", "disconnected"] = "connecting"
+    # epoch seconds of the last successful (re)connect
+    connected_since: Optional[float] = None
+    last_error: Optional[str] = None
+    consecutive_failures: int = 0
+    reconnects: int = 0
+    # subscriptions that were resumed on a new session instead of being created again
+    transferred_subscriptions: int = 0
+    republished_messages: int = 0
@@ -1,20 +1,12 @@
 import json
 import logging
 
-from aquacloud_common.core.core_type import EnvironmentSensorType
 from aquacloud_common.models.organization.unit import UnitModel
 from aquacloud_common.models.sensor.base_sensor import BaseSensorModel
-from aquacloud_common.models.sensor.environment.co2_sensor import CO2SensorModel
-from aquacloud_common.models.sensor.environment.ftu_sensor import FTUSensorModel
-from aquacloud_common.models.sensor.environment.light_sensor import LightSensorModel
-from aquacloud_common.models.sensor.environment.ntu_sensor import NTUSensorModel
-from aquacloud_common.models.sensor.environment.oxygen_concentration_sensor import OxygenConcentrationSensorModel
-from aquacloud_common.models.sensor.environment.oxygen_saturation_sensor import OxygenSaturationSensorModel
-from aquacloud_common.models.sensor.environment.ph_sensor import PHSensorModel
-from aquacloud_common.models.sensor.environment.salinity_sensor import SalinitySensorModel
-from aquacloud_common.models.sensor.environment.sea_current_sensor import SeaCurrentSensorModel
-from aquacloud_common.models.sensor.environment.temperature_sensor import TemperatureSensorModel
 from core.drivers.opcua.server_model import ServerModel
+from core.drivers.sensor_factory import create_sensor_model
+from models.deadband_model import DeadbandModel
+from models.history_model import HistoryModel
 from models.mapping_model import MappingModel
 from models.sensor_model import OpcSensorModel
 
@@ -25,146 +17,125 @@ logging.basicConfig(level=logging.WARNING)
 class OpcuaConfigurationParser:
     def __init__(self, config_file: str):
         self._config_file = config_file
+        self._history: dict[str, HistoryModel] = {}
+        self._deadbands: dict[str, DeadbandModel] = {}
+        # site wide sensor templates, a unit with its own "sensors" list uses those instead
         self._sensors: list[OpcSensorModel] = []
+        self._unit_sensors: dict[str, list[OpcSensorModel]] = {}
         self._server: list[ServerModel] = []
-        self._standard_sensors: list[BaseSensorModel] = []
-        self._units: list[UnitModel] = []
+        # units that list the same endpoint and user share the session of the first of them
+        self._endpoint_servers: list[ServerModel] = []
+        self._unit_sources: dict[str, str] = {}
+        # standard sensor models are only created when they are requested
+        self._standard_sensors: list[BaseSensorModel] | None = None
+        self._units: list[UnitModel] | None = None
 
     def parse_config_file(self):
         try:
             with open(self._config_file) as json_file:
                 config = json.load(json_file)
-                sensors = config["sensors"]
-                for s in sensors:
-                    sensor = OpcSensorModel.model_validate(s)
-                    self._sensors.append(sensor)
-                    standard_sensor = self._create_standard_sensor(sensor)
-                    self._standard_sensors.append(standard_sensor)
-
+                self._history = {
+                    sensor_type: HistoryModel.model_validate(history)
+                    for sensor_type, history in config.get("history", {}).items()
+                }
+                self._deadbands = {
+                    measurement: DeadbandModel.model_validate(deadband)
+                    for measurement, deadband in config.get("deadband", {}).items()
+                }
+                self._sensors = [OpcSensorModel.model_validate(s) for s in config.get("sensors", [])]
+
+                endpoint_servers: dict[tuple[str, str], ServerModel] = {}
                 for unit in config["units"]:
                     server = ServerModel.model_validate(unit["server"])
                     server.unit_id = unit["unit_id"]
                     self._server.append(server)
 
-                    unit = UnitModel(
-                        id=unit["unit_id"],
-                        name=unit["unit_id"]
-                    )
+                    endpoint_key = (server.endpoint, server.username)
+                    if endpoint_key not in endpoint_servers:
+                        endpoint_servers[endpoint_key] = server
+                        self._endpoint_servers.append(server)
+                    self._unit_sources[server.unit_id] = endpoint_servers[endpoint_key].unit_id
 
-                    unit.sensors = self._standard_sensors
-                    self._units.append(unit)
+                    if "sensors" in unit:
+                        self._unit_sensors[server.unit_id] = [
+                            OpcSensorModel.model_validate(s) for s in unit["sensors"]
+                        ]
+                    else:
+                        self._unit_sensors[server.unit_id] = self._sensors
 
                 return
 
         except Exception as e:
             _logger.warning("Configuration file not found on disk!", e)
 
+    def get_history(self) -> dict[str, HistoryModel]:
+        return self._history
+
+    def get_deadbands(self) -> dict[str, DeadbandModel]:
+        return self._deadbands
+
     def get_standard_sensors(self) -> list[BaseSensorModel]:
+        if self._standard_sensors is None:
+            self._standard_sensors = [self._create_standard_sensor(sensor) for sensor in self._sensors]
         return self._standard_sensors
 
     def get_units(self) -> list[UnitModel]:
+        # every unit gets its own standard sensor models, they are not shared between units
+        if self._units is None:
+            self._units = []
+            for unit_id in self._unit_sensors:
+                unit = UnitModel(
+                    id=unit_id,
+                    name=unit_id
+                )
+                unit.sensors = [self._create_standard_sensor(sensor) for sensor in self._unit_sensors[unit_id]]
+                self._units.append(unit)
         return self._units
 
     def get_servers(self) -> list[ServerModel]:
         return self._server
 
-    def get_unit_sensors(self) -> list[OpcSensorModel]:
-        return self._sensors
+    def get_endpoint_servers(self) -> list[ServerModel]:
+        return self._endpoint_servers
+
+    def get_unit_sources(self) -> dict[str, str]:
+        # unit id -> unit id of the endpoint server that delivers its data
+        return self._unit_sources
+
+    def get_unit_sensors(self, unit_id: str) -> list[OpcSensorModel]:
+        return self._unit_sensors.get(unit_id, self._sensors)
+
+    def get_endpoint_sensors(self) -> dict[str, list[OpcSensorModel]]:
+        # unit id of an endpoint server -> sensors of all units sharing that endpoint
+        endpoint_sensors: dict[str, list[OpcSensorModel]] = {}
+        added_templates: dict[str, set[int]] = {}
+        for unit_id, source_id in self._unit_sources.items():
+            sensors = endpoint_sensors.setdefault(source_id, [])
+            added = added_templates.setdefault(source_id, set())
+            for sensor in self._unit_sensors[unit_id]:
+                if id(sensor) not in added:
+                    added.add(id(sensor))
+                    sensors.append(sensor)
+        return endpoint_sensors
 
     def create_mapping(self) -> dict[str, list[MappingModel]]:
         mapping: dict[str, list[MappingModel]] = {}
-        for unit in self._units:
-            for sensor in self._sensors:
+        for unit_id, sensors in self._unit_sensors.items():
+            for sensor in sensors:
                 sensor_name = sensor.sensor_name
                 for key in sensor.mapping:
-                    mapping_key = unit.id + ":" + str(sensor.mapping[key].ns) + "_" \
-                                  + str(sensor.mapping[key].i) + ":" + sensor_name
-                    mapping_model = MappingModel(
-                        unit_id=unit.id,
-                        sensor=sensor_name,
-                        measurement=key
-                    )
-
+                    node_model = sensor.mapping[key]
+                    mapping_key = unit_id + ":" + str(node_model.ns) + "_" + str(node_model.i) + ":" + sensor_name
                     if mapping_key not in mapping:
                         mapping[mapping_key] = []
-
-                    mapping[mapping_key].append(mapping_model)
+                    mapping[mapping_key].append(MappingModel(unit_id, sensor_name, key))
 
                 # make default timestamp mapping
-                mapping_key = sensor.unit_id + ":" + "local_timestamp" + ":" + sensor_name
-                mapping[mapping_key] = [
-                    MappingModel(
-                        unit_id=sensor.unit_id,
-                        sensor=sensor_name,
-                        measurement="LocalTimestamp"
-                    )
-                ]
+                mapping_key = unit_id + ":" + "local_timestamp" + ":" + sensor_name
+                mapping[mapping_key] = [MappingModel(unit_id, sensor_name, "LocalTimestamp")]
 
         return mapping
 
     @staticmethod
     def _create_standard_sensor(sensor: OpcSensorModel) -> BaseSensorModel:
-        model: BaseSensorModel = BaseSensorModel()
-        namespace_uri = "http://www.opcfoundation.org/UA/units/un/cefact"
-
-        if sensor.sensor_type == EnvironmentSensorType.OXYGEN_SATURATION:
-            model = OxygenSaturationSensorModel()
-            model.oxygen_saturation.engineering_units.namespace_uri = namespace_uri
-            model.oxygen_saturation.engineering_units.display_name = "%"
-            model.oxygen_saturation.engineering_units.description = "Percentage"
-        elif sensor.sensor_type == EnvironmentSensorType.OXYGEN_CONCENTRATION:
-            model = OxygenConcentrationSensorModel()
-            model.oxygen_concentration.engineering_units.namespace_uri = namespace_uri
-            model.oxygen_concentration.engineering_units.display_name = "mg/l"
-            model.oxygen_concentration.engineering_units.description = "Milligram per liter"
-            model.salinity.engineering_units.namespace_uri = namespace_uri
-            model.salinity.engineering_units.display_name = "ppt"
-            model.salinity.engineering_units.description = "Parts per thousand"
-        elif sensor.sensor_type == EnvironmentSensorType.TEMPERATURE:
-            model = TemperatureSensorModel()
-            model.temperature.engineering_units.namespace_uri = namespace_uri
-            model.temperature.engineering_units.display_name = "C°"
-            model.temperature.engineering_units.description = "Celsius"
-        elif sensor.sensor_type == EnvironmentSensorType.SALINITY:
-            model = SalinitySensorModel()
-            model.salinity.engineering_units.namespace_uri = namespace_uri
-            model.salinity.engineering_units.display_name = "√"
-            model.salinity.engineering_units.description = "Parts per thousand"
-        elif sensor.sensor_type == EnvironmentSensorType.SEA_CURRENT:
-            model = SeaCurrentSensorModel()
-            model.direction.engineering_units.namespace_uri = namespace_uri
-            model.direction.engineering_units.display_name = "Absolute North"
-            model.direction.engineering_units.description = "Absolute direction in degrees"
-
-            model.speed.engineering_units.namespace_uri = namespace_uri
-            model.speed.engineering_units.display_name = "cm/s"
-            model.speed.engineering_units.description = "Centimeter per second"
-        elif sensor.sensor_type == EnvironmentSensorType.NTU:
-            model = NTUSensorModel()
-            model.ntu.engineering_units.namespace_uri = namespace_uri
-            model.ntu.engineering_units.display_name = "NTU"
-            model.ntu.engineering_units.description = "Nephelometric Turbidity Units"
-        elif sensor.sensor_type == EnvironmentSensorType.FTU:
-            model = FTUSensorModel()
-            model.ftu.engineering_units.namespace_uri = namespace_uri
-            model.ftu.engineering_units.display_name = "FTU"
-            model.ftu.engineering_units.description = "Formazin Turbidity Units"
-        elif sensor.sensor_type == EnvironmentSensorType.PH:
-            model = PHSensorModel()
-            model.ph.engineering_units.namespace_uri = namespace_uri
-            model.ph.engineering_units.display_name = "pH"
-            model.ph.engineering_units.description = "pH"
-        elif sensor.sensor_type == EnvironmentSensorType.CO2:
-            model = CO2SensorModel()
-            model.co2.engineering_units.namespace_uri = namespace_uri
-            model.co2.engineering_units.display_name = "ppm"
-            model.co2.engineering_units.description = "Parts per million"
-        elif sensor.sensor_type == EnvironmentSensorType.LIGHT:
-            model = LightSensorModel()
-            model.lux.engineering_units.namespace_uri = namespace_uri
-            model.lux.engineering_units.display_name = "lux"
-            model.lux.engineering_units.description = "Lumen per square meter"
-
-        model.name = sensor.sensor_name
-
-        return model
+        return create_sensor_model(sensor.sensor_type, sensor.sensor_name)
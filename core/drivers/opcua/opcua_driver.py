@@ -1,19 +1,27 @@
 import asyncio
 import logging
-import os
 import socket
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import Any
 
 from asyncua.crypto.cert_gen import setup_self_signed_certificate
 from cryptography.hazmat._oid import ExtendedKeyUsageOID
 
-from core.constants import CONFIG_PATH
+from aquacloud_common.models.sensor.base_sensor import BaseSensorModel
+
 from core.drivers.base_driver import BaseDriver
+from core.drivers.config_diff import ConfigDiff
+from core.drivers.opcua.endpoint_health_model import EndpointHealthModel
 from core.drivers.opcua.opc_ua_config_parser import OpcuaConfigurationParser
-from core.drivers.opcua.opcua_worker import OpcuaWorker
+from core.drivers.opcua.opcua_worker import DataChange, OpcuaWorker
+from core.drivers.opcua.routing_table import RouteSpec, RoutingTable
 from core.drivers.opcua.server_model import ServerModel
+from core.drivers.opcua.shard_pool import OPCUA_WORKER_PROCESSES, ShardPool
 from core.opcua.opcua_server import OPCUAServer
 from models.sensor_model import OpcSensorModel
+from utilities.metrics import METRICS, Counter
 
 
 _logger = logging.getLogger(__name__)
@@ -21,20 +29,43 @@ logging.basicConfig(level=logging.WARNING)
 
 
 class OpcuaDriver(BaseDriver):
+    CONFIG_FILE = "opcua_config.json"
+    CONFIG_ATTRIBUTES = (
+        "units", "sensors", "mapping", "_servers", "_unit_sources", "_endpoint_sensors", "_route_specs", "history"
+    )
+
     def __init__(self, server: OPCUAServer):
         super().__init__(server)
         self._servers: list[ServerModel] = []
-        self._unit_sensors: list[OpcSensorModel] = []
+        self._unit_sources: dict[str, str] = {}
+        # unit id of an endpoint server -> sensors monitored on that endpoint
+        self._endpoint_sensors: dict[str, list[OpcSensorModel]] = {}
+        self._route_specs: list[RouteSpec] = []
+        self._routing_table: RoutingTable = RoutingTable()
+        self._shard_pool: ShardPool | None = None
+        self._endpoint_health: dict[str, EndpointHealthModel] = {}
+        self._route_duration = METRICS.histogram(
+            "route_seconds", "Duration of routing a batch of data changes", {"driver": self.__class__.__name__}
+        )
+        self._unit_data_changes: dict[str, Counter] = {}
+        # unit id of an endpoint server -> its worker, when the workers run in this process
+        self._workers: dict[str, OpcuaWorker] = {}
+        self._worker_tasks: dict[str, asyncio.Task] = {}
+        self._certificate: list[Any] = []
 
     def parse_config(self):
-        config_path_file = os.path.join(CONFIG_PATH, "opcua_config.json")
+        config_path_file = self.get_config_path()
         config_parser = OpcuaConfigurationParser(config_path_file)
         config_parser.parse_config_file()
         self.units = config_parser.get_units()
         self.sensors = config_parser.get_standard_sensors()
         self.mapping = config_parser.create_mapping()
-        self._servers = config_parser.get_servers()
-        self._unit_sensors = config_parser.get_unit_sensors()
+        self._servers = config_parser.get_endpoint_servers()
+        self._unit_sources = config_parser.get_unit_sources()
+        self._endpoint_sensors = config_parser.get_endpoint_sensors()
+        self._route_specs = RoutingTable.get_route_specs(self.mapping, self._unit_sources)
+        self.history = config_parser.get_history()
+        self.deadband_filter.set_deadbands(config_parser.get_deadbands())
 
     @staticmethod
     async def generate_certificate():
@@ -59,29 +90,149 @@ class OpcuaDriver(BaseDriver):
 
     async def start(self):
         self.is_starting = True
-        self.parse_config()
-        await self.create_unit_nodes()
+        with self.startup_timer.phase("parse_config"):
+            self.load_config()
+        self.configure_history()
+        with self.startup_timer.phase("create_unit_nodes"):
+            await self.create_unit_nodes()
         # await self.create_sensors()
+        with self.startup_timer.phase("routing_table"):
+            self._routing_table = RoutingTable.from_route_specs(self._route_specs, self.server, self.deadband_filter)
+        self.startup_timer.report()
+        self.report_mapping_footprint()
 
-        [cert, private_key, client_app_uri] = await self.generate_certificate()
+        self._certificate = await self.generate_certificate()
+        if OPCUA_WORKER_PROCESSES > 0:
+            self._start_shard_pool()
+            return
 
         for server in self._servers:
-            try:
-                worker = OpcuaWorker(
-                    server,
-                    self._unit_sensors,
-                    self.mapping,
-                    self.server,
-                    cert,
-                    private_key,
-                    client_app_uri
-                )
-                asyncio.get_event_loop().create_task(worker.run())
-            except Exception as e:
-                _logger.warning(e)
+            self._start_worker(server)
+
+    def _start_shard_pool(self):
+        [cert, private_key, client_app_uri] = self._certificate
+        self._shard_pool = ShardPool(
+            OPCUA_WORKER_PROCESSES,
+            self._servers,
+            self._endpoint_sensors,
+            self._handle_data_changes,
+            cert,
+            private_key,
+            client_app_uri,
+            self._update_endpoint_health
+        )
+        self._shard_pool.start()
+
+    def _start_worker(self, server: ServerModel):
+        [cert, private_key, client_app_uri] = self._certificate
+        try:
+            worker = OpcuaWorker(
+                server,
+                self._endpoint_sensors.get(server.unit_id, []),
+                self._handle_data_changes,
+                cert,
+                private_key,
+                client_app_uri,
+                self._update_endpoint_health
+            )
+            self._workers[server.unit_id] = worker
+            self._worker_tasks[server.unit_id] = asyncio.get_event_loop().create_task(worker.run())
+        except Exception as e:
+            _logger.warning(e)
+
+    def _stop_worker(self, unit_id: str):
+        worker = self._workers.pop(unit_id, None)
+        if worker is not None:
+            worker.stop()
+        task = self._worker_tasks.pop(unit_id, None)
+        if task is not None:
+            task.cancel()
+
+    def get_site_sensors(self) -> list[BaseSensorModel]:
+        # the standard sensors only exist in the config, no site sensor nodes are created for them
+        return []
+
+    async def reload(self) -> ConfigDiff:
+        old_servers = {server.unit_id: server for server in self._servers}
+        old_endpoint_sensors = self._endpoint_sensors
+        diff = await super().reload()
+        self._routing_table = RoutingTable.from_route_specs(self._route_specs, self.server, self.deadband_filter)
+        self.report_mapping_footprint()
+
+        new_servers = {server.unit_id: server for server in self._servers}
+        for unit_id, server in old_servers.items():
+            new_server = new_servers.get(unit_id)
+            if new_server is None or new_server.endpoint != server.endpoint:
+                self._endpoint_health.pop(server.endpoint, None)
+
+        changed_sensors = [
+            unit_id for unit_id in new_servers
+            if [sensor.model_dump() for sensor in old_endpoint_sensors.get(unit_id, [])]
+            != [sensor.model_dump() for sensor in self._endpoint_sensors.get(unit_id, [])]
+        ]
+
+        if self._shard_pool is not None:
+            # the shard processes receive their servers when they are spawned, so the pool is started again
+            if old_servers != new_servers or len(changed_sensors) > 0:
+                self._shard_pool.stop()
+                self._start_shard_pool()
+            return diff
+
+        # a worker is only replaced when its session has to be opened again, sensor changes are applied to
+        # the subscriptions of the running session
+        for unit_id, server in old_servers.items():
+            if new_servers.get(unit_id) != server:
+                self._stop_worker(unit_id)
+        for unit_id, server in new_servers.items():
+            if unit_id not in self._workers:
+                self._start_worker(server)
+            elif unit_id in changed_sensors:
+                await self._workers[unit_id].update_sensors(self._endpoint_sensors.get(unit_id, []))
+        return diff
+
+    @property
+    def endpoint_health(self) -> dict[str, EndpointHealthModel]:
+        return self._endpoint_health
+
+    def _update_endpoint_health(self, health: EndpointHealthModel):
+        self._endpoint_health[health.endpoint] = health
+
+    async def _handle_data_changes(self, unit_id: str, changes: list[DataChange], timestamp: float):
+        timestamp = datetime.fromtimestamp(timestamp)
+        timestamp = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        now = time.monotonic()
+        start = time.perf_counter()
+
+        data_changes = self._unit_data_changes.get(unit_id)
+        if data_changes is None:
+            data_changes = METRICS.counter("data_changes_total", "Data changes received per unit", {"unit": unit_id})
+            self._unit_data_changes[unit_id] = data_changes
+        data_changes.inc(len(changes))
+
+        # every sample is staged with its SourceTimestamp, the coalescer historizes the ones a later sample replaces
+        for node_id, value, source_timestamp in changes:
+            routes = self._routing_table.get(unit_id, node_id.NamespaceIndex, node_id.Identifier)
+            for route in routes:
+                # only numbers go through the deadband; a value that does not fit the node fails on its own
+                if isinstance(value, (int, float)) and not self.deadband_filter.accept(route.slot, float(value), now):
+                    continue
+                try:
+                    variant = route.measurement.to_variant(value)
+                except (TypeError, ValueError) as e:
+                    _logger.info("Cannot write value %r of %s: %s", value, node_id, e)
+                    continue
+                self._writer.stage(route.measurement.node, variant, source_timestamp)
+                self._writer.stage(route.local_timestamp.node, route.local_timestamp.to_variant(timestamp))
+                self._timestamps_written.inc()
+        self._route_duration.record(time.perf_counter() - start)
+        await self.commit_data_changes()
 
     def stop(self):
         self.is_starting = False
+        if self._shard_pool is not None:
+            self._shard_pool.stop()
+        for unit_id in list(self._workers):
+            self._stop_worker(unit_id)
 
     async def subscribe(self):
         pass
\ No newline at end of file
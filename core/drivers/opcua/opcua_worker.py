@@ -1,26 +1,52 @@
 import asyncio
 import logging
 import os
+import random
 import time
 from datetime import datetime
-from typing import Any
+from typing import Any, Awaitable, Callable, NamedTuple
 
 from asyncua import Client, ua, Node
 from asyncua.common.subscription import Subscription, DataChangeNotif
 from asyncua.crypto.security_policies import SecurityPolicyBasic256Sha256
-from asyncua.ua import String, Int16, Int32
+from asyncua.ua import Int16, Int32
 
+from core.drivers.opcua.endpoint_health_model import EndpointHealthModel
 from core.drivers.opcua.server_model import ServerModel
-from core.opcua.opcua_server import OPCUAServer
-from models.mapping_model import MappingModel
-from models.sensor_model import OpcSensorModel, NodeModel
+from core.drivers.opcua.session_recovery import abandon_session, republish, transfer_subscription
+from models.sensor_model import MonitoringModel, OpcSensorModel, NodeModel
+from utilities.metrics import METRICS
 
 _logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.WARNING)
 
-RECONNECT_TIME_OUT = 5
+# reconnect delays grow exponentially from RECONNECT_MIN_BACKOFF to RECONNECT_MAX_BACKOFF seconds and are
+# drawn at random below that bound, so units that lost the same link do not reconnect at the same moment
+RECONNECT_MIN_BACKOFF = float(os.getenv("RECONNECT_MIN_BACKOFF", 1))
+RECONNECT_MAX_BACKOFF = float(os.getenv("RECONNECT_MAX_BACKOFF", 60))
+CONNECTION_CHECK_INTERVAL = float(os.getenv("CONNECTION_CHECK_INTERVAL", 5))
 DISCOVERY_INTERVAL = 60 * 60
 TIME_OUT = int(os.getenv("TIME_OUT", 10))
+DATA_CHANGE_QUEUE_SIZE = int(os.getenv("DATA_CHANGE_QUEUE_SIZE", 10000))
+# milliseconds, used for sensors and nodes without a publishing_interval
+PUBLISHING_INTERVAL = float(os.getenv("PUBLISHING_INTERVAL", 500))
+
+DEADBAND_TYPES = {
+    "absolute": ua.DeadbandType.Absolute,
+    "percent": ua.DeadbandType.Percent,
+}
+
+
+# a sample of a monitored node, source_timestamp is the naive UTC SourceTimestamp of the server (None if not sent)
+class DataChange(NamedTuple):
+    node_id: ua.NodeId
+    value: Any
+    source_timestamp: datetime | None
+
+
+# (unit_id, every sample of the batch in arrival order, epoch timestamp of the batch)
+DataChangeHandler = Callable[[str, list[DataChange], float], Awaitable[None]]
+HealthHandler = Callable[[EndpointHealthModel], None]
 
 
 class OpcuaWorker:
@@ -28,94 +54,336 @@ class OpcuaWorker:
             self,
             server: ServerModel,
             sensors: list[OpcSensorModel],
-            mapping: dict[str, list[MappingModel]],
-            opc_server: OPCUAServer,
+            on_data_changes: DataChangeHandler,
             cert: Any,
             private_key: Any,
-            client_app_uri: str
+            client_app_uri: str,
+            on_health_change: HealthHandler | None = None
     ):
         self._server: ServerModel = server
-        self._opc_server = opc_server
         self._unit_id: str = server.unit_id
         self._sensors: list[OpcSensorModel] = sensors
-        self._mapping = mapping
+        self._on_data_changes: DataChangeHandler = on_data_changes
         self._client: Client = None
-        self._subscription_nodes: list[Node] = []
-        self._subscriber: Subscription = None
+        # publishing interval -> monitored items, one subscription per interval
+        self._monitored_items: dict[float, list[tuple[ua.NodeId, MonitoringModel]]] = self._group_monitored_items()
+        self._subscriptions: dict[float, Subscription] = {}
+        # publishing interval -> node -> server handle and settings of its monitored item
+        self._monitored_handles: dict[float, dict[ua.NodeId, tuple[int, MonitoringModel]]] = {}
+        self._next_client_handle: int = 1
+        # a stopped worker deletes its subscriptions when it disconnects instead of keeping them for a transfer
+        self._stopping: bool = False
         self._cert = cert
         self._private_key = private_key
         self._client_app_uri = client_app_uri
+        self._pending_changes: list[DataChange] = []
+        # nodes with a sample in _pending_changes
+        self._pending_nodes: set[ua.NodeId] = set()
+        self._pending_event: asyncio.Event = asyncio.Event()
+        # time of the oldest change in _pending_changes
+        self._pending_since: float | None = None
+        # samples dropped since the buffer was last handed on, logged once per full buffer
+        self._pending_dropped: int = 0
+        labels = {"endpoint": server.endpoint}
+        self._notifications = METRICS.counter("opcua_notifications_total", "Data change notifications received", labels)
+        self._dropped_samples = METRICS.counter(
+            "opcua_dropped_samples_total", "Samples dropped because the change buffer was full", labels
+        )
+        self._coalesced_samples = METRICS.counter(
+            "opcua_coalesced_samples_total", "Samples of a node that already had a sample in the change buffer", labels
+        )
+        self._notification_latency = METRICS.histogram(
+            "opcua_notification_latency_seconds", "Time from SourceTimestamp to receiving the notification", labels
+        )
+        self._batch_wait = METRICS.histogram(
+            "opcua_batch_wait_seconds", "Time a change waits in the buffer before it is handed on", labels
+        )
+        self._on_health_change: HealthHandler | None = on_health_change
+        self._health: EndpointHealthModel = EndpointHealthModel(unit_id=server.unit_id, endpoint=server.endpoint)
 
-    async def subscribe(self):
-        self._subscription_nodes.clear()
+    @property
+    def dropped_samples(self) -> int:
+        return self._dropped_samples.value
+
+    @property
+    def coalesced_samples(self) -> int:
+        return self._coalesced_samples.value
+
+    @property
+    def health(self) -> EndpointHealthModel:
+        return self._health
+
+    def _set_health(self, **changes):
+        for key, value in changes.items():
+            setattr(self._health, key, value)
+        if self._on_health_change is not None:
+            try:
+                self._on_health_change(self._health)
+            except Exception as e:
+                _logger.warning("Cannot report endpoint health: %s", e)
+
+    @staticmethod
+    def _get_monitoring(sensor: OpcSensorModel, node_model: NodeModel) -> MonitoringModel:
+        monitoring = MonitoringModel(
+            publishing_interval=PUBLISHING_INTERVAL,
+            sampling_interval=0,
+            queue_size=0,
+            discard_policy="oldest"
+        )
+        for source in (sensor, node_model):
+            for field in MonitoringModel.model_fields:
+                value = getattr(source, field)
+                if value is not None:
+                    setattr(monitoring, field, value)
+        return monitoring
+
+    def _group_monitored_items(self) -> dict[float, list[tuple[ua.NodeId, MonitoringModel]]]:
+        # one monitored item per remote node, sensors mapping the same node share it and the
+        # settings of the first of them are used
+        groups: dict[float, list[tuple[ua.NodeId, MonitoringModel]]] = {}
+        monitored_nodes: set[ua.NodeId] = set()
         for sensor in self._sensors:
             try:
                 for key in sensor.mapping:
                     node_model: NodeModel = sensor.mapping[key]
                     node_id = ua.NodeId(Int32(node_model.i), Int16(node_model.ns))
-                    node = self._client.get_node(node_id)
-                    if node is not None:
-                        self._subscription_nodes.append(node)
+                    if node_id in monitored_nodes:
+                        continue
+                    monitored_nodes.add(node_id)
+                    monitoring = self._get_monitoring(sensor, node_model)
+                    groups.setdefault(monitoring.publishing_interval, []).append((node_id, monitoring))
+            except Exception as e:
+                _logger.warning(e)
+        return groups
+
+    @staticmethod
+    def _create_monitored_item_request(
+            node_id: ua.NodeId,
+            monitoring: MonitoringModel,
+            client_handle: int
+    ) -> ua.MonitoredItemCreateRequest:
+        parameters = ua.MonitoringParameters()
+        parameters.ClientHandle = client_handle
+        parameters.SamplingInterval = monitoring.sampling_interval
+        parameters.QueueSize = monitoring.queue_size
+        parameters.DiscardOldest = monitoring.discard_policy == "oldest"
+        if monitoring.deadband_type is not None and monitoring.deadband_value:
+            parameters.Filter = ua.DataChangeFilter(
+                Trigger=ua.DataChangeTrigger.StatusValue,
+                DeadbandType=DEADBAND_TYPES[monitoring.deadband_type],
+                DeadbandValue=monitoring.deadband_value
+            )
+
+        read_value_id = ua.ReadValueId()
+        read_value_id.NodeId = node_id
+        read_value_id.AttributeId = ua.AttributeIds.Value
+        request = ua.MonitoredItemCreateRequest()
+        request.ItemToMonitor = read_value_id
+        request.MonitoringMode = ua.MonitoringMode.Reporting
+        request.RequestedParameters = parameters
+        return request
+
+    async def _add_monitored_items(
+            self,
+            publishing_interval: float,
+            subscription: Subscription,
+            items: list[tuple[ua.NodeId, MonitoringModel]]
+    ):
+        requests = []
+        for node_id, monitoring in items:
+            requests.append(self._create_monitored_item_request(node_id, monitoring, self._next_client_handle))
+            self._next_client_handle += 1
+        results = await subscription.create_monitored_items(requests)
+        handles = self._monitored_handles.setdefault(publishing_interval, {})
+        for (node_id, monitoring), result in zip(items, results):
+            if isinstance(result, ua.StatusCode):
+                _logger.warning("Cannot monitor %s on %s: %s", node_id, self._server.endpoint, result)
+                continue
+            handles[node_id] = (result, monitoring)
+
+    async def _create_subscription(self, publishing_interval: float, items: list[tuple[ua.NodeId, MonitoringModel]]):
+        subscription = await self._client.create_subscription(publishing_interval, self)
+        self._subscriptions[publishing_interval] = subscription
+        self._monitored_handles[publishing_interval] = {}
+        await self._add_monitored_items(publishing_interval, subscription, items)
+
+    async def _update_subscription(
+            self,
+            publishing_interval: float,
+            subscription: Subscription,
+            items: list[tuple[ua.NodeId, MonitoringModel]]
+    ):
+        # only the monitored items whose node or settings changed are deleted or created
+        handles = self._monitored_handles.setdefault(publishing_interval, {})
+        wanted = dict(items)
+        removed = [node_id for node_id, (_, monitoring) in handles.items() if wanted.get(node_id) != monitoring]
+        if len(removed) > 0:
+            await subscription.unsubscribe([handles.pop(node_id)[0] for node_id in removed])
+        added = [(node_id, monitoring) for node_id, monitoring in items if node_id not in handles]
+        if len(added) > 0:
+            await self._add_monitored_items(publishing_interval, subscription, added)
+
+    async def subscribe(self):
+        # brings the subscriptions in line with the monitored items: subscriptions that were transferred from
+        # the previous session or that are unchanged after a config reload are kept as they are
+        for publishing_interval in list(self._subscriptions):
+            if publishing_interval not in self._monitored_items:
+                subscription = self._subscriptions.pop(publishing_interval)
+                self._monitored_handles.pop(publishing_interval, None)
+                try:
+                    await subscription.delete()
+                except Exception as e:
+                    _logger.warning(e)
+
+        for publishing_interval, items in self._monitored_items.items():
+            try:
+                subscription = self._subscriptions.get(publishing_interval)
+                if subscription is None:
+                    await self._create_subscription(publishing_interval, items)
+                else:
+                    await self._update_subscription(publishing_interval, subscription, items)
             except Exception as e:
                 _logger.warning(e)
-        await self._subscriber.subscribe_data_change(self._subscription_nodes)
+
+    async def update_sensors(self, sensors: list[OpcSensorModel]):
+        self._sensors = sensors
+        self._monitored_items = self._group_monitored_items()
+        # without a session the changes are applied by subscribe() after connecting
+        if self._health.state == "connected":
+            await self.subscribe()
+
+    def stop(self):
+        # the task running run() has to be cancelled by the owner
+        self._stopping = True
+
+    def _create_client(self) -> Client:
+        client = Client(url=self._server.endpoint, timeout=TIME_OUT)
+        client.application_uri = self._client_app_uri
+        client.set_user(self._server.username)
+        client.set_password(self._server.password)
+        return client
+
+    async def _resume_subscriptions(self):
+        # reuses the subscriptions of the previous session so the server does not have to rebuild the
+        # monitored items; notifications queued while the link was down are republished
+        for publishing_interval, subscription in list(self._subscriptions.items()):
+            try:
+                sequence_numbers = await transfer_subscription(self._client, subscription)
+            except Exception as e:
+                _logger.info("Cannot transfer subscription of %s: %s", self._server.endpoint, e)
+                sequence_numbers = None
+            if sequence_numbers is None:
+                del self._subscriptions[publishing_interval]
+                self._monitored_handles.pop(publishing_interval, None)
+                continue
+
+            republished = 0
+            try:
+                republished = await republish(self._client, subscription, sequence_numbers)
+            except Exception as e:
+                _logger.info("Cannot republish notifications of %s: %s", self._server.endpoint, e)
+            self._set_health(
+                transferred_subscriptions=self._health.transferred_subscriptions + 1,
+                republished_messages=self._health.republished_messages + republished
+            )
 
     async def run(self):
+        process_task = asyncio.get_event_loop().create_task(self._process_data_changes())
+        try:
+            await self._connect()
+        finally:
+            process_task.cancel()
+
+    async def _close_session(self):
+        if not self._stopping:
+            await abandon_session(self._client, TIME_OUT)
+            return
+        try:
+            await asyncio.wait_for(self._client.disconnect(), TIME_OUT)
+        except Exception as e:
+            _logger.debug("Cannot disconnect from %s: %s", self._server.endpoint, e)
+        self._subscriptions.clear()
+        self._monitored_handles.clear()
+
+    async def _connect(self):
+        backoff = RECONNECT_MIN_BACKOFF
         while True:
+            self._set_health(state="connecting")
             try:
-                self._client = Client(url=self._server.endpoint, timeout=TIME_OUT)
-                self._client.application_uri = self._client_app_uri
-                self._client.set_user(self._server.username)
-                self._client.set_password(self._server.password)
+                self._client = self._create_client()
                 await self._client.set_security(
                     policy=SecurityPolicyBasic256Sha256,
                     certificate=str(self._cert),
                     private_key=str(self._private_key),
                     mode=ua.MessageSecurityMode.SignAndEncrypt
                 )
-                async with self._client:
-                    self._subscriber = await self._client.create_subscription(500, self)
-                    try:
-                        await self.subscribe()
-                    except Exception as e:
-                        _logger.warning(e)
+                await self._client.connect()
+                try:
+                    await self._resume_subscriptions()
+                    await self.subscribe()
+                    self._set_health(
+                        state="connected",
+                        connected_since=time.time(),
+                        consecutive_failures=0,
+                        reconnects=self._health.reconnects + (1 if self._health.connected_since else 0)
+                    )
+                    backoff = RECONNECT_MIN_BACKOFF
                     while True:
                         await self._client.check_connection()
-                        await asyncio.sleep(RECONNECT_TIME_OUT)
+                        await asyncio.sleep(CONNECTION_CHECK_INTERVAL)
+                finally:
+                    await self._close_session()
             except Exception as e:
-                _logger.warning("Cannot connect to opcua server", e)
-            await asyncio.sleep(RECONNECT_TIME_OUT)
-
-    async def _handle_data_change(self, node: Node, value: Any):
-        ns = self._opc_server.get_namespace()
-        remote_ns = node.nodeid.NamespaceIndex
-        i = node.nodeid.Identifier
-        key = self._unit_id + ":" + str(remote_ns) + "_" + str(i)
-        for mapping_key in self._mapping:
-            if key in mapping_key:
-                mapping = self._mapping[mapping_key]
-                for m in mapping:
-                    measurement_path = m.measurement
-                    if m.measurement == "Depth":
-                        measurement_path = "Position.Depth"
-                    identifier = "Unit|" + m.unit_id + \
-                                 "|Sensor|" + m.sensor + \
-                                 "." + measurement_path
-
-                    measurement_node = self._opc_server.get_node(identifier)
-                    if measurement_node is not None:
-                        await measurement_node.set_value(ua.Float(value))
-
-                        timestamp = time.time()
-                        timestamp = datetime.fromtimestamp(timestamp)
-                        timestamp = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-
-                        parent_node = await measurement_node.get_parent()
-                        local_timestamp_node = await parent_node.get_child(str(ns) + ":" + "LocalTimestamp")
-                        if local_timestamp_node is not None:
-                            await local_timestamp_node.set_value(ua.String(timestamp))
-
-                break
+                _logger.warning("Cannot connect to opcua server %s: %s", self._server.endpoint, e)
+                self._set_health(
+                    state="disconnected",
+                    last_error=str(e),
+                    consecutive_failures=self._health.consecutive_failures + 1
+                )
+            await asyncio.sleep(random.uniform(RECONNECT_MIN_BACKOFF, backoff))
+            backoff = min(backoff * 2, RECONNECT_MAX_BACKOFF)
+
+    async def _process_data_changes(self):
+        while True:
+            await self._pending_event.wait()
+            self._pending_event.clear()
+            changes, self._pending_changes = self._pending_changes, []
+            self._pending_nodes = set()
+            if self._pending_dropped:
+                _logger.warning("Dropped %d samples of %s, the change buffer was full (%d samples)",
+                                self._pending_dropped, self._server.endpoint, DATA_CHANGE_QUEUE_SIZE)
+                self._pending_dropped = 0
+            if self._pending_since is not None:
+                self._batch_wait.record(time.perf_counter() - self._pending_since)
+                self._pending_since = None
+            try:
+                await self._on_data_changes(self._unit_id, changes, time.time())
+            except Exception as e:
+                _logger.warning("Cannot handle data changes: %s", e)
+
+    def status_change_notification(self, status: ua.StatusChangeNotification):
+        # the connection check of run() notices the lost session and reconnects
+        _logger.info("Subscription status of %s changed: %s", self._server.endpoint, status.Status)
 
     def datachange_notification(self, node: Node, val: Any, data: DataChangeNotif):
-        asyncio.get_event_loop().create_task(self._handle_data_change(node, val))
+        # called synchronously for every item of a publish response; the items are buffered
+        # and the whole batch is handed to on_data_changes by _process_data_changes in one pass
+        self._notifications.inc()
+        source_timestamp = data.monitored_item.Value.SourceTimestamp
+        if source_timestamp is not None:
+            self._notification_latency.record((datetime.utcnow() - source_timestamp).total_seconds())
+
+        # every sample is kept with its SourceTimestamp, so queued values of a node reach the history
+        if len(self._pending_changes) >= DATA_CHANGE_QUEUE_SIZE:
+            self._dropped_samples.inc()
+            self._pending_dropped += 1
+            return
+        node_id = node.nodeid
+        if node_id in self._pending_nodes:
+            self._coalesced_samples.inc()
+        else:
+            self._pending_nodes.add(node_id)
+        if self._pending_since is None:
+            self._pending_since = time.perf_counter()
+        self._pending_changes.append(DataChange(node_id, val, source_timestamp))
+        self._pending_event.set()
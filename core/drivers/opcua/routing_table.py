@@ -0,0 +1,98 @@
+from typing import NamedTuple
+
+from core.drivers.data_route import DataRoute
+from core.drivers.deadband_filter import DeadbandFilter
+from core.opcua.node_handle import NodeHandle
+from core.opcua.opcua_server import OPCUAServer
+from models.mapping_model import MappingModel
+
+LOCAL_TIMESTAMP_TAG = "local_timestamp"
+
+_NO_ROUTES: list = []
+
+
+class SensorRoute:
+    __slots__ = ("measurement", "local_timestamp", "slot")
+
+    def __init__(self, measurement: NodeHandle, local_timestamp: NodeHandle, slot: int):
+        self.measurement: NodeHandle = measurement
+        self.local_timestamp: NodeHandle = local_timestamp
+        # deadband filter slot of the measurement
+        self.slot: int = slot
+
+
+# route of a remote node to a sensor measurement before its nodes are looked up, compile_config.py
+# stores these so a start from the compiled config skips splitting the mapping keys
+class RouteSpec(NamedTuple):
+    # unit whose endpoint session delivers the data
+    unit_id: str
+    ns: int
+    i: int
+    sensor_identifier: str
+    measurement: str
+
+
+class RoutingTable:
+    def __init__(self):
+        self._routes: dict[tuple[str, int, int], list[SensorRoute]] = {}
+
+    @staticmethod
+    def get_route_specs(
+            mapping: dict[str, list[MappingModel]],
+            unit_sources: dict[str, str] | None = None
+    ) -> list[RouteSpec]:
+        # mapping keys are "<unit_id>:<ns>_<i>:<sensor_name>" (see OpcuaConfigurationParser.create_mapping).
+        # routes are keyed by the unit whose endpoint session delivers the data, so one remote node
+        # fans out to the sensors of every unit sharing that endpoint
+        specs = []
+        unit_sources = unit_sources or {}
+        for mapping_key in mapping:
+            unit_id, tag, _ = mapping_key.split(":", 2)
+            if tag == LOCAL_TIMESTAMP_TAG:
+                continue
+            ns, i = tag.split("_", 1)
+            for m in mapping[mapping_key]:
+                specs.append(RouteSpec(
+                    unit_sources.get(unit_id, unit_id),
+                    int(ns),
+                    int(i),
+                    DataRoute.get_sensor_identifier(m),
+                    m.measurement
+                ))
+        return specs
+
+    @classmethod
+    def from_route_specs(
+            cls,
+            specs: list[RouteSpec],
+            server: OPCUAServer,
+            deadband_filter: DeadbandFilter
+    ) -> "RoutingTable":
+        table = cls()
+        for spec in specs:
+            route = table._create_route(spec, server, deadband_filter)
+            if route is not None:
+                table.add(spec.unit_id, spec.ns, spec.i, route)
+        return table
+
+    @staticmethod
+    def _create_route(spec: RouteSpec, server: OPCUAServer, deadband_filter: DeadbandFilter) -> SensorRoute | None:
+        measurement_path = DataRoute.get_measurement_path(spec.measurement)
+        measurement = server.get_node_handle(spec.sensor_identifier + "." + measurement_path)
+        local_timestamp = server.get_node_handle(spec.sensor_identifier + ".LocalTimestamp")
+        if measurement is None or local_timestamp is None:
+            return None
+        slot = deadband_filter.get_slot(measurement.node.nodeid, spec.measurement)
+        return SensorRoute(measurement, local_timestamp, slot)
+
+    def add(self, unit_id: str, ns: int, i: int, route: SensorRoute):
+        key = (unit_id, ns, i)
+        if key not in self._routes:
+            self._routes[key] = []
+        self._routes[key].append(route)
+
+    def get(self, unit_id: str, ns: int, i: int) -> list[SensorRoute]:
+        return self._routes.get((unit_id, ns, i), _NO_ROUTES)
+
+    def __len__(self) -> int:
+        return len(self._routes)
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+
+from asyncua import Client, ua
+from asyncua.common.subscription import Subscription
+from asyncua.ua.ua_binary import struct_from_binary
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+
+# asyncua 1.0.5 leaves TransferSubscriptions/Republish unimplemented on the client, so the requests are
+# sent on the session protocol here and the subscription is re-bound to the new session.
+
+async def transfer_subscription(client: Client, subscription: Subscription) -> list[int] | None:
+    # moves a subscription of a lost session to the new session of client, returns the sequence numbers
+    # the server still holds for it or None if the subscription is gone and has to be created again
+    request = ua.TransferSubscriptionsRequest()
+    request.Parameters.SubscriptionIds = [subscription.subscription_id]
+    request.Parameters.SendInitialValues = True
+    data = await client.uaclient.protocol.send_request(request)
+    response = struct_from_binary(ua.TransferSubscriptionsResponse, data)
+    response.ResponseHeader.ServiceResult.check()
+    result = response.Parameters.Results[0]
+    if not result.StatusCode.is_good():
+        _logger.info("Cannot transfer subscription %s: %s", subscription.subscription_id, result.StatusCode)
+        return None
+
+    uaclient = client.uaclient
+    subscription.server = uaclient
+    uaclient._subscription_callbacks[subscription.subscription_id] = subscription.publish_callback
+    if uaclient._publish_task is None or uaclient._publish_task.done():
+        uaclient._publish_task = asyncio.create_task(uaclient._publish_loop())
+    return list(result.AvailableSequenceNumbers or [])
+
+
+async def republish(client: Client, subscription: Subscription, sequence_numbers: list[int]) -> int:
+    # replays the notifications that were sent while the session was down, returns how many were replayed
+    republished = 0
+    for sequence_number in sorted(sequence_numbers):
+        request = ua.RepublishRequest()
+        request.Parameters.SubscriptionId = subscription.subscription_id
+        request.Parameters.RetransmitSequenceNumber = sequence_number
+        data = await client.uaclient.protocol.send_request(request)
+        response = struct_from_binary(ua.RepublishResponse, data)
+        if not response.ResponseHeader.ServiceResult.is_good():
+            continue
+        await subscription.publish_callback(ua.PublishResult(
+            SubscriptionId=subscription.subscription_id,
+            NotificationMessage_=response.NotificationMessage
+        ))
+        republished += 1
+    return republished
+
+
+async def abandon_session(client: Client, timeout: float):
+    # closes the connection without deleting the subscriptions of the session (Client.disconnect deletes
+    # them), so they can be transferred after reconnecting
+    for task in (client._monitor_server_task, client._renew_channel_task):
+        if task is not None and not task.done():
+            task.cancel()
+    try:
+        await asyncio.wait_for(client.uaclient.close_session(False), timeout)
+        await asyncio.wait_for(client.close_secure_channel(), timeout)
+    except Exception as e:
+        _logger.debug("Cannot close session: %s", e)
+    finally:
+        client.disconnect_socket()
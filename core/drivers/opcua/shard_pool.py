@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import struct
+from multiprocessing.connection import Connection
+from datetime import datetime, timedelta
+from typing import Any
+
+from asyncua import ua
+
+from core.drivers.opcua.endpoint_health_model import EndpointHealthModel
+from core.drivers.opcua.opcua_worker import DataChange, DataChangeHandler, HealthHandler, OpcuaWorker
+from core.drivers.opcua.server_model import ServerModel
+from models.sensor_model import OpcSensorModel
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+# 0 runs every OpcuaWorker on the server event loop
+OPCUA_WORKER_PROCESSES = int(os.getenv("OPCUA_WORKER_PROCESSES", 0))
+SHARD_RESTART_TIME_OUT = 5
+
+# data frame: kind, server index, batch timestamp, change count, then per change ns, i (Int32), SourceTimestamp
+# (microseconds since the epoch), value kind and the value: a double for numbers, the length and pickle of anything
+# else (None, strings, arrays, ...)
+# health frame: kind, server index, then the EndpointHealthModel as json
+_FRAME_KIND = struct.Struct("<BH")
+_FRAME_HEADER = struct.Struct("<BHdI")
+_FRAME_CHANGE = struct.Struct("<HiqB")
+_FRAME_DOUBLE = struct.Struct("<d")
+_FRAME_LENGTH = struct.Struct("<I")
+FRAME_DATA = 0
+FRAME_HEALTH = 1
+VALUE_DOUBLE = 0
+VALUE_PICKLED = 1
+# SourceTimestamp of a sample the server sent without one
+NO_SOURCE_TIMESTAMP = -1 << 63
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_frame(server_index: int, changes: list[DataChange], timestamp: float) -> bytes:
+    frame = bytearray(_FRAME_HEADER.pack(FRAME_DATA, server_index, timestamp, len(changes)))
+    for node_id, value, source_timestamp in changes:
+        if source_timestamp is None:
+            source_timestamp = NO_SOURCE_TIMESTAMP
+        else:
+            source_timestamp = (source_timestamp - _EPOCH) // timedelta(microseconds=1)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            frame += _FRAME_CHANGE.pack(node_id.NamespaceIndex, node_id.Identifier, source_timestamp, VALUE_DOUBLE)
+            frame += _FRAME_DOUBLE.pack(value)
+        else:
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            frame += _FRAME_CHANGE.pack(node_id.NamespaceIndex, node_id.Identifier, source_timestamp, VALUE_PICKLED)
+            frame += _FRAME_LENGTH.pack(len(data)) + data
+    return bytes(frame)
+
+
+def encode_health_frame(server_index: int, health: EndpointHealthModel) -> bytes:
+    return _FRAME_KIND.pack(FRAME_HEALTH, server_index) + health.model_dump_json().encode()
+
+
+def get_frame_kind(frame: bytes) -> int:
+    return frame[0]
+
+
+def decode_health_frame(frame: bytes) -> tuple[int, EndpointHealthModel]:
+    _, server_index = _FRAME_KIND.unpack_from(frame, 0)
+    return server_index, EndpointHealthModel.model_validate_json(frame[_FRAME_KIND.size:])
+
+
+def decode_frame(frame: bytes) -> tuple[int, list[DataChange], float]:
+    _, server_index, timestamp, count = _FRAME_HEADER.unpack_from(frame, 0)
+    offset = _FRAME_HEADER.size
+    changes = []
+    for _ in range(count):
+        ns, i, source_timestamp, kind = _FRAME_CHANGE.unpack_from(frame, offset)
+        offset += _FRAME_CHANGE.size
+        if kind == VALUE_DOUBLE:
+            value = _FRAME_DOUBLE.unpack_from(frame, offset)[0]
+            offset += _FRAME_DOUBLE.size
+        else:
+            length = _FRAME_LENGTH.unpack_from(frame, offset)[0]
+            offset += _FRAME_LENGTH.size
+            value = pickle.loads(frame[offset:offset + length])
+            offset += length
+        if source_timestamp == NO_SOURCE_TIMESTAMP:
+            source_timestamp = None
+        else:
+            source_timestamp = _EPOCH + timedelta(microseconds=source_timestamp)
+        changes.append(DataChange(ua.NodeId(i, ns), value, source_timestamp))
+    return server_index, changes, timestamp
+
+
+async def _run_shard_workers(
+        servers: list[tuple[int, ServerModel]],
+        sensors: dict[str, list[OpcSensorModel]],
+        cert: Any,
+        private_key: Any,
+        client_app_uri: str,
+        connection: Connection
+):
+    workers = []
+    for server_index, server in servers:
+        async def send_data_changes(unit_id: str, changes: list[DataChange], timestamp: float,
+                                    index: int = server_index):
+            connection.send_bytes(encode_frame(index, changes, timestamp))
+
+        def send_health(health: EndpointHealthModel, index: int = server_index):
+            connection.send_bytes(encode_health_frame(index, health))
+
+        workers.append(OpcuaWorker(
+            server, sensors.get(server.unit_id, []), send_data_changes, cert, private_key, client_app_uri, send_health
+        ).run())
+    await asyncio.gather(*workers)
+
+
+def run_shard(
+        servers: list[tuple[int, ServerModel]],
+        sensors: dict[str, list[OpcSensorModel]],
+        cert: Any,
+        private_key: Any,
+        client_app_uri: str,
+        connection: Connection
+):
+    # entry point of a shard process, it owns the client sessions (and their crypto) of its servers
+    asyncio.run(_run_shard_workers(servers, sensors, cert, private_key, client_app_uri, connection))
+
+
+# Spreads the OPC UA client workers over OPCUA_WORKER_PROCESSES processes. Each shard streams
+# its data change batches back over a pipe and they are handed to on_data_changes here.
+class ShardPool:
+    def __init__(
+            self,
+            processes: int,
+            servers: list[ServerModel],
+            sensors: dict[str, list[OpcSensorModel]],
+            on_data_changes: DataChangeHandler,
+            cert: Any,
+            private_key: Any,
+            client_app_uri: str,
+            on_health_change: HealthHandler | None = None
+    ):
+        self._servers: list[ServerModel] = servers
+        # unit id of a server -> sensors monitored on that server
+        self._sensors: dict[str, list[OpcSensorModel]] = sensors
+        self._on_data_changes: DataChangeHandler = on_data_changes
+        self._on_health_change: HealthHandler | None = on_health_change
+        self._cert = cert
+        self._private_key = private_key
+        self._client_app_uri = client_app_uri
+        self._context = multiprocessing.get_context("spawn")
+        self._shards: list[list[tuple[int, ServerModel]]] = [[] for _ in range(min(processes, len(servers)))]
+        for server_index, server in enumerate(servers):
+            self._shards[server_index % len(self._shards)].append((server_index, server))
+        self._processes: list[multiprocessing.Process] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        for shard in self._shards:
+            self._tasks.append(loop.create_task(self._run(shard)))
+
+    async def _run(self, shard: list[tuple[int, ServerModel]]):
+        loop = asyncio.get_running_loop()
+        while True:
+            connection, child_connection = self._context.Pipe(duplex=False)
+            process = self._context.Process(
+                target=run_shard,
+                args=(shard, self._sensors, self._cert, self._private_key, self._client_app_uri, child_connection),
+                daemon=True
+            )
+            process.start()
+            child_connection.close()
+            self._processes.append(process)
+
+            try:
+                while True:
+                    frame = await loop.run_in_executor(None, connection.recv_bytes)
+                    if get_frame_kind(frame) == FRAME_HEALTH:
+                        self._report_health(*decode_health_frame(frame))
+                        continue
+                    server_index, changes, timestamp = decode_frame(frame)
+                    try:
+                        await self._on_data_changes(self._servers[server_index].unit_id, changes, timestamp)
+                    except Exception as e:
+                        _logger.warning("Cannot handle data changes: %s", e)
+            except (EOFError, OSError):
+                _logger.warning("OPC UA worker process %s exited with %s", process.pid, process.exitcode)
+                for server_index, server in shard:
+                    self._report_health(server_index, EndpointHealthModel(
+                        unit_id=server.unit_id,
+                        endpoint=server.endpoint,
+                        state="disconnected",
+                        last_error="worker process exited"
+                    ))
+            finally:
+                connection.close()
+                process.kill()
+                process.join()
+                self._processes.remove(process)
+            await asyncio.sleep(SHARD_RESTART_TIME_OUT)
+
+    def _report_health(self, server_index: int, health: EndpointHealthModel):
+        if self._on_health_change is None:
+            return
+        try:
+            self._on_health_change(health)
+        except Exception as e:
+            _logger.warning("Cannot report endpoint health: %s", e)
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        for process in self._processes:
+            process.kill()
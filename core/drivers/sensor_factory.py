@@ -0,0 +1,134 @@
+from typing import Any, NamedTuple
+
+from aquacloud_common.core.core_type import EnvironmentSensorType, FeedingSensorType
+from aquacloud_common.models.sensor.base_sensor import BaseSensorModel
+from aquacloud_common.models.sensor.environment.co2_sensor import CO2SensorModel
+from aquacloud_common.models.sensor.environment.ftu_sensor import FTUSensorModel
+from aquacloud_common.models.sensor.environment.light_sensor import LightSensorModel
+from aquacloud_common.models.sensor.environment.ntu_sensor import NTUSensorModel
+from aquacloud_common.models.sensor.environment.oxygen_concentration_sensor import OxygenConcentrationSensorModel
+from aquacloud_common.models.sensor.environment.oxygen_saturation_sensor import OxygenSaturationSensorModel
+from aquacloud_common.models.sensor.environment.ph_sensor import PHSensorModel
+from aquacloud_common.models.sensor.environment.salinity_sensor import SalinitySensorModel
+from aquacloud_common.models.sensor.environment.sea_current_sensor import SeaCurrentSensorModel
+from aquacloud_common.models.sensor.environment.temperature_sensor import TemperatureSensorModel
+from aquacloud_common.models.sensor.feeding.calculated_accumulated_feeding_sensor import \
+    CalculatedAccumulatedFeedingSensorModel
+from aquacloud_common.models.sensor.feeding.feed_silo_sensor import FeedSiloSensorModel
+from aquacloud_common.models.sensor.feeding.feeding_intensity_sensor import FeedingIntensitySensorModel
+
+EU_NAMESPACE_URI = "http://www.opcfoundation.org/UA/units/un/cefact"
+
+
+class SensorTemplate(NamedTuple):
+    model: type[BaseSensorModel]
+    # analog item path -> display name and description of its engineering units
+    engineering_units: dict[str, tuple[str, str]]
+
+
+ENVIRONMENT_SENSORS: dict[str, SensorTemplate] = {
+    EnvironmentSensorType.OXYGEN_SATURATION: SensorTemplate(OxygenSaturationSensorModel, {
+        "oxygen_saturation": ("%", "Percentage"),
+    }),
+    EnvironmentSensorType.OXYGEN_CONCENTRATION: SensorTemplate(OxygenConcentrationSensorModel, {
+        "oxygen_concentration": ("mg/l", "Milligram per liter"),
+        "salinity": ("ppt", "Parts per thousand"),
+    }),
+    EnvironmentSensorType.TEMPERATURE: SensorTemplate(TemperatureSensorModel, {
+        "temperature": ("C°", "Celsius"),
+    }),
+    EnvironmentSensorType.SALINITY: SensorTemplate(SalinitySensorModel, {
+        "salinity": ("ppt", "Parts per thousand"),
+    }),
+    EnvironmentSensorType.SEA_CURRENT: SensorTemplate(SeaCurrentSensorModel, {
+        "direction": ("Absolute North", "Absolute direction in degrees"),
+        "speed": ("cm/s", "Centimeter per second"),
+    }),
+    EnvironmentSensorType.NTU: SensorTemplate(NTUSensorModel, {
+        "ntu": ("NTU", "Nephelometric Turbidity Units"),
+    }),
+    EnvironmentSensorType.FTU: SensorTemplate(FTUSensorModel, {
+        "ftu": ("FTU", "Formazin Turbidity Units"),
+    }),
+    EnvironmentSensorType.PH: SensorTemplate(PHSensorModel, {
+        "ph": ("pH", "pH"),
+    }),
+    EnvironmentSensorType.CO2: SensorTemplate(CO2SensorModel, {
+        "co2": ("ppm", "Parts per million"),
+    }),
+    EnvironmentSensorType.LIGHT: SensorTemplate(LightSensorModel, {
+        "lux": ("lux", "Lumen per square meter"),
+    }),
+}
+
+FEED_TYPE_ENGINEERING_UNITS: dict[str, tuple[str, str]] = {
+    "feed_type.pellet_size": ("mm", "Millimeter"),
+    "feed_type.mass_per_pellet": ("g", "Gram"),
+}
+
+# feeding sensor types that are not listed are calculated accumulated feeding sensors
+CALCULATED_ACCUMULATED_FEEDING_SENSOR = SensorTemplate(CalculatedAccumulatedFeedingSensorModel, {
+    "fed_amount": ("", ""),
+    **FEED_TYPE_ENGINEERING_UNITS,
+})
+
+FEEDING_SENSORS: dict[str, SensorTemplate] = {
+    FeedingSensorType.FEEDING_INTENSITY: SensorTemplate(FeedingIntensitySensorModel, {
+        "feeding_intensity": ("g/s", "Gram per second"),
+        **FEED_TYPE_ENGINEERING_UNITS,
+    }),
+    FeedingSensorType.FEED_SILO: SensorTemplate(FeedSiloSensorModel, {
+        "feed": ("kg", "Kilogram"),
+        "silo_capacity": ("kg", "Kilogram"),
+        "fill_percentage": ("%", "Percentage"),
+        **FEED_TYPE_ENGINEERING_UNITS,
+    }),
+}
+
+# one fully configured model per sensor model class, built on first use
+_prototypes: dict[type[BaseSensorModel], BaseSensorModel] = {}
+# (display name, description) -> engineering units object shared by every analog item with those units
+_engineering_units: dict[tuple[str, str], Any] = {}
+
+
+def _get_engineering_units(analog_item: Any, display_name: str, description: str) -> Any:
+    key = (display_name, description)
+    engineering_units = _engineering_units.get(key)
+    if engineering_units is None:
+        engineering_units = analog_item.engineering_units
+        engineering_units.namespace_uri = EU_NAMESPACE_URI
+        engineering_units.display_name = display_name
+        engineering_units.description = description
+        _engineering_units[key] = engineering_units
+    return engineering_units
+
+
+def _get_prototype(template: SensorTemplate) -> BaseSensorModel:
+    prototype = _prototypes.get(template.model)
+    if prototype is None:
+        prototype = template.model()
+        for path, (display_name, description) in template.engineering_units.items():
+            analog_item = prototype
+            for attribute in path.split("."):
+                analog_item = getattr(analog_item, attribute)
+            analog_item.engineering_units = _get_engineering_units(analog_item, display_name, description)
+        _prototypes[template.model] = prototype
+    return prototype
+
+
+def create_sensor_model(
+        sensor_type: str,
+        name: str | None = None,
+        templates: dict[str, SensorTemplate] = ENVIRONMENT_SENSORS,
+        default: SensorTemplate | None = None
+) -> BaseSensorModel:
+    # a shallow copy of the prototype of the sensor type: the copies share the nested models (analog items,
+    # position, feed type) of the prototype, which are only read once the sensor is created
+    template = templates.get(sensor_type, default)
+    if template is None:
+        model = BaseSensorModel()
+    else:
+        model = _get_prototype(template).model_copy()
+    if name is not None:
+        model.name = name
+    return model
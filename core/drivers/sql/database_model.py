@@ -0,0 +1,23 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class DatabaseModel(BaseModel):
+    dialect: Literal["mariadb", "sqlite"] = "mariadb"
+    host: Optional[str] = "localhost"
+    port: Optional[int] = 3306
+    username: Optional[str] = ""
+    password: Optional[str] = ""
+    database: str
+    pool_size: Optional[int] = 2
+    batch_size: Optional[int] = 500
+    poll_interval: Optional[float] = Field(default=None, gt=0)
+
+
+class ChannelModel(BaseModel):
+    channel_id: int
+    unit_id: str
+    sensor_name: str
+    sensor_type: str
+    measurement: str
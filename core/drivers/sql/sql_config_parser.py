@@ -0,0 +1,110 @@
+import json
+import logging
+
+from aquacloud_common.models.organization.unit import UnitModel
+from aquacloud_common.models.sensor.base_sensor import BaseSensorModel
+from core.drivers.sensor_factory import create_sensor_model
+from core.drivers.sql.database_model import ChannelModel, DatabaseModel
+from models.deadband_model import DeadbandModel
+from models.history_model import HistoryModel
+from models.mapping_model import MappingModel
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+
+class SqlConfigurationParser:
+    def __init__(self, config_file: str):
+        self._config_file = config_file
+        self._history: dict[str, HistoryModel] = {}
+        self._deadbands: dict[str, DeadbandModel] = {}
+        self._database: DatabaseModel | None = None
+        self._standard_sensors: list[BaseSensorModel] = []
+
+    def parse_config_file(self):
+        try:
+            with open(self._config_file) as json_file:
+                config = json.load(json_file)
+                self._database = DatabaseModel.model_validate(config["database"])
+                self._history = {
+                    sensor_type: HistoryModel.model_validate(history)
+                    for sensor_type, history in config.get("history", {}).items()
+                }
+                self._deadbands = {
+                    measurement: DeadbandModel.model_validate(deadband)
+                    for measurement, deadband in config.get("deadband", {}).items()
+                }
+        except Exception as e:
+            _logger.warning("Configuration file not found on disk!", e)
+
+    def get_database(self) -> DatabaseModel | None:
+        return self._database
+
+    def get_history(self) -> dict[str, HistoryModel]:
+        return self._history
+
+    def get_deadbands(self) -> dict[str, DeadbandModel]:
+        return self._deadbands
+
+    def get_standard_sensors(self) -> list[BaseSensorModel]:
+        return self._standard_sensors
+
+    def create_units(self, channels: list[ChannelModel]) -> list[UnitModel]:
+        units: dict[str, UnitModel] = {}
+        created_sensors: set[tuple[str, str]] = set()
+        self._standard_sensors = []
+        for channel in channels:
+            if (channel.unit_id, channel.sensor_name) in created_sensors:
+                continue
+            created_sensors.add((channel.unit_id, channel.sensor_name))
+
+            standard_sensor = create_sensor_model(channel.sensor_type, channel.sensor_name)
+
+            if channel.unit_id == "":
+                self._standard_sensors.append(standard_sensor)
+            else:
+                if channel.unit_id not in units:
+                    units[channel.unit_id] = UnitModel(
+                        id=channel.unit_id,
+                        name=channel.unit_id
+                    )
+                units[channel.unit_id].sensors.append(standard_sensor)
+
+        return [units[key] for key in units]
+
+    @staticmethod
+    def _get_tag_prefix(channel: ChannelModel) -> str:
+        if channel.unit_id == "":
+            return "site"
+        return channel.unit_id
+
+    @staticmethod
+    def get_channel_tag(channel: ChannelModel) -> str:
+        return SqlConfigurationParser._get_tag_prefix(channel) + ":" + str(channel.channel_id) \
+            + ":" + channel.sensor_name
+
+    @staticmethod
+    def get_timestamp_tag(channel: ChannelModel) -> str:
+        return SqlConfigurationParser._get_tag_prefix(channel) + ":" + "local_timestamp" + ":" + channel.sensor_name
+
+    def create_mapping(self, channels: list[ChannelModel]) -> dict[str, list[MappingModel]]:
+        mapping: dict[str, list[MappingModel]] = {}
+        for channel in channels:
+            mapping[self.get_channel_tag(channel)] = [
+                MappingModel(
+                    unit_id=channel.unit_id,
+                    sensor=channel.sensor_name,
+                    measurement=channel.measurement
+                )
+            ]
+
+            # make default timestamp mapping
+            mapping[self.get_timestamp_tag(channel)] = [
+                MappingModel(
+                    unit_id=channel.unit_id,
+                    sensor=channel.sensor_name,
+                    measurement="LocalTimestamp"
+                )
+            ]
+
+        return mapping
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from typing import Any
+
+from core.drivers.sql.database_model import DatabaseModel
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+
+class SqlConnectionPool:
+    # MariaDB goes through an aiomysql pool, sqlite through one shared aiosqlite connection
+    def __init__(self, database: DatabaseModel):
+        self._database: DatabaseModel = database
+        self._pool: Any = None
+        self._connection: Any = None
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    @property
+    def placeholder(self) -> str:
+        if self._database.dialect == "sqlite":
+            return "?"
+        return "%s"
+
+    async def connect(self):
+        if self._database.dialect == "sqlite":
+            import aiosqlite
+            self._connection = await aiosqlite.connect(self._database.database)
+        else:
+            import aiomysql
+            self._pool = await aiomysql.create_pool(
+                host=self._database.host,
+                port=self._database.port,
+                user=self._database.username,
+                password=self._database.password,
+                db=self._database.database,
+                minsize=1,
+                maxsize=self._database.pool_size,
+                autocommit=True
+            )
+
+    async def fetch_all(self, query: str, params: tuple = ()) -> list[tuple]:
+        if self._connection is None and self._pool is None:
+            await self.connect()
+
+        if self._pool is not None:
+            async with self._pool.acquire() as connection:
+                async with connection.cursor() as cursor:
+                    await cursor.execute(query, params)
+                    return list(await cursor.fetchall())
+
+        async with self._lock:
+            async with self._connection.execute(query, params) as cursor:
+                return list(await cursor.fetchall())
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
@@ -0,0 +1,249 @@
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any
+
+from core.constants import (
+    MARIA_DB_SENSOR_DATA_CHANNEL_TABLE,
+    MARIA_DB_SENSOR_DATA_TABLE,
+    MARIA_DB_SENSOR_TABLE
+)
+from core.drivers.base_driver import BaseDriver
+from core.drivers.config_diff import ConfigDiff
+from core.drivers.sql.database_model import ChannelModel, DatabaseModel
+from core.drivers.sql.sql_config_parser import SqlConfigurationParser
+from core.drivers.sql.sql_connection import SqlConnectionPool
+from core.opcua.opcua_server import OPCUAServer
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+POLL_TIME_INTERVAL = int(os.getenv("TIME_INTERVAL", 3))
+
+# sensor(id, unit_id, sensor_name, sensor_type)
+# sensor_data_channel(id, sensor_id, measurement)
+# sensor_data(id, channel_id, value, timestamp)
+CHANNEL_QUERY = "SELECT c.id, s.unit_id, s.sensor_name, s.sensor_type, c.measurement" \
+                " FROM " + MARIA_DB_SENSOR_DATA_CHANNEL_TABLE + " c" \
+                " JOIN " + MARIA_DB_SENSOR_TABLE + " s ON c.sensor_id = s.id"
+# both queries are answered from an index on sensor_data (channel_id, id) and the primary key, so
+# starting and reloading never scans the rows that were published before
+LAST_ID_QUERY = "SELECT MAX(id) FROM " + MARIA_DB_SENSOR_DATA_TABLE
+LATEST_DATA_QUERY = "SELECT id, channel_id, value, timestamp" \
+                    " FROM " + MARIA_DB_SENSOR_DATA_TABLE + \
+                    " WHERE channel_id = {p} ORDER BY id DESC LIMIT 1"
+DATA_QUERY = "SELECT id, channel_id, value, timestamp" \
+             " FROM " + MARIA_DB_SENSOR_DATA_TABLE + \
+             " WHERE id > {p} ORDER BY id LIMIT {p}"
+
+
+class SqlDriver(BaseDriver):
+    CONFIG_FILE = "sql_config.json"
+
+    def __init__(self, server: OPCUAServer):
+        super().__init__(server)
+        self._config_parser: SqlConfigurationParser | None = None
+        self._database: DatabaseModel | None = None
+        self._pool: SqlConnectionPool | None = None
+        # channel id -> sensor measurement, loaded once from the channel/sensor join
+        self._channels: dict[int, ChannelModel] = {}
+        self._channel_tags: dict[int, tuple[str, str]] = {}
+        self._unknown_channels: set[int] = set()
+        # rows are read by ascending id from the highest id seen so far; the per channel
+        # watermark (id, timestamp) drops rows that were already published for that channel
+        self._last_id: int = 0
+        self._watermarks: dict[int, tuple[int, str]] = {}
+
+    def parse_config(self):
+        config_path_file = self.get_config_path()
+        self._config_parser = SqlConfigurationParser(config_path_file)
+        self._config_parser.parse_config_file()
+        self._database = self._config_parser.get_database()
+        self.history = self._config_parser.get_history()
+        self.deadband_filter.set_deadbands(self._config_parser.get_deadbands())
+
+    @staticmethod
+    async def _load_channels(pool: SqlConnectionPool) -> list[ChannelModel]:
+        rows = await pool.fetch_all(CHANNEL_QUERY)
+        return [
+            ChannelModel(
+                channel_id=channel_id,
+                unit_id=unit_id or "",
+                sensor_name=sensor_name,
+                sensor_type=sensor_type,
+                measurement=measurement
+            )
+            for channel_id, unit_id, sensor_name, sensor_type, measurement in rows
+        ]
+
+    def _set_channels(self, channels: list[ChannelModel]):
+        self.units = self._config_parser.create_units(channels)
+        self.sensors = self._config_parser.get_standard_sensors()
+        self.mapping = self._config_parser.create_mapping(channels)
+        self._channels = {channel.channel_id: channel for channel in channels}
+        self._channel_tags = {
+            channel.channel_id: (
+                SqlConfigurationParser.get_channel_tag(channel),
+                SqlConfigurationParser.get_timestamp_tag(channel)
+            )
+            for channel in channels
+        }
+
+    @staticmethod
+    def _parse_timestamp(timestamp: Any) -> datetime | None:
+        # sqlite returns the timestamp column as text
+        if isinstance(timestamp, datetime):
+            return timestamp
+        try:
+            return datetime.fromisoformat(str(timestamp))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _get_source_timestamp(timestamp: datetime | None) -> datetime | None:
+        # naive database timestamps are local time, like the LocalTimestamp strings written from them
+        if timestamp is None:
+            return None
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    async def _handle_rows(self, rows: list[tuple]):
+        timestamps: dict[str, tuple[str, datetime | None]] = {}
+        for row_id, channel_id, value, timestamp in rows:
+            if row_id > self._last_id:
+                self._last_id = row_id
+
+            tags = self._channel_tags.get(channel_id)
+            if tags is None:
+                if channel_id not in self._unknown_channels:
+                    self._unknown_channels.add(channel_id)
+                    _logger.warning("Skipping data of unknown sensor data channel %s", channel_id)
+                continue
+
+            watermark = self._watermarks.get(channel_id)
+            if watermark is not None and row_id <= watermark[0]:
+                continue
+            parsed_timestamp = self._parse_timestamp(timestamp)
+            timestamp = parsed_timestamp.strftime("%Y-%m-%d %H:%M:%S") if parsed_timestamp else str(timestamp)
+            self._watermarks[channel_id] = (row_id, timestamp)
+
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                _logger.warning("Skipping row %s of sensor data channel %s, value %r is not a number",
+                                row_id, channel_id, value)
+                continue
+
+            # every row is staged with its own SourceTimestamp, so a catch-up batch historizes all of them
+            tag, timestamp_tag = tags
+            source_timestamp = self._get_source_timestamp(parsed_timestamp)
+            await self.on_data_change(tag, value, timestamp, source_timestamp)
+            timestamps[timestamp_tag] = (timestamp, source_timestamp)
+
+        for timestamp_tag, (timestamp, source_timestamp) in timestamps.items():
+            await self.on_data_change(timestamp_tag, timestamp, timestamp, source_timestamp)
+        await self.commit_data_changes()
+
+    async def _publish_latest_data(self):
+        # rows written before the start are not replayed, only the latest row of every channel is published
+        rows = await self._pool.fetch_all(LAST_ID_QUERY)
+        last_id = rows[0][0] if len(rows) > 0 and rows[0][0] is not None else 0
+
+        query = LATEST_DATA_QUERY.format(p=self._pool.placeholder)
+        latest_rows = []
+        for channel_id in self._channels:
+            latest_rows.extend(await self._pool.fetch_all(query, (channel_id,)))
+        await self._handle_rows(sorted(latest_rows))
+        # rows inserted after LAST_ID_QUERY are read by the next poll, the watermarks skip the ones published here
+        self._last_id = last_id
+
+    async def _poll_data(self):
+        query = DATA_QUERY.format(p=self._pool.placeholder)
+        batch_size = self._database.batch_size
+        while True:
+            rows = await self._pool.fetch_all(query, (self._last_id, batch_size))
+            await self._handle_rows(rows)
+            if len(rows) < batch_size:
+                break
+
+    async def subscribe(self):
+        interval = self._database.poll_interval if self._database.poll_interval is not None else POLL_TIME_INTERVAL
+        self.scheduler.schedule(self._poll_data, interval, label=self._database.database)
+
+    def _use_pool(self, pool: SqlConnectionPool, channels: list[ChannelModel]):
+        # new containers instead of clear(), a failed reload restores the old ones
+        self._pool = pool
+        self._last_id = 0
+        self._watermarks = {}
+        self._unknown_channels = set()
+        self._routes = {}
+        self._set_channels(channels)
+
+    async def _connect(self):
+        pool = SqlConnectionPool(self._database)
+        try:
+            with self.startup_timer.phase("load_channels"):
+                channels = await self._load_channels(pool)
+        except Exception:
+            await pool.close()
+            raise
+        self._use_pool(pool, channels)
+
+    async def start(self):
+        self.is_starting = True
+        with self.startup_timer.phase("parse_config"):
+            self.parse_config()
+        if self._database is None:
+            return
+        await self._connect()
+        self.configure_history()
+        with self.startup_timer.phase("create_unit_nodes"):
+            await self.create_unit_nodes()
+        with self.startup_timer.phase("create_sensors"):
+            await self.create_sensors()
+        with self.startup_timer.phase("publish_latest_data"):
+            await self._publish_latest_data()
+        self.startup_timer.report()
+        await self.subscribe()
+
+    async def reload(self) -> ConfigDiff:
+        # units and sensors come from the database, so a changed config is applied by connecting again and
+        # loading the channels; only the nodes of added, removed or changed sensors are touched
+        state = dict(self.__dict__)
+        old_units, old_sensors, old_mapping = self.units, self.sensors, self.mapping
+        try:
+            self.parse_config()
+        except Exception as e:
+            self.__dict__.update(state)
+            raise ValueError("cannot parse the configuration, keeping the running configuration: " + str(e))
+        if self._database is None:
+            self.__dict__.update(state)
+            raise ValueError("reloaded configuration has no database, keeping the running configuration")
+
+        # the new pool and its channels are loaded while the old pool keeps polling, it is only
+        # replaced once the database answered
+        pool = SqlConnectionPool(self._database)
+        try:
+            channels = await self._load_channels(pool)
+        except Exception as e:
+            await pool.close()
+            self.__dict__.update(state)
+            raise ValueError("cannot load the sensor data channels, keeping the running configuration: " + str(e))
+
+        self.scheduler.stop()
+        await self.close()
+        self._use_pool(pool, channels)
+        diff = ConfigDiff.create(old_units, old_sensors, old_mapping, self.units, self.sensors, self.mapping)
+        await self._apply_node_changes(diff)
+        self.configure_history()
+        await self._publish_latest_data()
+        await self.subscribe()
+        return diff
+
+    def stop(self):
+        self.is_starting = False
+        self.scheduler.stop()
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+
+from asyncua import Node, ua
+from asyncua.ua import String, Int16
+
+from core.opcua.opcua_server import OPCUAServer
+from core.opcua.write_coalescer import WriteCoalescer
+from utilities.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+# seconds between refreshes of the Diagnostics variables, 0 disables them
+DIAGNOSTICS_INTERVAL = float(os.getenv("DIAGNOSTICS_INTERVAL", 10))
+
+HISTOGRAM_FIELDS = ("Count", "P50Ms", "P99Ms", "MaxMs")
+
+
+# mirrors the metrics registry into the address space: a Diagnostics object under Objects holds one
+# variable per counter/gauge and an object with Count/P50Ms/P99Ms/MaxMs per histogram, so OPC UA
+# clients can read the same figures as the metrics endpoint
+class Diagnostics:
+    def __init__(self, server: OPCUAServer, registry: MetricsRegistry, interval: float = DIAGNOSTICS_INTERVAL):
+        self._server: OPCUAServer = server
+        self._registry: MetricsRegistry = registry
+        self._interval: float = interval
+        self._ns: int = server.get_namespace()
+        # the metrics are not historized, they would fill the sample buffer with the plugin's own values
+        self._writer: WriteCoalescer = server.create_write_coalescer(history=False)
+        self._diagnostics_node: Node | None = None
+        # series name -> variable nodes of the series
+        self._nodes: dict[str, dict[str, Node]] = {}
+        self._task: asyncio.Task | None = None
+
+    def _node_id(self, identifier: str) -> ua.NodeId:
+        return ua.NodeId(String(identifier), Int16(self._ns))
+
+    @staticmethod
+    def get_series_name(metric: Histogram | Counter | Gauge) -> str:
+        if len(metric.labels) == 0:
+            return metric.name
+        return metric.name + "[" + ",".join(key + "=" + value for key, value in metric.labels) + "]"
+
+    async def start(self):
+        if self._interval <= 0:
+            return
+        self._diagnostics_node = await self._server.get_objects_node().add_object(
+            self._node_id("Diagnostics"),
+            f"{self._ns}:Diagnostics"
+        )
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                _logger.warning("Cannot refresh diagnostics: %s", e)
+            await asyncio.sleep(self._interval)
+
+    async def _create_variable(self, parent: Node, identifier: str, name: str) -> Node:
+        return await parent.add_variable(
+            self._node_id(identifier),
+            f"{self._ns}:{name}",
+            ua.Variant(0.0, ua.VariantType.Double)
+        )
+
+    async def _create_series_nodes(self, metric: Histogram | Counter | Gauge, series: str) -> dict[str, Node]:
+        identifier = "Diagnostics|" + series
+        if not isinstance(metric, Histogram):
+            return {"": await self._create_variable(self._diagnostics_node, identifier, series)}
+
+        series_node = await self._diagnostics_node.add_object(self._node_id(identifier), f"{self._ns}:{series}")
+        return {
+            field: await self._create_variable(series_node, identifier + "." + field, field)
+            for field in HISTOGRAM_FIELDS
+        }
+
+    @staticmethod
+    def _get_values(metric: Histogram | Counter | Gauge) -> dict[str, float]:
+        if isinstance(metric, Histogram):
+            return {
+                "Count": float(metric.count),
+                "P50Ms": metric.quantile(0.5) * 1000,
+                "P99Ms": metric.quantile(0.99) * 1000,
+                "MaxMs": metric.max * 1000,
+            }
+        return {"": float(metric.value)}
+
+    async def refresh(self):
+        if self._diagnostics_node is None:
+            return
+        for metric in self._registry.metrics:
+            series = self.get_series_name(metric)
+            nodes = self._nodes.get(series)
+            if nodes is None:
+                nodes = await self._create_series_nodes(metric, series)
+                self._nodes[series] = nodes
+            try:
+                values = self._get_values(metric)
+            except Exception as e:
+                _logger.warning("Cannot read metric %s: %s", series, e)
+                continue
+            for field, value in values.items():
+                self._writer.stage(nodes[field], ua.Variant(value, ua.VariantType.Double))
+        await self._writer.commit()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
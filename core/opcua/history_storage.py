@@ -0,0 +1,247 @@
+import logging
+import math
+from collections import deque
+from datetime import datetime, timedelta
+
+from asyncua import ua
+from asyncua.server.history import HistoryManager, HistoryStorageInterface
+
+from core.opcua.rollup_store import ROLLUP_RESOLUTIONS, RollupStore
+from core.opcua.sample_buffer import MAX_HISTORY_DATA_RESPONSE_SIZE, SampleBuffer, to_epoch
+from models.history_model import HistoryModel
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+# nodes of sensors without a history configuration keep every sample in the sqlite buffer
+DEFAULT_HISTORY = HistoryModel()
+
+AGGREGATE_MINIMUM = ua.NodeId(ua.ObjectIds.AggregateFunction_Minimum)
+AGGREGATE_MAXIMUM = ua.NodeId(ua.ObjectIds.AggregateFunction_Maximum)
+AGGREGATE_AVERAGE = ua.NodeId(ua.ObjectIds.AggregateFunction_Average)
+
+
+class MemoryHistory:
+    def __init__(self):
+        self._values: dict[ua.NodeId, deque[ua.DataValue]] = {}
+
+    def append(self, node_id: ua.NodeId, data_value: ua.DataValue, count: int):
+        values = self._values.get(node_id)
+        if values is None:
+            values = deque(maxlen=count)
+            self._values[node_id] = values
+        values.append(data_value)
+
+    def read_values(self, node_id: ua.NodeId, start: datetime, end: datetime) -> list[ua.DataValue]:
+        return [dv for dv in self._values.get(node_id, ()) if start <= dv.SourceTimestamp < end]
+
+    def read(self, node_id: ua.NodeId, start: datetime, end: datetime, nb_values: int, max_size: int):
+        values = self._values.get(node_id, ())
+        # same ordering rules as the sqlite buffer
+        if start == ua.get_win_epoch():
+            results = [dv for dv in reversed(values) if end == ua.get_win_epoch() or dv.SourceTimestamp <= end]
+        elif end == ua.get_win_epoch():
+            results = [dv for dv in values if start <= dv.SourceTimestamp]
+        elif start > end:
+            results = [dv for dv in reversed(values) if end <= dv.SourceTimestamp <= start]
+        else:
+            results = [dv for dv in values if start <= dv.SourceTimestamp <= end]
+
+        if nb_values and len(results) > nb_values:
+            results = results[:nb_values]
+        cont = None
+        if len(results) > max_size:
+            cont = results[max_size].SourceTimestamp
+            results = results[:max_size]
+        return results, cont
+
+
+# History backend of the server. Each measurement node follows the history configuration of its
+# sensor type: raw samples go to a bounded in-memory ring, to the sqlite sample buffer or nowhere,
+# and numeric samples can also feed the 1-min/1-h rollups used for processed history reads.
+class HistoryStorage(HistoryStorageInterface):
+    def __init__(self, sample_buffer: SampleBuffer, rollup_store: RollupStore):
+        super().__init__(MAX_HISTORY_DATA_RESPONSE_SIZE)
+        self._sample_buffer: SampleBuffer = sample_buffer
+        self._rollup_store: RollupStore = rollup_store
+        self._memory: MemoryHistory = MemoryHistory()
+        # sensor node identifier -> history configuration of its sensor type
+        self._sensor_configs: dict[str, HistoryModel] = {}
+        self._node_configs: dict[ua.NodeId, HistoryModel] = {}
+
+    def configure(self, sensor_identifier: str, history: HistoryModel):
+        self._sensor_configs[sensor_identifier] = history
+        self._node_configs.clear()
+
+    def _get_config(self, node_id: ua.NodeId) -> HistoryModel:
+        config = self._node_configs.get(node_id)
+        if config is None:
+            config = DEFAULT_HISTORY
+            if node_id.NodeIdType == ua.NodeIdType.String:
+                # measurement identifiers are <sensor identifier>.<measurement path>
+                config = self._sensor_configs.get(node_id.Identifier.split(".", 1)[0], DEFAULT_HISTORY)
+            self._node_configs[node_id] = config
+        return config
+
+    def is_historizing(self, node_id: ua.NodeId) -> bool:
+        return self._get_config(node_id).backend != "none"
+
+    async def init(self):
+        await self._sample_buffer.init()
+        await self._rollup_store.init()
+
+    async def append(self, samples: list[tuple[ua.NodeId, ua.DataValue]]):
+        buffered_samples = []
+        for node_id, data_value in samples:
+            config = self._get_config(node_id)
+            if config.backend == "sqlite":
+                buffered_samples.append((node_id, data_value))
+            elif config.backend == "memory":
+                self._memory.append(node_id, data_value, config.count)
+
+            value = data_value.Value.Value
+            if config.rollups and isinstance(value, (int, float)) and not isinstance(value, bool):
+                self._rollup_store.add(node_id.to_string(), to_epoch(data_value.SourceTimestamp), value)
+
+        await self._sample_buffer.append(buffered_samples)
+        await self._rollup_store.flush()
+
+    async def new_historized_node(self, node_id, period, count=0):
+        pass
+
+    async def save_node_value(self, node_id, datavalue):
+        await self.append([(node_id, datavalue)])
+
+    async def read_node_history(self, node_id, start, end, nb_values):
+        config = self._get_config(node_id)
+        if config.backend == "memory":
+            if start is None:
+                start = ua.get_win_epoch()
+            if end is None:
+                end = ua.get_win_epoch()
+            return self._memory.read(node_id, start, end, nb_values, self.max_history_data_response_size)
+        if config.backend == "sqlite":
+            return await self._sample_buffer.read_node_history(node_id, start, end, nb_values)
+        return [], None
+
+    async def _read_values(self, node_id: ua.NodeId, start: datetime, end: datetime) -> list[ua.DataValue]:
+        config = self._get_config(node_id)
+        if config.backend == "memory":
+            return self._memory.read_values(node_id, start, end)
+        if config.backend == "sqlite":
+            return await self._sample_buffer.read_values(node_id, start, end)
+        return []
+
+    async def read_node_processed(
+            self,
+            node_id: ua.NodeId,
+            start: datetime,
+            end: datetime,
+            interval: float,
+            aggregate: ua.NodeId
+    ) -> list[ua.DataValue]:
+        if aggregate not in (AGGREGATE_MINIMUM, AGGREGATE_MAXIMUM, AGGREGATE_AVERAGE):
+            raise ua.UaStatusCodeError(ua.StatusCodes.BadAggregateNotSupported)
+
+        start_time = to_epoch(start)
+        end_time = to_epoch(end)
+        if end_time <= start_time:
+            return []
+        if interval <= 0:
+            interval = end_time - start_time
+        interval_count = math.ceil((end_time - start_time) / interval)
+        if interval_count > self.max_history_data_response_size:
+            raise ua.UaStatusCodeError(ua.StatusCodes.BadResponseTooLarge)
+
+        # [min, max, sum, count] per processing interval
+        intervals: list[list[float] | None] = [None] * interval_count
+
+        def merge(index: int, minimum: float, maximum: float, total: float, count: int):
+            current = intervals[index]
+            if current is None:
+                intervals[index] = [minimum, maximum, total, count]
+            else:
+                current[0] = min(current[0], minimum)
+                current[1] = max(current[1], maximum)
+                current[2] += total
+                current[3] += count
+
+        resolution = self._get_rollup_resolution(node_id, start_time, interval)
+        if resolution is not None:
+            for bucket, minimum, maximum, total, count in await self._rollup_store.read(
+                    node_id.to_string(), resolution, start_time, end_time):
+                merge(int((bucket - start_time) // interval), minimum, maximum, total, count)
+        else:
+            for data_value in await self._read_values(node_id, start, end):
+                value = data_value.Value.Value
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    merge(int((to_epoch(data_value.SourceTimestamp) - start_time) // interval), value, value, value, 1)
+
+        results = []
+        for index, current in enumerate(intervals):
+            timestamp = start + timedelta(seconds=index * interval)
+            if current is None:
+                results.append(ua.DataValue(
+                    StatusCode_=ua.StatusCode(ua.StatusCodes.BadNoData),
+                    SourceTimestamp=timestamp
+                ))
+                continue
+            if aggregate == AGGREGATE_MINIMUM:
+                value = current[0]
+            elif aggregate == AGGREGATE_MAXIMUM:
+                value = current[1]
+            else:
+                value = current[2] / current[3]
+            results.append(ua.DataValue(ua.Variant(value, ua.VariantType.Double), SourceTimestamp=timestamp))
+        return results
+
+    def _get_rollup_resolution(self, node_id: ua.NodeId, start_time: float, interval: float) -> int | None:
+        if not self._get_config(node_id).rollups:
+            return None
+        for resolution in reversed(ROLLUP_RESOLUTIONS):
+            if start_time % resolution == 0 and interval % resolution == 0:
+                return resolution
+        return None
+
+    async def new_historized_event(self, source_id, evtypes, period, count=0):
+        pass
+
+    async def save_event(self, event):
+        pass
+
+    async def read_event_history(self, source_id, start, end, nb_values, evfilter):
+        return [], None
+
+    async def stop(self):
+        await self._rollup_store.stop()
+        await self._sample_buffer.stop()
+
+
+# asyncua answers ReadProcessedDetails with BadNotImplemented, this adds Minimum/Maximum/Average
+class ProcessedHistoryManager(HistoryManager):
+    async def read_history(self, params):
+        details = params.HistoryReadDetails
+        if not isinstance(details, ua.ReadProcessedDetails) or not isinstance(self.storage, HistoryStorage):
+            return await super().read_history(params)
+
+        results = []
+        for index, rv in enumerate(params.NodesToRead):
+            result = ua.HistoryReadResult()
+            if index >= len(details.AggregateType):
+                result.StatusCode = ua.StatusCode(ua.StatusCodes.BadAggregateListMismatch)
+                results.append(result)
+                continue
+            try:
+                result.HistoryData = ua.HistoryData()
+                result.HistoryData.DataValues = await self.storage.read_node_processed(
+                    rv.NodeId,
+                    details.StartTime,
+                    details.EndTime,
+                    details.ProcessingInterval / 1000,
+                    details.AggregateType[index]
+                )
+            except ua.UaStatusCodeError as e:
+                result.HistoryData = None
+                result.StatusCode = ua.StatusCode(e.code)
+            results.append(result)
+        return results
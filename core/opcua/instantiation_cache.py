@@ -0,0 +1,129 @@
+import asyncio
+import copy
+import logging
+import os
+from typing import Any
+
+from asyncua import Node, ua
+from asyncua.common.manage_nodes import create_object
+
+from core.constants import UNNECESSARY_SENSOR_PROPERTIES
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+PRUNE_SENSOR_PROPERTIES = os.getenv("PRUNE_SENSOR_PROPERTIES", "false").lower() == "true"
+
+
+class _RecordingSession:
+    # forwards everything to the real session and keeps a copy of every AddNodesItem sent
+    def __init__(self, session: Any):
+        self._session = session
+        self.items: list[ua.AddNodesItem] = []
+
+    async def add_nodes(self, items: list[ua.AddNodesItem]) -> list[ua.AddNodesResult]:
+        self.items.extend(copy.deepcopy(items))
+        return await self._session.add_nodes(items)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+
+class InstantiationCache:
+    def __init__(self):
+        self._plans: dict[tuple[ua.NodeId, bool], list[ua.AddNodesItem]] = {}
+        self._locks: dict[tuple[ua.NodeId, bool], asyncio.Lock] = {}
+
+    async def create_object(
+            self,
+            parent_node: Node,
+            node_id: ua.NodeId,
+            browse_name: str,
+            type_definition: ua.NodeId,
+            prune: bool = False
+    ) -> Node:
+        if node_id.NodeIdType != ua.NodeIdType.String:
+            return await create_object(parent_node, node_id, browse_name, type_definition)
+
+        key = (type_definition, prune)
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        async with self._locks[key]:
+            if key not in self._plans:
+                return await self._record(key, parent_node, node_id, browse_name, type_definition, prune)
+
+        return await self._replay(self._plans[key], parent_node, node_id, browse_name)
+
+    async def _record(
+            self,
+            key: tuple[ua.NodeId, bool],
+            parent_node: Node,
+            node_id: ua.NodeId,
+            browse_name: str,
+            type_definition: ua.NodeId,
+            prune: bool
+    ) -> Node:
+        session = _RecordingSession(parent_node.session)
+        node = await create_object(Node(session, parent_node.nodeid), node_id, browse_name, type_definition)
+        items = session.items
+        if prune:
+            items = await self._prune(parent_node, items)
+        self._plans[key] = items
+        return Node(parent_node.session, node.nodeid)
+
+    @staticmethod
+    async def _prune(parent_node: Node, items: list[ua.AddNodesItem]) -> list[ua.AddNodesItem]:
+        pruned_node_ids = set()
+        kept_items = []
+        for item in items[1:]:
+            if item.BrowseName.Name in UNNECESSARY_SENSOR_PROPERTIES or item.ParentNodeId in pruned_node_ids:
+                pruned_node_ids.add(item.RequestedNewNodeId)
+            else:
+                kept_items.append(item)
+        if len(pruned_node_ids) > 0:
+            params = ua.DeleteNodesParameters()
+            for node_id in pruned_node_ids:
+                delete_item = ua.DeleteNodesItem()
+                delete_item.NodeId = node_id
+                delete_item.DeleteTargetReferences = True
+                params.NodesToDelete.append(delete_item)
+            await parent_node.session.delete_nodes(params)
+        return [items[0]] + kept_items
+
+    @staticmethod
+    async def _replay(
+            plan: list[ua.AddNodesItem],
+            parent_node: Node,
+            node_id: ua.NodeId,
+            browse_name: str
+    ) -> Node:
+        template_identifier = plan[0].RequestedNewNodeId.Identifier
+        if await parent_node.read_type_definition() == ua.NodeId(ua.ObjectIds.FolderType):
+            reference_type = ua.NodeId(ua.ObjectIds.Organizes)
+        else:
+            reference_type = ua.NodeId(ua.ObjectIds.HasComponent)
+
+        items = []
+        for template_item in plan:
+            item = copy.copy(template_item)
+            item.NodeAttributes = copy.copy(template_item.NodeAttributes)
+            item.RequestedNewNodeId = ua.NodeId(
+                node_id.Identifier + template_item.RequestedNewNodeId.Identifier[len(template_identifier):],
+                node_id.NamespaceIndex
+            )
+            if template_item is plan[0]:
+                item.ParentNodeId = parent_node.nodeid
+                item.ReferenceTypeId = reference_type
+                item.BrowseName = ua.QualifiedName.from_string(browse_name)
+                item.NodeAttributes.DisplayName = ua.LocalizedText(item.BrowseName.Name)
+            else:
+                item.ParentNodeId = ua.NodeId(
+                    node_id.Identifier + template_item.ParentNodeId.Identifier[len(template_identifier):],
+                    node_id.NamespaceIndex
+                )
+            items.append(item)
+
+        results = await parent_node.session.add_nodes(items)
+        for item, result in zip(items, results):
+            result.StatusCode.check()
+        return Node(parent_node.session, results[0].AddedNodeId)
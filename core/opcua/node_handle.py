@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from asyncua import Node, ua
+
+# python type a value is converted to before it is wrapped in a Variant of that type
+_VARIANT_PYTHON_TYPES: dict[ua.VariantType, Callable[[Any], Any]] = {
+    ua.VariantType.Boolean: bool,
+    ua.VariantType.SByte: int,
+    ua.VariantType.Byte: int,
+    ua.VariantType.Int16: int,
+    ua.VariantType.UInt16: int,
+    ua.VariantType.Int32: int,
+    ua.VariantType.UInt32: int,
+    ua.VariantType.Int64: int,
+    ua.VariantType.UInt64: int,
+    ua.VariantType.Float: float,
+    ua.VariantType.Double: float,
+    ua.VariantType.String: str,
+}
+
+
+# cached server node of an identifier together with the variant type of its DataType
+@dataclass(frozen=True, slots=True)
+class NodeHandle:
+    node: Node
+    # None for objects and variables of a non builtin DataType
+    variant_type: ua.VariantType | None
+
+    def to_variant(self, value: Any) -> ua.Variant:
+        if self.variant_type is None:
+            return ua.Variant(value)
+        return ua.Variant(_VARIANT_PYTHON_TYPES.get(self.variant_type, _identity)(value), self.variant_type)
+
+
+def _identity(value: Any) -> Any:
+    return value
@@ -2,15 +2,17 @@ import abc
 import logging
 
 from asyncua import Node, ua, Server
-from asyncua.common.manage_nodes import create_object
 from asyncua.ua import Int16, String
 
 from aquacloud_common.models.common.aqua_base_model import AquaBaseModel
+from core.opcua.instantiation_cache import InstantiationCache, PRUNE_SENSOR_PROPERTIES
 from utilities.config_parser import get_type_definition_identifier_from_model
 
 _logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.WARNING)
 
+_instantiation_cache = InstantiationCache()
+
 
 class Base(metaclass=abc.ABCMeta):
     def __init__(
@@ -31,6 +33,7 @@ class Base(metaclass=abc.ABCMeta):
         if "Sensor" in self.__class__.__name__:
             obj_type = "Sensor"
 
+        self._is_sensor: bool = obj_type == "Sensor"
         self.identifier = obj_type + "|" + model.name
 
         if path != "":
@@ -44,8 +47,23 @@ class Base(metaclass=abc.ABCMeta):
         node_id = ua.NodeId(String(self.identifier), Int16(self.ns))
         type_definition_identifier = get_type_definition_identifier_from_model(self.model)
         type_definition = ua.NodeId(String(type_definition_identifier), Int16(self.ns))
+
+        # drivers share one address space, a unit can already have been created by another driver
+        existing_node = Node(self.parent_node.session, node_id)
+        try:
+            await existing_node.read_node_class()
+            return existing_node
+        except ua.UaStatusCodeError:
+            pass
+
         try:
-            return await create_object(self.parent_node, node_id, self._browser_name, type_definition)
+            return await _instantiation_cache.create_object(
+                self.parent_node,
+                node_id,
+                self._browser_name,
+                type_definition,
+                PRUNE_SENSOR_PROPERTIES and self._is_sensor
+            )
         except Exception as e:
             _logger.warning("Cannot create node", e)
             return None
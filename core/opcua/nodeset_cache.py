@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import os
+import pickle
+from importlib.metadata import version
+
+from asyncua import Server, ua
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+NODESET_CACHE_VERSION = 1
+
+
+# Snapshot of the nodes added by importing a nodeset xml file, keyed by the xml file hash.
+# It holds the new nodes plus the references the import appended to existing namespace 0 nodes,
+# so later starts restore the nodeset in bulk instead of parsing the xml again.
+class NodesetCache:
+    def __init__(self, server: Server, xml_file_path: str, cache_dir: str):
+        self._server: Server = server
+        self._xml_file_path: str = xml_file_path
+        self._cache_dir: str = cache_dir
+
+    def _get_cache_file_path(self) -> str:
+        sha256 = hashlib.sha256()
+        with open(self._xml_file_path, "rb") as xml_file:
+            for chunk in iter(lambda: xml_file.read(1 << 16), b""):
+                sha256.update(chunk)
+        sha256.update(version("asyncua").encode())
+        sha256.update(str(NODESET_CACHE_VERSION).encode())
+        file_name = os.path.basename(self._xml_file_path) + "." + sha256.hexdigest()[:16] + ".pickle"
+        return os.path.join(self._cache_dir, file_name)
+
+    async def import_xml(self):
+        cache_file_path = self._get_cache_file_path()
+        if os.path.exists(cache_file_path):
+            try:
+                await self._load(cache_file_path)
+                return
+            except Exception as e:
+                _logger.warning("Cannot load nodeset cache %s, importing xml: %s", cache_file_path, e)
+                await self._server.import_xml(path=self._xml_file_path)
+                return
+
+        aspace = self._server.iserver.aspace
+        reference_counts = {node_id: len(aspace[node_id].references) for node_id in aspace.keys()}
+        await self._server.import_xml(path=self._xml_file_path)
+        try:
+            self._save(cache_file_path, reference_counts, await self._server.get_namespace_array())
+        except Exception as e:
+            _logger.warning("Cannot write nodeset cache %s: %s", cache_file_path, e)
+
+    def _save(self, cache_file_path: str, reference_counts: dict[ua.NodeId, int], namespaces: list[str]):
+        aspace = self._server.iserver.aspace
+        nodes = {}
+        references = {}
+        for node_id in aspace.keys():
+            node_data = aspace[node_id]
+            if node_id not in reference_counts:
+                nodes[node_id] = node_data
+            elif len(node_data.references) > reference_counts[node_id]:
+                references[node_id] = node_data.references[reference_counts[node_id]:]
+
+        snapshot = {
+            "version": NODESET_CACHE_VERSION,
+            "namespaces": namespaces,
+            "nodes": nodes,
+            "references": references,
+        }
+        os.makedirs(self._cache_dir, exist_ok=True)
+        tmp_file_path = cache_file_path + ".tmp"
+        with open(tmp_file_path, "wb") as cache_file:
+            pickle.dump(snapshot, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file_path, cache_file_path)
+
+    async def _load(self, cache_file_path: str):
+        with open(cache_file_path, "rb") as cache_file:
+            snapshot = pickle.load(cache_file)
+        if snapshot["version"] != NODESET_CACHE_VERSION:
+            raise ValueError("unsupported nodeset cache version " + str(snapshot["version"]))
+
+        for uri in snapshot["namespaces"]:
+            await self._server.register_namespace(uri)
+        namespaces = await self._server.get_namespace_array()
+        if namespaces[:len(snapshot["namespaces"])] != snapshot["namespaces"]:
+            raise ValueError("namespace indexes do not match the cached nodeset")
+
+        aspace = self._server.iserver.aspace
+        for node_id in snapshot["references"]:
+            if node_id not in aspace:
+                raise ValueError("cached nodeset references unknown node " + node_id.to_string())
+        for node_id, node_data in snapshot["nodes"].items():
+            aspace[node_id] = node_data
+        for node_id, references in snapshot["references"].items():
+            aspace[node_id].references.extend(references)
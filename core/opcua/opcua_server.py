@@ -21,6 +21,9 @@ from aquacloud_common.models.sensor.feeding.calculated_accumulated_feeding_senso
     CalculatedAccumulatedFeedingSensorModel
 from aquacloud_common.models.sensor.feeding.feed_silo_sensor import FeedSiloSensorModel
 from aquacloud_common.models.sensor.feeding.feeding_intensity_sensor import FeedingIntensitySensorModel
+from core.constants import FILES_PATH
+from core.opcua.history_storage import HistoryStorage, ProcessedHistoryManager
+from core.opcua.node_handle import NodeHandle
 from core.opcua.nodes.base_sensor_node import BaseSensorNode
 from core.opcua.nodes.calculated_accumulated_deeding_sensor_node import CalculatedAccumulatedFeedingSensorNode
 from core.opcua.nodes.co2_sensor_node import CO2SensorNode
@@ -35,13 +38,36 @@ from core.opcua.nodes.ph_sensor_node import PHSensorNode
 from core.opcua.nodes.salinity_sensor_node import SalinitySensorNode
 from core.opcua.nodes.sea_current_sensor_node import SeaCurrentSensorNode
 from core.opcua.nodes.temperature_sensor_node import TemperatureSensorNode
+from core.opcua.nodeset_cache import NodesetCache
+from core.opcua.rollup_store import RollupStore
+from core.opcua.sample_buffer import SAMPLE_BUFFER_ENABLED, SAMPLE_BUFFER_PATH, SampleBuffer
+from core.opcua.write_coalescer import WriteCoalescer
+from models.history_model import HistoryModel
+from utilities.startup import NODE_BUILD_CONCURRENCY, StartupTimer, gather_with_concurrency
 
 USERNAME = os.getenv("OPC_UA_USERNAME", "")
 PASSWORD = os.getenv("OPC_UA_PASSWORD", "")
+NODESET_CACHE_DIR = os.getenv("NODESET_CACHE_DIR", os.path.join(FILES_PATH, "cache"))
 
 _logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.WARNING)
 
+SENSOR_NODE_CLASSES: dict[type[BaseSensorModel], type[BaseSensorNode]] = {
+    CalculatedAccumulatedFeedingSensorModel: CalculatedAccumulatedFeedingSensorNode,
+    FeedingIntensitySensorModel: FeedingIntensitySensorNode,
+    FeedSiloSensorModel: FeedSiloSensorNode,
+    OxygenSaturationSensorModel: OxygenSaturationSensorNode,
+    OxygenConcentrationSensorModel: OxygenConcentrationSensorNode,
+    TemperatureSensorModel: TemperatureSensorNode,
+    SalinitySensorModel: SalinitySensorNode,
+    SeaCurrentSensorModel: SeaCurrentSensorNode,
+    NTUSensorModel: NTUSensorNode,
+    FTUSensorModel: FTUSensorNode,
+    PHSensorModel: PHSensorNode,
+    CO2SensorModel: CO2SensorNode,
+    LightSensorModel: LightSensorNode,
+}
+
 
 class UserManager:
     def get_user(self, iserver, username=None, password=None, certificate=None):
@@ -70,16 +96,31 @@ class OPCUAServer:
         ])
         self._server.set_security_IDs(["Username"])
 
+        # samples committed by the drivers are kept as history and served through HistoryRead
+        self._history: HistoryStorage | None = None
+        if SAMPLE_BUFFER_ENABLED:
+            self._history = HistoryStorage(SampleBuffer(), RollupStore(SAMPLE_BUFFER_PATH))
+            self._server.iserver.history_manager = ProcessedHistoryManager(self._server.iserver)
+            self._server.iserver.history_manager.set_storage(self._history)
+
+        # identifier -> node handle, entries of deleted nodes are dropped when they are looked up
+        self._node_handles: dict[str, NodeHandle] = {}
+
         self._objects_node: Node = self._server.get_objects_node()
+        self.startup_timer: StartupTimer = StartupTimer("OPC UA server")
 
     async def init(self) -> bool:
-        await self._server.init()
-        self._ns = await self._server.register_namespace(self._uri)
-        return await self._import_nodeset_from_xml_file(self._xml_file_path)
+        with self.startup_timer.phase("init"):
+            await self._server.init()
+            self._ns = await self._server.register_namespace(self._uri)
+        with self.startup_timer.phase("import_nodeset"):
+            status = await self._import_nodeset_from_xml_file(self._xml_file_path)
+        self.startup_timer.report()
+        return status
 
     async def _import_nodeset_from_xml_file(self, xml_file_path: str) -> bool:
         try:
-            await self._server.import_xml(path=xml_file_path)
+            await NodesetCache(self._server, xml_file_path, NODESET_CACHE_DIR).import_xml()
             return True
         except Exception as e:
             _logger.warning(e)
@@ -95,13 +136,46 @@ class OPCUAServer:
     async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any):
         await self._server.stop()
 
-    def get_node(self, identifier: str) -> Node | None:
+    def get_node_handle(self, identifier: str) -> NodeHandle | None:
+        address_space = self._server.iserver.aspace
+        handle = self._node_handles.get(identifier)
+        if handle is not None:
+            if handle.node.nodeid in address_space:
+                return handle
+            del self._node_handles[identifier]
+            return None
+
         node_id = ua.NodeId(String(identifier), Int16(self._ns))
-        try:
-            return self._server.get_node(node_id)
-        except Exception as e:
-            _logger.warning("Node not found", e)
+        if node_id not in address_space:
             return None
+        handle = NodeHandle(self._server.get_node(node_id), self._read_variant_type(node_id))
+        self._node_handles[identifier] = handle
+        return handle
+
+    def _read_variant_type(self, node_id: NodeId) -> ua.VariantType | None:
+        data_value = self._server.iserver.aspace.read_attribute_value(node_id, ua.AttributeIds.DataType)
+        if not data_value.StatusCode.is_good() or data_value.Value is None:
+            return None
+        data_type = data_value.Value.Value
+        if not isinstance(data_type, NodeId) or data_type.NamespaceIndex != 0 \
+                or not isinstance(data_type.Identifier, int) or data_type.Identifier > 25:
+            return None
+        return ua.datatype_to_varianttype(data_type)
+
+    def get_node(self, identifier: str) -> Node | None:
+        handle = self.get_node_handle(identifier)
+        if handle is None:
+            return None
+        return handle.node
+
+    async def delete_node(self, identifier: str) -> bool:
+        # deletes the node with everything below it, cached handles of those nodes are dropped on their next lookup
+        node = self.get_node(identifier)
+        if node is None:
+            return False
+        await self._server.delete_nodes([node], recursive=True)
+        self._node_handles.pop(identifier, None)
+        return True
 
     async def get_node_by_node_id(self, node_id: NodeId) -> Node | None:
         try:
@@ -110,6 +184,14 @@ class OPCUAServer:
             _logger.warning("Node not found", e)
             return None
 
+    def create_write_coalescer(self, history: bool = True) -> WriteCoalescer:
+        # history=False writes the values without historizing them
+        return WriteCoalescer(self._server, self._history if history else None)
+
+    def configure_history(self, sensor_identifier: str, history: HistoryModel):
+        if self._history is not None:
+            self._history.configure(sensor_identifier, history)
+
     def get_namespace(self):
         return self._ns
 
@@ -118,47 +200,11 @@ class OPCUAServer:
 
     @staticmethod
     async def create_sensors(sensors_node: Node, sensors: list[BaseSensorModel], ns: int, identifier: str):
-        for sensor in sensors:
-            class_name = sensor.__class__
-            sensor_node = BaseSensorNode(sensor, ns, sensors_node, identifier)
-            if class_name == CalculatedAccumulatedFeedingSensorModel:
-                s = CalculatedAccumulatedFeedingSensorModel.model_validate(sensor.model_dump())
-                sensor_node = CalculatedAccumulatedFeedingSensorNode(s, ns, sensors_node, identifier)
-            elif class_name == FeedingIntensitySensorModel:
-                s = FeedingIntensitySensorModel.model_validate(sensor.model_dump())
-                sensor_node = FeedingIntensitySensorNode(s, ns, sensors_node, identifier)
-            elif class_name == FeedSiloSensorModel:
-                s = FeedSiloSensorModel.model_validate(sensor.model_dump())
-                sensor_node = FeedSiloSensorNode(s, ns, sensors_node, identifier)
-            elif class_name == OxygenSaturationSensorModel:
-                s = OxygenSaturationSensorModel.model_validate(sensor.model_dump())
-                sensor_node = OxygenSaturationSensorNode(s, ns, sensors_node, identifier)
-            elif class_name == OxygenConcentrationSensorModel:
-                s = OxygenConcentrationSensorModel.model_validate(sensor.model_dump())
-                sensor_node = OxygenConcentrationSensorNode(s, ns, sensors_node, identifier)
-            elif class_name == TemperatureSensorModel:
-                s = TemperatureSensorModel.model_validate(sensor.model_dump())
-                sensor_node = TemperatureSensorNode(s, ns, sensors_node, identifier)
-            elif class_name == SalinitySensorModel:
-                s = SalinitySensorModel.model_validate(sensor.model_dump())
-                sensor_node = SalinitySensorNode(s, ns, sensors_node, identifier)
-            elif class_name == SeaCurrentSensorModel:
-                s = SeaCurrentSensorModel.model_validate(sensor.model_dump())
-                sensor_node = SeaCurrentSensorNode(s, ns, sensors_node, identifier)
-            elif class_name == NTUSensorModel:
-                s = NTUSensorModel.model_validate(sensor.model_dump())
-                sensor_node = NTUSensorNode(s, ns, sensors_node, identifier)
-            elif class_name == FTUSensorModel:
-                s = FTUSensorModel.model_validate(sensor.model_dump())
-                sensor_node = FTUSensorNode(s, ns, sensors_node, identifier)
-            elif class_name == PHSensorModel:
-                s = PHSensorModel.model_validate(sensor.model_dump())
-                sensor_node = PHSensorNode(s, ns, sensors_node, identifier)
-            elif class_name == CO2SensorModel:
-                s = CO2SensorModel.model_validate(sensor.model_dump())
-                sensor_node = CO2SensorNode(s, ns, sensors_node, identifier)
-            elif class_name == LightSensorModel:
-                s = LightSensorModel.model_validate(sensor.model_dump())
-                sensor_node = LightSensorNode(s, ns, sensors_node, identifier)
-
-            await sensor_node.init()
+        sensor_nodes = [OPCUAServer._create_sensor_node(sensors_node, sensor, ns, identifier) for sensor in sensors]
+        await gather_with_concurrency(NODE_BUILD_CONCURRENCY, [sensor_node.init() for sensor_node in sensor_nodes])
+
+    @staticmethod
+    def _create_sensor_node(sensors_node: Node, sensor: BaseSensorModel, ns: int, identifier: str) -> BaseSensorNode:
+        # the parsers create the sensor models, so they are already valid and can be used as they are
+        node_class = SENSOR_NODE_CLASSES.get(sensor.__class__, BaseSensorNode)
+        return node_class(sensor, ns, sensors_node, identifier)
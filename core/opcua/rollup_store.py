@@ -0,0 +1,119 @@
+import logging
+import os
+from datetime import datetime, timezone
+
+import aiosqlite
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+# bucket sizes in seconds, largest last
+ROLLUP_RESOLUTIONS = (60, 3600)
+ROLLUP_MAX_AGE = int(os.getenv("ROLLUP_MAX_AGE", 90 * 24 * 3600))
+
+
+# Precomputed min/max/sum/count per node per 1-min and 1-h bucket. Buckets stay in memory
+# until they are closed and are then upserted in one batch, so a node costs one row per bucket.
+class RollupStore:
+    def __init__(self, path: str, max_age: int = ROLLUP_MAX_AGE):
+        self._path: str = path
+        self._max_age: int = max_age
+        self._db: aiosqlite.Connection | None = None
+        # (node_id, resolution, bucket) -> [min, max, sum, count] not written yet
+        self._open: dict[tuple[str, int, int], list[float]] = {}
+        self._next_flush: float = 0
+        self._next_eviction: float = 0
+
+    async def init(self):
+        if self._path != ":memory:":
+            os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        self._db = await aiosqlite.connect(self._path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rollups ("
+            "node_id TEXT NOT NULL, "
+            "resolution INTEGER NOT NULL, "
+            "bucket INTEGER NOT NULL, "
+            "min_value REAL NOT NULL, "
+            "max_value REAL NOT NULL, "
+            "sum_value REAL NOT NULL, "
+            "count_value INTEGER NOT NULL, "
+            "PRIMARY KEY (node_id, resolution, bucket)) WITHOUT ROWID"
+        )
+        await self._db.commit()
+
+    def add(self, node_id: str, timestamp: float, value: float):
+        for resolution in ROLLUP_RESOLUTIONS:
+            key = (node_id, resolution, int(timestamp // resolution) * resolution)
+            rollup = self._open.get(key)
+            if rollup is None:
+                self._open[key] = [value, value, value, 1]
+            else:
+                if value < rollup[0]:
+                    rollup[0] = value
+                if value > rollup[1]:
+                    rollup[1] = value
+                rollup[2] += value
+                rollup[3] += 1
+
+    async def flush(self, force: bool = False):
+        if self._db is None:
+            return
+        now = datetime.now(timezone.utc).timestamp()
+        if not force and now < self._next_flush:
+            return
+        self._next_flush = (now // ROLLUP_RESOLUTIONS[0] + 1) * ROLLUP_RESOLUTIONS[0]
+
+        closed = [key for key in self._open if force or key[2] + key[1] <= now]
+        if len(closed) > 0:
+            rows = [key + tuple(self._open.pop(key)) for key in closed]
+            try:
+                await self._db.executemany(
+                    "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (node_id, resolution, bucket) DO UPDATE SET "
+                    "min_value = MIN(min_value, excluded.min_value), "
+                    "max_value = MAX(max_value, excluded.max_value), "
+                    "sum_value = sum_value + excluded.sum_value, "
+                    "count_value = count_value + excluded.count_value",
+                    rows
+                )
+                await self._db.commit()
+            except Exception as e:
+                _logger.warning("Cannot write %s rollups: %s", len(rows), e)
+
+        if now >= self._next_eviction:
+            self._next_eviction = now + ROLLUP_RESOLUTIONS[-1]
+            await self._db.execute("DELETE FROM rollups WHERE bucket < ?", (now - self._max_age,))
+            await self._db.commit()
+
+    async def read(self, node_id: str, resolution: int, start: float, end: float) -> list[tuple[int, float, float, float, int]]:
+        if self._db is None:
+            return []
+        async with self._db.execute(
+            "SELECT bucket, min_value, max_value, sum_value, count_value FROM rollups "
+            "WHERE node_id = ? AND resolution = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (node_id, resolution, start, end)
+        ) as cursor:
+            buckets = {row[0]: list(row[1:]) for row in await cursor.fetchall()}
+
+        # merge the buckets that are still open
+        for (open_node_id, open_resolution, bucket), rollup in self._open.items():
+            if open_node_id != node_id or open_resolution != resolution or not start <= bucket < end:
+                continue
+            if bucket not in buckets:
+                buckets[bucket] = list(rollup)
+            else:
+                merged = buckets[bucket]
+                merged[0] = min(merged[0], rollup[0])
+                merged[1] = max(merged[1], rollup[1])
+                merged[2] += rollup[2]
+                merged[3] += rollup[3]
+
+        return [(bucket,) + tuple(buckets[bucket]) for bucket in sorted(buckets)]
+
+    async def stop(self):
+        if self._db is not None:
+            await self.flush(force=True)
+            await self._db.close()
+            self._db = None
@@ -0,0 +1,181 @@
+import logging
+import os
+from datetime import datetime, timezone
+
+import aiosqlite
+from asyncua import ua
+from asyncua.common.utils import Buffer
+from asyncua.server.history import HistoryStorageInterface
+
+from core.constants import FILES_PATH
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+SAMPLE_BUFFER_ENABLED = os.getenv("SAMPLE_BUFFER_ENABLED", "true").lower() == "true"
+SAMPLE_BUFFER_PATH = os.getenv("SAMPLE_BUFFER_PATH", os.path.join(FILES_PATH, "buffer", "samples.sqlite"))
+SAMPLE_BUFFER_MAX_AGE = int(os.getenv("SAMPLE_BUFFER_MAX_AGE", 7 * 24 * 3600))
+SAMPLE_BUFFER_MAX_SAMPLES = int(os.getenv("SAMPLE_BUFFER_MAX_SAMPLES", 5000000))
+SAMPLE_BUFFER_SEGMENT_SECONDS = int(os.getenv("SAMPLE_BUFFER_SEGMENT_SECONDS", 3600))
+MAX_HISTORY_DATA_RESPONSE_SIZE = int(os.getenv("MAX_HISTORY_DATA_RESPONSE_SIZE", 10000))
+
+
+def to_epoch(timestamp: datetime) -> float:
+    return timestamp.replace(tzinfo=timezone.utc).timestamp()
+
+
+# Append-only sample store in a sqlite WAL database, also used as the server history backend.
+# Samples are grouped in segments of SAMPLE_BUFFER_SEGMENT_SECONDS by arrival time and whole
+# segments are evicted, oldest first, once they are older than SAMPLE_BUFFER_MAX_AGE or the
+# buffer holds more than SAMPLE_BUFFER_MAX_SAMPLES samples.
+class SampleBuffer(HistoryStorageInterface):
+    def __init__(
+            self,
+            path: str = SAMPLE_BUFFER_PATH,
+            max_age: int = SAMPLE_BUFFER_MAX_AGE,
+            max_samples: int = SAMPLE_BUFFER_MAX_SAMPLES,
+            segment_seconds: int = SAMPLE_BUFFER_SEGMENT_SECONDS
+    ):
+        super().__init__(MAX_HISTORY_DATA_RESPONSE_SIZE)
+        self._path: str = path
+        self._max_age: int = max_age
+        self._max_samples: int = max_samples
+        self._segment_seconds: int = segment_seconds
+        self._db: aiosqlite.Connection | None = None
+        # segment -> sample count, kept in memory so eviction never has to count rows
+        self._segments: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return sum(self._segments.values())
+
+    async def init(self):
+        if self._path != ":memory:":
+            os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        self._db = await aiosqlite.connect(self._path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            "segment INTEGER NOT NULL, "
+            "node_id TEXT NOT NULL, "
+            "source_timestamp REAL NOT NULL, "
+            "value BLOB NOT NULL)"
+        )
+        await self._db.execute("CREATE INDEX IF NOT EXISTS samples_node ON samples (node_id, source_timestamp)")
+        await self._db.execute("CREATE INDEX IF NOT EXISTS samples_segment ON samples (segment)")
+        await self._db.commit()
+
+        async with self._db.execute("SELECT segment, COUNT(*) FROM samples GROUP BY segment") as cursor:
+            self._segments = {segment: count for segment, count in await cursor.fetchall()}
+
+    async def append(self, samples: list[tuple[ua.NodeId, ua.DataValue]]):
+        if self._db is None or len(samples) == 0:
+            return
+
+        segment = int(datetime.now(timezone.utc).timestamp()) // self._segment_seconds
+        rows = [
+            (
+                segment,
+                node_id.to_string(),
+                to_epoch(data_value.SourceTimestamp),
+                ua.ua_binary.struct_to_binary(data_value)
+            )
+            for node_id, data_value in samples
+        ]
+        try:
+            await self._db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?)", rows)
+            await self._db.commit()
+        except Exception as e:
+            _logger.warning("Cannot buffer %s samples: %s", len(rows), e)
+            return
+
+        self._segments[segment] = self._segments.get(segment, 0) + len(rows)
+        await self._evict(segment)
+
+    async def _evict(self, current_segment: int):
+        oldest_kept_segment = current_segment - self._max_age // self._segment_seconds
+        expired_segments = []
+        total = len(self)
+        for segment in sorted(self._segments):
+            if segment == current_segment:
+                break
+            if segment >= oldest_kept_segment and total <= self._max_samples:
+                break
+            expired_segments.append(segment)
+            total -= self._segments[segment]
+
+        if len(expired_segments) == 0:
+            return
+        await self._db.executemany("DELETE FROM samples WHERE segment = ?", [(s,) for s in expired_segments])
+        await self._db.commit()
+        for segment in expired_segments:
+            del self._segments[segment]
+
+    async def new_historized_node(self, node_id, period, count=0):
+        # every value committed by the drivers is buffered, nothing to register per node
+        pass
+
+    async def save_node_value(self, node_id, datavalue):
+        await self.append([(node_id, datavalue)])
+
+    async def read_node_history(self, node_id, start, end, nb_values):
+        if self._db is None:
+            return [], None
+
+        if start is None:
+            start = ua.get_win_epoch()
+        if end is None:
+            end = ua.get_win_epoch()
+
+        # same ordering rules as the asyncua in-memory history: without a start time, or with the
+        # start after the end, the newest values come first
+        if start == ua.get_win_epoch():
+            condition, params, order = "", (), "DESC"
+            if end != ua.get_win_epoch():
+                condition, params = " AND source_timestamp <= ?", (to_epoch(end),)
+        elif end == ua.get_win_epoch():
+            condition, params, order = " AND source_timestamp >= ?", (to_epoch(start),), "ASC"
+        elif start > end:
+            condition, params, order = " AND source_timestamp BETWEEN ? AND ?", (to_epoch(end), to_epoch(start)), "DESC"
+        else:
+            condition, params, order = " AND source_timestamp BETWEEN ? AND ?", (to_epoch(start), to_epoch(end)), "ASC"
+
+        limit = self.max_history_data_response_size + 1
+        if nb_values:
+            limit = min(nb_values, limit)
+        query = "SELECT value FROM samples WHERE node_id = ?" + condition + \
+                " ORDER BY source_timestamp " + order + ", rowid " + order + " LIMIT ?"
+        async with self._db.execute(query, (node_id.to_string(),) + params + (limit,)) as cursor:
+            rows = await cursor.fetchall()
+
+        results = [ua.ua_binary.struct_from_binary(ua.DataValue, Buffer(row[0])) for row in rows]
+        cont = None
+        if len(results) > self.max_history_data_response_size:
+            cont = results[self.max_history_data_response_size].SourceTimestamp
+            results = results[:self.max_history_data_response_size]
+        return results, cont
+
+    async def read_values(self, node_id: ua.NodeId, start: datetime, end: datetime) -> list[ua.DataValue]:
+        if self._db is None:
+            return []
+        async with self._db.execute(
+            "SELECT value FROM samples WHERE node_id = ? AND source_timestamp >= ? AND source_timestamp < ?"
+            " ORDER BY source_timestamp, rowid",
+            (node_id.to_string(), to_epoch(start), to_epoch(end))
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [ua.ua_binary.struct_from_binary(ua.DataValue, Buffer(row[0])) for row in rows]
+
+    async def new_historized_event(self, source_id, evtypes, period, count=0):
+        pass
+
+    async def save_event(self, event):
+        pass
+
+    async def read_event_history(self, source_id, start, end, nb_values, evfilter):
+        return [], None
+
+    async def stop(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
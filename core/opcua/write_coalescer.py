@@ -0,0 +1,87 @@
+import logging
+from datetime import datetime
+
+from asyncua import Node, Server, ua
+
+from core.opcua.history_storage import HistoryStorage
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+
+class WriteCoalescer:
+    def __init__(self, server: Server, history: HistoryStorage | None = None):
+        self._server: Server = server
+        self._history: HistoryStorage | None = history
+        self._pending: dict[ua.NodeId, ua.DataValue] = {}
+        # values replaced by a later value of the same node before the commit, they are still historized
+        self._superseded: list[tuple[ua.NodeId, ua.DataValue]] = []
+        # nodes already flagged as historizing with HistoryRead access
+        self._historized: set[ua.NodeId] = set()
+
+    def stage(self, node: Node, value: ua.Variant, source_timestamp: datetime | None = None):
+        # a later value for the same node in the same tick replaces the earlier one in the address space;
+        # source_timestamp is a naive UTC datetime, the time of staging by default
+        if source_timestamp is None:
+            source_timestamp = datetime.utcnow()
+        data_value = ua.DataValue(value, SourceTimestamp=source_timestamp)
+        if self._history is not None:
+            previous = self._pending.get(node.nodeid)
+            if previous is not None:
+                self._superseded.append((node.nodeid, previous))
+        self._pending[node.nodeid] = data_value
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def commit(self) -> int:
+        if len(self._pending) == 0:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        superseded, self._superseded = self._superseded, []
+        params = ua.WriteParameters()
+        for node_id, data_value in pending.items():
+            write_value = ua.WriteValue()
+            write_value.NodeId = node_id
+            write_value.AttributeId = ua.AttributeIds.Value
+            write_value.Value = data_value
+            params.NodesToWrite.append(write_value)
+        if self._history is not None:
+            self._append_history_attributes(params, pending)
+
+        try:
+            results = await self._server.iserver.isession.write(params)
+        except Exception as e:
+            _logger.warning("Cannot write %s values: %s", len(pending), e)
+            return 0
+
+        for write_value, result in zip(params.NodesToWrite, results):
+            if not result.is_good():
+                _logger.warning("Cannot write node %s: %s", write_value.NodeId, result)
+
+        if self._history is not None:
+            await self._history.append(superseded + list(pending.items()))
+        return len(pending)
+
+    def _append_history_attributes(self, params: ua.WriteParameters, pending: dict[ua.NodeId, ua.DataValue]):
+        aspace = self._server.iserver.aspace
+        for node_id in pending:
+            if node_id in self._historized or node_id not in aspace or not self._history.is_historizing(node_id):
+                continue
+            self._historized.add(node_id)
+
+            for attribute_id in (ua.AttributeIds.AccessLevel, ua.AttributeIds.UserAccessLevel):
+                access_level = aspace.read_attribute_value(node_id, attribute_id).Value.Value or 0
+                access_level |= ua.AccessLevel.HistoryRead.mask
+                write_value = ua.WriteValue()
+                write_value.NodeId = node_id
+                write_value.AttributeId = attribute_id
+                write_value.Value = ua.DataValue(ua.Variant(access_level, ua.VariantType.Byte))
+                params.NodesToWrite.append(write_value)
+
+            write_value = ua.WriteValue()
+            write_value.NodeId = node_id
+            write_value.AttributeId = ua.AttributeIds.Historizing
+            write_value.Value = ua.DataValue(ua.Variant(True, ua.VariantType.Boolean))
+            params.NodesToWrite.append(write_value)
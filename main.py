@@ -2,10 +2,10 @@ import asyncio
 import logging
 import os
 
-from core.drivers.environment_driver import EnvironmentDriver
-from core.drivers.feeding_driver import FeedingDriver
-from core.drivers.opcua.opcua_driver import OpcuaDriver
+from core.drivers.driver_supervisor import DriverSupervisor, get_enabled_drivers
+from core.opcua.diagnostics import Diagnostics
 from core.opcua.opcua_server import OPCUAServer
+from utilities.metrics import METRICS, MetricsHttpServer
 
 _logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.WARNING)
@@ -21,13 +21,20 @@ async def start_opcua_server():
             "http://aquacloud.iothub.thinkbox.no",
             xml_file_path
     ) as opcua_server:
-        # driver = FeedingDriver(opcua_server)
-        # driver = EnvironmentDriver(opcua_server)
-        driver = OpcuaDriver(opcua_server)
-        await driver.start()
-        await asyncio.sleep(10)
-        while True:
-            await asyncio.sleep(1)
+        # all enabled drivers (plugin_config.json or DRIVERS) share this server and its address space
+        supervisor = DriverSupervisor(opcua_server, get_enabled_drivers())
+        await supervisor.start()
+        metrics_server = MetricsHttpServer(METRICS)
+        diagnostics = Diagnostics(opcua_server, METRICS)
+        try:
+            await metrics_server.start()
+            await diagnostics.start()
+            while True:
+                await asyncio.sleep(1)
+        finally:
+            diagnostics.stop()
+            metrics_server.stop()
+            await supervisor.stop()
 
 
 if __name__ == '__main__':
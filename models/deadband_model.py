@@ -0,0 +1,9 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class DeadbandModel(BaseModel):
+    absolute: Optional[float] = 0
+    percent: Optional[float] = 0
+    max_silence: Optional[float] = None
@@ -0,0 +1,9 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class HistoryModel(BaseModel):
+    backend: Literal["memory", "sqlite", "none"] = "sqlite"
+    count: Optional[int] = 1000
+    rollups: Optional[bool] = False
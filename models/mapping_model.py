@@ -1,9 +1,8 @@
-from typing import Optional
+from typing import NamedTuple, Optional
 
-from pydantic import BaseModel
 
-
-class MappingModel(BaseModel):
+# plain tuple record, drivers create one per (tag, sensor measurement) so it is kept light
+class MappingModel(NamedTuple):
     unit_id: str
     sensor: str
     measurement: str
@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class SensorModel(BaseModel):
@@ -9,15 +9,45 @@ class SensorModel(BaseModel):
     unit_id: str
     sensor_type: str
     depth: Optional[float] = None
+    poll_interval: Optional[float] = Field(default=None, gt=0)
     mapping: dict[str, str]
 
 
-class NodeModel(BaseModel):
+# OPC UA subscription settings of a sensor, a node overrides the settings of its sensor
+class MonitoringModel(BaseModel):
+    # milliseconds, nodes with the same publishing interval share one subscription
+    publishing_interval: Optional[float] = None
+    # milliseconds, -1 samples at the publishing interval
+    sampling_interval: Optional[float] = None
+    queue_size: Optional[int] = None
+    discard_policy: Optional[Literal["oldest", "newest"]] = None
+    # server side deadband, percent is relative to the EURange of the node
+    deadband_type: Optional[Literal["absolute", "percent"]] = None
+    deadband_value: Optional[float] = None
+
+
+class NodeModel(MonitoringModel):
     ns: int
     i: int
 
 
-class OpcSensorModel(SensorModel):
+class OpcSensorModel(SensorModel, MonitoringModel):
     mapping: dict[str, NodeModel]
     type: Optional[str] = "unit"
     unit_id: Optional[str] = ""
+
+
+class RegisterModel(BaseModel):
+    function: Literal[3, 4] = 3
+    address: int
+    data_type: Literal["int16", "uint16", "int32", "uint32", "float32"] = "uint16"
+    word_order: Literal["big", "little"] = "big"
+    scale: Optional[float] = 1
+    offset: Optional[float] = 0
+
+
+class ModbusSensorModel(SensorModel):
+    slave_id: str
+    mapping: dict[str, RegisterModel]
+    type: Optional[str] = "unit"
+    unit_id: Optional[str] = ""
@@ -0,0 +1,38 @@
+from asyncua import ua
+
+from core.drivers.deadband_filter import DeadbandFilter
+from models.deadband_model import DeadbandModel
+
+
+def test_values_inside_the_deadband_are_dropped():
+    deadband_filter = DeadbandFilter(enabled=True, max_silence=60)
+    deadband_filter.set_deadbands({"Temperature": DeadbandModel(absolute=0.5)})
+    slot = deadband_filter.get_slot(ua.NodeId("Unit|u1|Sensor|t.Temperature", 2), "Temperature")
+    assert deadband_filter.accept(slot, 10.0, 0.0)
+    assert not deadband_filter.accept(slot, 10.4, 1.0)
+    assert deadband_filter.accept(slot, 10.6, 2.0)
+    # max_silence forces a write
+    assert deadband_filter.accept(slot, 10.6, 70.0)
+
+
+def test_set_deadbands_updates_existing_slots():
+    deadband_filter = DeadbandFilter(enabled=True, max_silence=60)
+    deadband_filter.set_deadbands({"Temperature": DeadbandModel(absolute=0.5)})
+    slot = deadband_filter.get_slot(ua.NodeId("Unit|u1|Sensor|t.Temperature", 2), "Temperature")
+    assert deadband_filter.accept(slot, 10.0, 0.0)
+    deadband_filter.set_deadbands({})
+    assert deadband_filter.accept(slot, 10.1, 1.0)
+
+
+def test_reset_forgets_the_last_value_of_a_sensor():
+    deadband_filter = DeadbandFilter(enabled=True, max_silence=60)
+    deadband_filter.set_deadbands({"Temperature": DeadbandModel(absolute=0.5)})
+    slot = deadband_filter.get_slot(ua.NodeId("Unit|u1|Sensor|t.Temperature", 2), "Temperature")
+    other = deadband_filter.get_slot(ua.NodeId("Unit|u1|Sensor|t2.Temperature", 2), "Temperature")
+    assert deadband_filter.accept(slot, 10.0, 0.0)
+    assert deadband_filter.accept(other, 10.0, 0.0)
+    deadband_filter.reset("Unit|u1|Sensor|t")
+    assert deadband_filter.accept(slot, 10.0, 1.0)
+    assert not deadband_filter.accept(other, 10.0, 1.0)
+    deadband_filter.reset("Unit|u1")
+    assert deadband_filter.accept(other, 10.0, 2.0)
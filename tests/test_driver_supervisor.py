@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aquacloud_common")
+
+import core.drivers.driver_supervisor as driver_supervisor
+from core.drivers.driver_supervisor import DriverSupervisor
+
+
+class FakeDriver:
+    CONFIG_FILE = ""
+
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self.stopped = False
+        self.closed = False
+
+    async def start(self):
+        if self.fail:
+            raise RuntimeError("database is down")
+
+    def stop(self):
+        self.stopped = True
+
+    async def close(self):
+        self.closed = True
+
+
+def test_failed_start_and_shutdown_close_the_driver(monkeypatch):
+    # the first start fails, the restarted driver runs until the supervisor is stopped
+    drivers = [FakeDriver(fail=True), FakeDriver(fail=False)]
+    created = iter(drivers)
+    monkeypatch.setattr(driver_supervisor, "create_driver", lambda name, server: next(created))
+    monkeypatch.setattr(driver_supervisor, "DRIVER_RESTART_MIN_BACKOFF", 0.01)
+
+    async def run():
+        supervisor = DriverSupervisor(None, ["sql"])
+        await supervisor.start()
+        await asyncio.sleep(0.1)
+        assert supervisor.drivers == {"sql": drivers[1]}
+        await supervisor.stop()
+
+    asyncio.run(run())
+    assert all(driver.stopped and driver.closed for driver in drivers)
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import struct
+
+import pytest
+
+pytest.importorskip("aquacloud_common")
+
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusServerContext, ModbusSlaveContext
+from pymodbus.server import ServerAsyncStop, StartAsyncTcpServer
+
+import core.drivers.base_driver as base_driver
+from core.drivers.modbus.modbus_driver import ModbusDriver
+from core.opcua.opcua_server import OPCUAServer
+
+SIMULATOR_PORT = 48502
+
+
+class RecordingModbusDriver(ModbusDriver):
+    def __init__(self, server: OPCUAServer):
+        super().__init__(server)
+        self.changes: dict[str, float] = {}
+
+    async def on_data_change(self, tag, value, timestamp, source_timestamp=None):
+        self.changes[tag] = value
+
+    async def commit_data_changes(self):
+        pass
+
+
+def create_simulator_context() -> ModbusServerContext:
+    holding_registers = [0] * 200
+    holding_registers[100:102] = struct.unpack(">2H", struct.pack(">f", 21.5))
+    holding_registers[102] = 850
+    input_registers = [0] * 10
+    input_registers[0] = 180
+    input_registers[1] = 0xFFE7
+    slave = ModbusSlaveContext(
+        hr=ModbusSequentialDataBlock(0, holding_registers),
+        ir=ModbusSequentialDataBlock(0, input_registers),
+        zero_mode=True
+    )
+    return ModbusServerContext(slaves={1: slave}, single=False)
+
+
+def write_config(directory, slaves: int = 1):
+    sensors = [
+        {
+            "type": "unit", "unit_id": "unit_001", "slave_id": "plc",
+            "sensor_type": "TemperatureSensorType", "sensor_name": "Temperature_5m",
+            "mapping": {"Temperature": {"function": 3, "address": 100, "data_type": "float32"}}
+        },
+        {
+            "type": "unit", "unit_id": "unit_001", "slave_id": "plc",
+            "sensor_type": "OxygenSaturationSensorType", "sensor_name": "OxygenSaturation_5m",
+            "mapping": {"OxygenSaturation": {"function": 3, "address": 102, "scale": 0.1}}
+        },
+        {
+            "type": "site", "slave_id": "plc",
+            "sensor_type": "SeaCurrentSensorType", "sensor_name": "SeaCurrent_10m",
+            "mapping": {
+                "Direction": {"function": 4, "address": 0},
+                "Speed": {"function": 4, "address": 1, "data_type": "int16", "scale": 0.01}
+            }
+        },
+    ]
+    config = {
+        "slaves": [{"slave_id": "plc", "host": "127.0.0.1", "port": SIMULATOR_PORT, "unit": 1}],
+        "sensors": sensors,
+    }
+    # further slaves behind the same gateway (host and port)
+    for index in range(1, slaves):
+        slave_id = "plc" + str(index)
+        config["slaves"].append({"slave_id": slave_id, "host": "127.0.0.1", "port": SIMULATOR_PORT, "unit": 1})
+        config["sensors"].append({
+            "type": "site", "slave_id": slave_id,
+            "sensor_type": "TemperatureSensorType", "sensor_name": "Temperature_" + slave_id,
+            "mapping": {"Temperature": {"function": 3, "address": 100, "data_type": "float32"}}
+        })
+    with open(directory / "modbus_config.json", "w") as config_file:
+        json.dump(config, config_file)
+
+
+def test_poll_slave_data_reads_the_simulator(tmp_path, monkeypatch):
+    write_config(tmp_path)
+    monkeypatch.setattr(base_driver, "CONFIG_PATH", str(tmp_path))
+    server = OPCUAServer("opc.tcp://127.0.0.1:48411", "Test", "http://aquacloud.iothub.thinkbox.no", "")
+    driver = RecordingModbusDriver(server)
+    driver.parse_config()
+
+    async def run():
+        simulator = asyncio.create_task(
+            StartAsyncTcpServer(context=create_simulator_context(), address=("127.0.0.1", SIMULATOR_PORT))
+        )
+        try:
+            await asyncio.sleep(0.5)
+            for slave in driver._slaves:
+                await driver._poll_slave_data(slave)
+        finally:
+            driver.stop()
+            await ServerAsyncStop()
+            simulator.cancel()
+
+    asyncio.run(run())
+    # one function 3 block (100-102) and one function 4 block (0-1)
+    assert [(block.function, block.address, block.count) for block in driver._read_plans["plc"].blocks] \
+        == [(3, 100, 3), (4, 0, 2)]
+    # register tags are <unit or site>:<slave_id>_<function>_<address>:<sensor_name>
+    values = {tag.split(":")[1]: value for tag, value in driver.changes.items() if ":local_timestamp:" not in tag}
+    assert values["plc_3_100"] == 21.5
+    assert abs(values["plc_3_102"] - 85.0) < 1e-9
+    assert values["plc_4_0"] == 180
+    assert abs(values["plc_4_1"] + 0.25) < 1e-9
+    assert sum(":local_timestamp:" in tag for tag in driver.changes) == 3
+
+
+def test_slaves_behind_one_gateway_connect_its_client_once(tmp_path, monkeypatch):
+    write_config(tmp_path, slaves=3)
+    monkeypatch.setattr(base_driver, "CONFIG_PATH", str(tmp_path))
+    connects = []
+    connect = AsyncModbusTcpClient.connect
+
+    async def counting_connect(client):
+        connects.append(client)
+        await asyncio.sleep(0.05)
+        return await connect(client)
+
+    monkeypatch.setattr(AsyncModbusTcpClient, "connect", counting_connect)
+    server = OPCUAServer("opc.tcp://127.0.0.1:48412", "Test", "http://aquacloud.iothub.thinkbox.no", "")
+    driver = RecordingModbusDriver(server)
+    driver.parse_config()
+
+    async def run():
+        simulator = asyncio.create_task(
+            StartAsyncTcpServer(context=create_simulator_context(), address=("127.0.0.1", SIMULATOR_PORT))
+        )
+        try:
+            await asyncio.sleep(0.5)
+            await asyncio.gather(*[driver._poll_slave_data(slave) for slave in driver._slaves])
+        finally:
+            driver.stop()
+            await ServerAsyncStop()
+            simulator.cancel()
+
+    asyncio.run(run())
+    assert len(connects) == 1
+    values = {tag.split(":")[1]: value for tag, value in driver.changes.items() if ":local_timestamp:" not in tag}
+    assert values["plc1_3_100"] == values["plc2_3_100"] == 21.5
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from asyncua import ua
+
+import core.drivers.opcua.opcua_worker as opcua_worker
+from core.drivers.opcua.opcua_worker import DataChange, OpcuaWorker
+from core.drivers.opcua.server_model import ServerModel
+
+
+def notify(worker: OpcuaWorker, node_id: ua.NodeId, value, source_timestamp: datetime | None):
+    data = SimpleNamespace(monitored_item=SimpleNamespace(Value=SimpleNamespace(SourceTimestamp=source_timestamp)))
+    worker.datachange_notification(SimpleNamespace(nodeid=node_id), value, data)
+
+
+def run_batch(worker: OpcuaWorker, notifications: list[tuple]) -> list[list[DataChange]]:
+    batches = []
+
+    async def handle(unit_id, changes, timestamp):
+        batches.append(changes)
+
+    async def run():
+        worker._on_data_changes = handle
+        task = asyncio.create_task(worker._process_data_changes())
+        for notification in notifications:
+            notify(worker, *notification)
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(run())
+    return batches
+
+
+def create_worker(endpoint: str) -> OpcuaWorker:
+    # the sample counters are registered per endpoint, every test uses its own
+    server = ServerModel(unit_id="unit_001", endpoint=endpoint, username="", password="")
+    return OpcuaWorker(server, [], None, None, None, "urn:test")
+
+
+def test_every_sample_of_a_node_is_kept_with_its_source_timestamp():
+    worker = create_worker("opc.tcp://127.0.0.1:48421")
+    node_id = ua.NodeId(5, 2)
+    timestamps = [datetime(2024, 1, 1, 10, 0, second) for second in range(3)]
+    batches = run_batch(worker, [(node_id, float(second), timestamps[second]) for second in range(3)])
+    assert batches == [[DataChange(node_id, float(second), timestamps[second]) for second in range(3)]]
+    assert worker.coalesced_samples == 2
+    assert worker.dropped_samples == 0
+
+
+def test_samples_past_the_buffer_size_are_dropped(monkeypatch):
+    monkeypatch.setattr(opcua_worker, "DATA_CHANGE_QUEUE_SIZE", 2)
+    worker = create_worker("opc.tcp://127.0.0.1:48422")
+    batches = run_batch(worker, [(ua.NodeId(i, 2), 1.0, None) for i in range(5)])
+    assert [len(batch) for batch in batches] == [2]
+    assert worker.dropped_samples == 3
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+pytest.importorskip("aquacloud_common")
+
+from core.drivers.base_driver import PollScheduler
+from core.drivers.modbus.slave_model import SlaveModel
+from models.sensor_model import SensorModel
+
+
+def test_non_positive_poll_interval_is_rejected_by_the_models():
+    with pytest.raises(ValidationError):
+        SlaveModel(slave_id="plc", host="127.0.0.1", poll_interval=0)
+    with pytest.raises(ValidationError):
+        SensorModel(type="unit", unit_id="unit_001", sensor_type="TemperatureSensorType", mapping={},
+                    poll_interval=-1)
+    assert SlaveModel(slave_id="plc", host="127.0.0.1").poll_interval is None
+
+
+def test_scheduler_rejects_non_positive_interval():
+    async def poll():
+        pass
+
+    async def run():
+        scheduler = PollScheduler("test")
+        with pytest.raises(ValueError):
+            scheduler.schedule(poll, 0)
+        assert scheduler._tasks == []
+
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+import struct
+
+from core.drivers.modbus.read_plan import MAX_REGISTER_COUNT, RegisterBlock, plan_register_blocks
+from models.sensor_model import RegisterModel
+
+
+def float32_words(value: float, word_order: str = "big") -> list[int]:
+    high, low = struct.unpack(">2H", struct.pack(">f", value))
+    return [low, high] if word_order == "little" else [high, low]
+
+
+def test_registers_within_gap_are_merged():
+    blocks = plan_register_blocks([
+        ("a", RegisterModel(address=100)),
+        ("b", RegisterModel(address=105)),
+        ("c", RegisterModel(address=120)),
+    ], max_gap=8)
+    assert [(block.address, block.count) for block in blocks] == [(100, 6), (120, 1)]
+    assert [tag for tag, _ in blocks[0].registers] == ["a", "b"]
+
+
+def test_functions_are_not_merged():
+    blocks = plan_register_blocks([
+        ("holding", RegisterModel(function=3, address=0)),
+        ("input", RegisterModel(function=4, address=1)),
+    ])
+    assert [(block.function, block.address, block.count) for block in blocks] == [(3, 0, 1), (4, 1, 1)]
+
+
+def test_block_size_is_capped():
+    registers = [(str(address), RegisterModel(address=address)) for address in range(0, 300, 2)]
+    blocks = plan_register_blocks(registers)
+    assert all(block.count <= MAX_REGISTER_COUNT for block in blocks)
+    assert sum(len(block.registers) for block in blocks) == len(registers)
+    assert blocks[0].count == 125 and blocks[1].address == 126
+
+
+def test_wide_register_at_the_cap_starts_a_new_block():
+    blocks = plan_register_blocks([
+        ("a", RegisterModel(address=0)),
+        ("b", RegisterModel(address=124, data_type="float32")),
+    ])
+    assert [(block.address, block.count) for block in blocks] == [(0, 1), (124, 2)]
+
+
+def test_decode_word_order_and_scale():
+    block = RegisterBlock(3, 10, 6)
+    block.registers = [
+        ("big", RegisterModel(address=10, data_type="float32")),
+        ("little", RegisterModel(address=12, data_type="float32", word_order="little")),
+        ("scaled", RegisterModel(address=14, data_type="uint16", scale=0.1, offset=-5)),
+        ("signed", RegisterModel(address=15, data_type="int16", scale=0.01)),
+    ]
+    words = float32_words(21.5) + float32_words(-3.25, "little") + [850, 0xFFE7]
+    values = dict(block.decode(words))
+    assert values["big"] == 21.5
+    assert values["little"] == -3.25
+    assert abs(values["scaled"] - 80.0) < 1e-9
+    assert abs(values["signed"] + 0.25) < 1e-9
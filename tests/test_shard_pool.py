@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from asyncua import ua
+
+from core.drivers.opcua.opcua_worker import DataChange
+from core.drivers.opcua.shard_pool import decode_frame, encode_frame
+
+
+def test_frame_round_trip_keeps_every_value_kind():
+    source_timestamp = datetime(2024, 1, 1, 10, 0, 0, 123456)
+    changes = [
+        DataChange(ua.NodeId(5, 2), 21.5, source_timestamp),
+        DataChange(ua.NodeId(-7, 2), 3, source_timestamp),
+        DataChange(ua.NodeId(8, 3), None, None),
+        DataChange(ua.NodeId(9, 3), "text", source_timestamp),
+        DataChange(ua.NodeId(10, 3), [1.0, 2.0], source_timestamp),
+        DataChange(ua.NodeId(11, 3), True, source_timestamp),
+    ]
+    server_index, decoded, timestamp = decode_frame(encode_frame(4, changes, 1700000000.25))
+    assert server_index == 4
+    assert timestamp == 1700000000.25
+    assert [(node_id.NamespaceIndex, node_id.Identifier, value) for node_id, value, _ in decoded] == [
+        (2, 5, 21.5),
+        (2, -7, 3.0),
+        (3, 8, None),
+        (3, 9, "text"),
+        (3, 10, [1.0, 2.0]),
+        (3, 11, True),
+    ]
+    assert [change.source_timestamp for change in decoded] == [change.source_timestamp for change in changes]
+
+
+def test_samples_of_one_node_keep_their_order():
+    changes = [DataChange(ua.NodeId(5, 2), float(value), datetime(2024, 1, 1, 10, 0, value)) for value in range(3)]
+    _, decoded, _ = decode_frame(encode_frame(0, changes, 0.0))
+    assert decoded == changes
+
+
+def test_empty_frame():
+    assert decode_frame(encode_frame(0, [], 0.0)) == (0, [], 0.0)
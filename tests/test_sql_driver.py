@@ -0,0 +1,153 @@
+import asyncio
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("aquacloud_common")
+
+import core.drivers.base_driver as base_driver
+from core.drivers.sql.sql_driver import SqlDriver
+from core.opcua.opcua_server import OPCUAServer
+
+
+class RecordingSqlDriver(SqlDriver):
+    def __init__(self, server: OPCUAServer):
+        super().__init__(server)
+        self.changes: list[tuple] = []
+
+    async def on_data_change(self, tag, value, timestamp, source_timestamp=None):
+        self.changes.append((tag, value, timestamp, source_timestamp))
+
+    async def commit_data_changes(self):
+        pass
+
+
+def create_database(path: str):
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "CREATE TABLE sensor (id INTEGER PRIMARY KEY, unit_id TEXT, sensor_name TEXT, sensor_type TEXT);"
+        "CREATE TABLE sensor_data_channel (id INTEGER PRIMARY KEY, sensor_id INTEGER, measurement TEXT);"
+        "CREATE TABLE sensor_data (id INTEGER PRIMARY KEY, channel_id INTEGER, value REAL, timestamp TEXT);"
+        "CREATE INDEX sensor_data_channel_id ON sensor_data (channel_id, id);"
+        "INSERT INTO sensor VALUES (1, 'unit_001', 'Temperature_5m', 'TemperatureSensorType');"
+        "INSERT INTO sensor VALUES (2, 'unit_001', 'OxygenSaturation_5m', 'OxygenSaturationSensorType');"
+        "INSERT INTO sensor_data_channel VALUES (1, 1, 'Temperature');"
+        "INSERT INTO sensor_data_channel VALUES (2, 2, 'OxygenSaturation');"
+    )
+    insert_rows(connection, [
+        (1, 1, 10.0, "2024-01-01 10:00:00"),
+        (2, 2, 90.0, "2024-01-01 10:00:00"),
+        (3, 1, 11.0, "2024-01-01 10:01:00"),
+        (4, 2, 91.0, "2024-01-01 10:01:00"),
+        (5, 1, 12.0, "2024-01-01 10:02:00"),
+    ])
+    connection.close()
+
+
+def insert_rows(connection: sqlite3.Connection, rows: list[tuple]):
+    connection.executemany("INSERT INTO sensor_data VALUES (?, ?, ?, ?)", rows)
+    connection.commit()
+
+
+@pytest.fixture
+def driver(tmp_path, monkeypatch):
+    database_path = str(tmp_path / "sensor_data.sqlite")
+    create_database(database_path)
+    with open(tmp_path / "sql_config.json", "w") as config_file:
+        json.dump({"database": {"dialect": "sqlite", "database": database_path, "batch_size": 2}}, config_file)
+    monkeypatch.setattr(base_driver, "CONFIG_PATH", str(tmp_path))
+    server = OPCUAServer("opc.tcp://127.0.0.1:48410", "Test", "http://aquacloud.iothub.thinkbox.no", "")
+    driver = RecordingSqlDriver(server)
+    driver.parse_config()
+    return driver, database_path
+
+
+def get_values(changes: list[tuple]) -> list[float]:
+    return [value for tag, value, _, _ in changes if ":local_timestamp:" not in tag]
+
+
+def test_start_publishes_latest_row_per_channel_and_seeds_last_id(driver):
+    driver, _ = driver
+
+    async def run():
+        await driver._connect()
+        try:
+            await driver._publish_latest_data()
+        finally:
+            await driver.close()
+
+    asyncio.run(run())
+    assert sorted(get_values(driver.changes)) == [12.0, 91.0]
+    assert driver._last_id == 5
+
+
+def test_poll_reads_new_rows_once_with_their_timestamps(driver):
+    driver, database_path = driver
+
+    async def run():
+        await driver._connect()
+        try:
+            await driver._publish_latest_data()
+            driver.changes.clear()
+
+            connection = sqlite3.connect(database_path)
+            insert_rows(connection, [
+                (6, 1, 13.0, "2024-01-01 10:03:00"),
+                (7, 1, 14.0, "2024-01-01 10:04:00"),
+                (8, 2, None, "2024-01-01 10:04:00"),
+                (9, 3, 1.0, "2024-01-01 10:04:00"),
+                (10, 2, 92.0, "2024-01-01 10:05:00"),
+            ])
+            connection.close()
+            # batch_size is 2, so the rows are read in three batches
+            await driver._poll_data()
+            first_poll = list(driver.changes)
+            driver.changes.clear()
+            await driver._poll_data()
+            return first_poll
+        finally:
+            await driver.close()
+
+    first_poll = asyncio.run(run())
+    measurements = [(value, source_timestamp) for tag, value, _, source_timestamp in first_poll
+                    if ":local_timestamp:" not in tag]
+    # the NULL value and the unknown channel are skipped, every other row keeps its own timestamp
+    assert [value for value, _ in measurements] == [13.0, 14.0, 92.0]
+    expected = datetime(2024, 1, 1, 10, 3).astimezone(timezone.utc).replace(tzinfo=None)
+    assert measurements[0][1] == expected
+    assert measurements[1][1] != measurements[0][1]
+    assert driver._last_id == 10
+    assert driver.changes == []
+    assert driver._watermarks[1][0] == 7
+    assert driver._watermarks[2][0] == 10
+
+
+def test_reload_with_unreachable_database_keeps_the_running_pool(driver, tmp_path):
+    driver, database_path = driver
+
+    async def run():
+        await driver._connect()
+        try:
+            await driver._publish_latest_data()
+            pool, units = driver._pool, driver.units
+            with open(tmp_path / "sql_config.json", "w") as config_file:
+                json.dump({"database": {"dialect": "sqlite", "database": str(tmp_path / "missing" / "db.sqlite")}},
+                          config_file)
+            with pytest.raises(ValueError):
+                await driver.reload()
+            assert driver._pool is pool and driver.units is units
+            assert driver._database.database == database_path
+
+            connection = sqlite3.connect(database_path)
+            insert_rows(connection, [(6, 1, 13.0, "2024-01-01 10:03:00")])
+            connection.close()
+            driver.changes.clear()
+            await driver._poll_data()
+        finally:
+            await driver.close()
+
+    asyncio.run(run())
+    assert get_values(driver.changes) == [13.0]
+    assert driver._pool is None
@@ -32,8 +32,12 @@ def parse_org_structure(org_tree: dict, org_type: str) -> OrganizationModel | No
 
 
 def get_type_definition_identifier_from_model(model: AquaBaseModel) -> str:
+    return TYPE_DEFINITION_IDENTIFIER_PREFIX + "|" + get_type_name_from_model(model)
+
+
+def get_type_name_from_model(model: AquaBaseModel) -> str:
     name = model.__class__.__name__
-    return TYPE_DEFINITION_IDENTIFIER_PREFIX + "|" + name.replace("Model", "") + "Type"
+    return name.replace("Model", "") + "Type"
 
 
 def get_identifier_from_model(model: AquaBaseModel, parent_node: Node) -> str:
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import math
+import os
+from typing import Callable
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+# port of the Prometheus text endpoint (GET /metrics), 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9102))
+METRICS_PREFIX = "vendor_plugin_"
+
+# log-linear buckets (HDR style): every power of two between 2^HISTOGRAM_MIN_EXPONENT and
+# 2^HISTOGRAM_MAX_EXPONENT seconds (~1us to ~64s) is split into HISTOGRAM_SUB_BUCKETS buckets
+HISTOGRAM_MIN_EXPONENT = -19
+HISTOGRAM_MAX_EXPONENT = 7
+HISTOGRAM_SUB_BUCKETS = 4
+_HISTOGRAM_BUCKETS = (HISTOGRAM_MAX_EXPONENT - HISTOGRAM_MIN_EXPONENT) * HISTOGRAM_SUB_BUCKETS
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _bucket_upper_bound(index: int) -> float:
+    exponent = HISTOGRAM_MIN_EXPONENT + index // HISTOGRAM_SUB_BUCKETS
+    sub_bucket = index % HISTOGRAM_SUB_BUCKETS
+    return math.ldexp(0.5 + (sub_bucket + 1) / (2 * HISTOGRAM_SUB_BUCKETS), exponent)
+
+
+class Histogram:
+    __slots__ = ("name", "labels", "count", "sum", "max", "_buckets")
+
+    def __init__(self, name: str, labels: Labels):
+        self.name: str = name
+        self.labels: Labels = labels
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.max: float = 0.0
+        self._buckets: list[int] = [0] * _HISTOGRAM_BUCKETS
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if seconds <= 0:
+            self._buckets[0] += 1
+            return
+        mantissa, exponent = math.frexp(seconds)
+        index = (exponent - HISTOGRAM_MIN_EXPONENT) * HISTOGRAM_SUB_BUCKETS \
+            + int((mantissa - 0.5) * 2 * HISTOGRAM_SUB_BUCKETS)
+        if index < 0:
+            index = 0
+        elif index >= _HISTOGRAM_BUCKETS:
+            index = _HISTOGRAM_BUCKETS - 1
+        self._buckets[index] += 1
+
+    def quantile(self, q: float) -> float:
+        # upper bound of the bucket holding the q-quantile, so at most one bucket width (<= 25%) above the true value
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self._buckets):
+            seen += count
+            if seen >= rank and count > 0:
+                return min(_bucket_upper_bound(index), self.max)
+        return self.max
+
+    def cumulative_buckets(self) -> list[tuple[float, int]]:
+        # exported at the powers of two only, which keeps the Prometheus output short
+        cumulative = []
+        seen = 0
+        for index, count in enumerate(self._buckets):
+            seen += count
+            if (index + 1) % HISTOGRAM_SUB_BUCKETS == 0:
+                cumulative.append((_bucket_upper_bound(index), seen))
+        return cumulative
+
+
+class Counter:
+    __slots__ = ("name", "labels", "value")
+
+    def __init__(self, name: str, labels: Labels):
+        self.name: str = name
+        self.labels: Labels = labels
+        self.value: int = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("name", "labels", "callback")
+
+    def __init__(self, name: str, labels: Labels, callback: Callable[[], float]):
+        self.name: str = name
+        self.labels: Labels = labels
+        self.callback: Callable[[], float] = callback
+
+    @property
+    def value(self) -> float:
+        return self.callback()
+
+
+# callers keep the returned Histogram/Counter, so recording a sample is a few attribute updates
+# without any lookups
+class MetricsRegistry:
+    def __init__(self):
+        self._help: dict[str, tuple[str, str]] = {}
+        self._metrics: dict[tuple[str, Labels], Histogram | Counter | Gauge] = {}
+
+    @staticmethod
+    def _labels(labels: dict[str, str] | None) -> Labels:
+        return tuple(sorted((labels or {}).items()))
+
+    def histogram(self, name: str, description: str, labels: dict[str, str] | None = None) -> Histogram:
+        key = (name, self._labels(labels))
+        if key not in self._metrics:
+            self._help[name] = ("histogram", description)
+            self._metrics[key] = Histogram(name, key[1])
+        return self._metrics[key]
+
+    def counter(self, name: str, description: str, labels: dict[str, str] | None = None) -> Counter:
+        key = (name, self._labels(labels))
+        if key not in self._metrics:
+            self._help[name] = ("counter", description)
+            self._metrics[key] = Counter(name, key[1])
+        return self._metrics[key]
+
+    def gauge(
+            self,
+            name: str,
+            description: str,
+            callback: Callable[[], float],
+            labels: dict[str, str] | None = None
+    ) -> Gauge:
+        key = (name, self._labels(labels))
+        self._help[name] = ("gauge", description)
+        self._metrics[key] = Gauge(name, key[1], callback)
+        return self._metrics[key]
+
+    def remove(self, name: str, labels: dict[str, str] | None = None):
+        self._metrics.pop((name, self._labels(labels)), None)
+
+    @property
+    def metrics(self) -> list[Histogram | Counter | Gauge]:
+        return list(self._metrics.values())
+
+    @staticmethod
+    def _format_labels(labels: Labels, extra: str = "") -> str:
+        items = [key + '="' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for key, value in labels]
+        if extra != "":
+            items.append(extra)
+        if len(items) == 0:
+            return ""
+        return "{" + ",".join(items) + "}"
+
+    def to_prometheus(self) -> str:
+        lines = []
+        described = set()
+        for metric in sorted(self.metrics, key=lambda m: (m.name, m.labels)):
+            name = METRICS_PREFIX + metric.name
+            if metric.name not in described:
+                described.add(metric.name)
+                metric_type, description = self._help[metric.name]
+                lines.append("# HELP " + name + " " + description)
+                lines.append("# TYPE " + name + " " + metric_type)
+
+            if isinstance(metric, Histogram):
+                for upper_bound, count in metric.cumulative_buckets():
+                    labels = self._format_labels(metric.labels, 'le="' + repr(upper_bound) + '"')
+                    lines.append(name + "_bucket" + labels + " " + str(count))
+                lines.append(name + "_bucket" + self._format_labels(metric.labels, 'le="+Inf"') + " " + str(metric.count))
+                lines.append(name + "_sum" + self._format_labels(metric.labels) + " " + repr(metric.sum))
+                lines.append(name + "_count" + self._format_labels(metric.labels) + " " + str(metric.count))
+            else:
+                try:
+                    value = metric.value
+                except Exception as e:
+                    _logger.warning("Cannot read metric %s: %s", metric.name, e)
+                    continue
+                lines.append(name + self._format_labels(metric.labels) + " " + repr(float(value)))
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+class MetricsHttpServer:
+    def __init__(self, registry: MetricsRegistry, port: int = METRICS_PORT):
+        self._registry: MetricsRegistry = registry
+        self._port: int = port
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self):
+        if self._port == 0:
+            return
+        self._server = await asyncio.start_server(self._handle, port=self._port)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            # the headers are not needed, read them so the client does not see a reset
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status = "200 OK"
+                body = self._registry.to_prometheus().encode()
+            else:
+                status = "404 Not Found"
+                body = b"not found\n"
+            writer.write(
+                ("HTTP/1.1 " + status + "\r\n"
+                 "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                 "Content-Length: " + str(len(body)) + "\r\n"
+                 "Connection: close\r\n\r\n").encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            _logger.debug("Metrics request failed: %s", e)
+        finally:
+            writer.close()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
@@ -7,6 +7,7 @@ from aquacloud_common.core.core_type import OrgNodeType
 from aquacloud_common.models.common.external_reference import ExternalReferenceModel
 from aquacloud_common.models.common.position import PositionModel
 from aquacloud_common.models.sensor.analog_item_model import Range, EUInformation
+from core.constants import UNNECESSARY_SENSOR_PROPERTIES
 from core.opcua.nodes.external_reference_node import ExternalReference
 
 
@@ -115,14 +116,6 @@ def parse_eu_information(eu_information: EUInformation) -> ua.EUInformation:
     )
 
 
-UNNECESSARY_SENSOR_PROPERTIES = [
-    "<GroupIdentifier>", "AssetId", "DeviceClass", "DeviceManual",
-    "DeviceRevision", "HardwareRevision", "Identification",
-    "Lock", "MethodSet", "ParameterSet", "ProductInstanceUri",
-    "RevisionCounter", "SoftwareRevision"
-]
-
-
 async def make_sensor_model_from_node(node: Node) -> Any:
     obj = {}
     node_class = await node.read_node_class()
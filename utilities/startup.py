@@ -0,0 +1,47 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from typing import Any, Coroutine, Iterable
+
+_logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.WARNING)
+
+NODE_BUILD_CONCURRENCY = int(os.getenv("NODE_BUILD_CONCURRENCY", 16))
+# level of the startup reports; the modules configure logging at WARNING, so INFO reports are not shown by default
+STARTUP_REPORT_LEVEL = logging.getLevelNamesMapping().get(os.getenv("STARTUP_REPORT_LEVEL", "WARNING").upper(),
+                                                          logging.WARNING)
+
+
+async def gather_with_concurrency(limit: int, coroutines: Iterable[Coroutine[Any, Any, Any]]) -> list[Any]:
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(coroutine: Coroutine[Any, Any, Any]) -> Any:
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*[run(coroutine) for coroutine in coroutines])
+
+
+class StartupTimer:
+    def __init__(self, name: str):
+        self._name: str = name
+        self._phases: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = self._phases.get(name, 0) + time.perf_counter() - start
+
+    @property
+    def phases(self) -> dict[str, float]:
+        return dict(self._phases)
+
+    def report(self):
+        total = sum(self._phases.values())
+        phases = ", ".join(name + "=" + format(duration * 1000, ".1f") + "ms" for name, duration in self._phases.items())
+        _logger.log(STARTUP_REPORT_LEVEL, "%s startup took %.1fms (%s)", self._name, total * 1000, phases)